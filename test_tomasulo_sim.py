@@ -0,0 +1,452 @@
+# --- Testes de regressão do simulador ---
+#
+#   python -m unittest test_tomasulo_sim    (ou python -m pytest)
+
+import csv
+import json
+import multiprocessing
+import os
+import tempfile
+import unittest
+
+from tomasulo_cache import SIZE_FILE, ResultCache
+from tomasulo_memory import PAGE_SIZE, Memory
+from tomasulo_sim import OPCODE_TABLE, TomasuloSimulator, run_trace
+from tomasulo_sweep import DEFAULT_CONFIG, sweep
+from tomasulo_timeline import open_timeline
+from tomasulo_trace import CompiledTraceReader, TraceReader, compile_trace, open_trace
+from tomasulo_tracegen import generate_trace
+
+
+# Carrega o programa (uma instrução por linha) no estado inicial padrão (R1 = R2 = 5)
+def load_program(lines, **sim_config):
+    with tempfile.NamedTemporaryFile('w', suffix=".txt", delete=False) as f:
+        f.write("\n".join(lines) + "\n")
+    try:
+        simulator = TomasuloSimulator(verbose=False, **sim_config)
+        simulator.load_instructions(f.name, use_cache=False)
+        simulator.apply_initial_state()
+    finally:
+        os.unlink(f.name)
+    return simulator
+
+
+# Simula o programa até o fim, sem histórico
+def run_program(lines, **sim_config):
+    simulator = load_program(lines, record_history=False, **sim_config)
+    simulator.run_to_completion(max_cycles=1000)
+    return simulator
+
+
+def register_values(simulator):
+    return {name: reg.value for name, reg in simulator.register_file.items()}
+
+
+# Estado visível da máquina em valores simples, comparável entre simuladores diferentes:
+# as micro-ops entram pelo número de sequência e os registradores pelo nome (no streaming
+# eles são criados na ordem em que aparecem nas instruções buscadas)
+def machine_state(simulator):
+    return (
+        simulator.current_cycle,
+        simulator.program_counter,
+        sorted((reg.name, reg.get_state()) for reg in simulator.registers),
+        [(entry.state, entry.uop.seq, entry.value, entry.store) if entry.busy else None
+         for entry in simulator.reorder_buffer],
+        [(rs.busy, rs.op, rs.Vj, rs.Vk, rs.Qj, rs.Qk, rs.destination_rob_id) for rs in simulator.reservation_stations],
+        list(simulator.memory.items()),
+        simulator.get_metrics(),
+    )
+
+
+# --- Commit ---
+class CommitTest(unittest.TestCase):
+    # Uma instrução mais nova do caminho errado renomeia o destino de uma mais antiga ainda
+    # em execução: o commit da antiga precisa gravar o valor mesmo sem ser a dona da tag
+    def test_older_write_survives_squashed_younger_writer(self):
+        simulator = run_program([
+            "MUL R3, R1, R1",
+            "BEQ R0, R0, 3",
+            "ADD R3, R0, R0",   # caminho errado (previsto não tomado)
+            "OR R4, R3, R0",
+        ])
+        self.assertTrue(simulator.is_finished())
+        self.assertEqual(register_values(simulator)["R3"], 25)
+        self.assertEqual(register_values(simulator)["R4"], 25)
+
+    # Divisão por zero dá -1, que segue normalmente para a memória e para outras operações
+    def test_division_by_zero_result_is_stored(self):
+        simulator = run_program([
+            "DIV R3, R1, R0",
+            "SW R3, R0, 200",
+            "ADD R4, R3, R1",
+        ])
+        self.assertTrue(simulator.is_finished())
+        self.assertEqual(simulator.memory.get(200), -1)
+        self.assertEqual(register_values(simulator)["R4"], 4)
+
+
+# --- Stores ---
+# Grava R3 = 5, 10, ..., 50 em mem[100] e relê com LW até ler 50; o desvio para trás
+# fica no caminho errado na última volta quando o preditor aposta em tomado
+STORE_LOOP = [
+    "MUL R7, R1, R2",
+    "ADD R7, R7, R7",
+    "ADD R3, R0, R0",
+    "ADD R3, R3, R1",
+    "SW R3, R0, 100",
+    "LW R6, R0, 100",
+    "BNE R6, R7, 3",
+    "OR R8, R6, R0",
+]
+
+
+class StoreTest(unittest.TestCase):
+    # Stores do caminho errado não chegam à memória: o resultado é o mesmo sem especulação
+    def test_wrong_path_store_does_not_change_memory(self):
+        expected = run_program(STORE_LOOP, predictor="not_taken")
+        self.assertEqual(expected.memory.get(100), 50)
+        for rob_size in (8, 32):
+            simulator = run_program(STORE_LOOP, predictor="taken", rob_size=rob_size)
+            self.assertTrue(simulator.is_finished())
+            self.assertEqual(simulator.memory.get(100), expected.memory.get(100))
+            self.assertEqual(register_values(simulator), register_values(expected))
+
+
+# --- Recuperação de desvios ---
+class EarlyRecoveryTest(unittest.TestCase):
+    # Uma instrução do caminho errado escreve em R0 enquanto uma escrita mais antiga em R0
+    # ainda está no ROB: depois da recuperação R0 vale 0, como quando o flush é feito no commit
+    def test_r0_is_not_restored_from_checkpoint(self):
+        program = [
+            "DIV R0, R1, R1",
+            "BEQ R0, R0, 3",
+            "ADD R0, R1, R2",   # caminho errado (previsto não tomado)
+            "ADD R4, R0, R1",
+        ]
+        late = run_program(program)
+        early = run_program(program, early_recovery=True)
+        self.assertTrue(early.is_finished())
+        self.assertEqual(register_values(late)["R4"], 5)
+        self.assertEqual(register_values(early)["R4"], 5)
+
+    # O SW do caminho errado executa antes de o desvio ser resolvido: a recuperação na
+    # execução descarta a escrita, e o LW do caminho certo lê a memória original
+    def test_squashed_store_leaves_memory_unchanged(self):
+        program = [
+            "DIV R3, R1, R1",
+            "ADD R3, R3, R1",
+            "ADD R3, R3, R1",
+            "ADD R3, R3, R1",
+            "BEQ R3, R3, 7",
+            "SW R1, R0, 100",   # caminho errado (previsto não tomado)
+            "ADD R4, R1, R1",
+            "LW R5, R0, 100",
+        ]
+        early = run_program(program, early_recovery=True)
+        self.assertTrue(early.is_finished())
+        self.assertEqual(early.memory.get(100), 0)
+        self.assertEqual(register_values(early)["R5"], 0)
+        self.assertEqual(register_values(early), register_values(run_program(program)))
+
+
+# --- Histórico ---
+# Trace sintético com desvios (5 previsões erradas com o preditor padrão) e acessos à memória
+BRANCHY_PROGRAM = list(generate_trace(120, seed=3))
+
+
+class HistoryTest(unittest.TestCase):
+    # Voltar ciclo a ciclo desde o fim passa por todos os estados vistos na ida, até o inicial
+    def test_step_back_to_cycle_zero_restores_initial_state(self):
+        simulator = load_program(BRANCHY_PROGRAM)
+        states = [machine_state(simulator)]
+        while not simulator.is_finished():
+            simulator.clock_tick()
+            states.append(machine_state(simulator))
+        while simulator.step_back():
+            self.assertEqual(machine_state(simulator), states[simulator.current_cycle])
+        self.assertEqual(simulator.current_cycle, 0)
+        self.assertFalse(simulator.can_step_back())
+
+    # instruction_states guarda o mesmo que o antigo dicionário ciclo -> estado de cada
+    # instância, montado aqui a partir do ROB no fim de cada ciclo, inclusive depois de
+    # voltar ciclos e executá-los de novo (linhas sobrescritas)
+    def test_instruction_states_match_rob_at_each_cycle(self):
+        simulator = load_program(BRANCHY_PROGRAM)
+        expected = {}
+        replayed = False
+        while not simulator.is_finished():
+            simulator.clock_tick()
+            for entry in simulator.reorder_buffer:
+                if entry.busy:
+                    expected.setdefault(entry.uop.seq, {})[simulator.current_cycle] = entry.state
+            if simulator.current_cycle == 120 and not replayed:
+                replayed = simulator.seek(90)
+
+        states = simulator.instruction_states
+        self.assertEqual(states.count, len(expected))
+        for seq, by_cycle in expected.items():
+            self.assertEqual(states.history(seq), sorted(by_cycle.items()))
+            for cycle, state in by_cycle.items():
+                self.assertEqual(states.state_at(seq, cycle), state)
+                self.assertIn(seq, states.instructions_in(state, cycle))
+
+    # seek com keyframes (para trás, para frente, entre e sobre keyframes) chega ao mesmo
+    # estado de uma execução nova parada no ciclo
+    def test_seek_with_keyframes_matches_fresh_run(self):
+        simulator = load_program(BRANCHY_PROGRAM, keyframe_interval=16)
+        simulator.run_to_completion()
+        last_cycle = simulator.current_cycle
+        for cycle in (100, 37, 48, 5, last_cycle, 0, 16):
+            self.assertTrue(simulator.seek(cycle))
+            fresh = load_program(BRANCHY_PROGRAM)
+            while fresh.current_cycle < cycle:
+                fresh.clock_tick()
+            self.assertEqual(machine_state(simulator), machine_state(fresh), f"ciclo {cycle}")
+
+    # Sem histórico os ciclos ociosos são pulados de uma vez (ROB de 2 entradas, cheio durante
+    # as operações longas); métricas, registradores, memória e estados saem iguais aos ciclo a ciclo
+    def test_headless_fast_forward_matches_run_with_history(self):
+        headless = load_program(BRANCHY_PROGRAM, record_history=False, record_states=True, rob_size=2)
+        ticks = 0
+        while not headless.is_finished():
+            headless.clock_tick()
+            ticks += 1
+        self.assertLess(ticks, headless.current_cycle)
+
+        recorded = load_program(BRANCHY_PROGRAM, rob_size=2)
+        recorded.run_to_completion()
+        self.assertEqual(machine_state(headless), machine_state(recorded))
+        states = recorded.instruction_states
+        self.assertEqual(len(headless.instruction_states), len(states))
+        for seq in range(states.count):
+            self.assertEqual(headless.instruction_states.history(seq), states.history(seq))
+
+
+# --- Memória ---
+class MemoryImageTest(unittest.TestCase):
+    # As palavras da imagem entram no índice junto com os endereços acessados pelo programa
+    def test_image_words_are_listed_with_accessed_addresses(self):
+        memory = Memory()
+        memory.store(2 * PAGE_SIZE, 9)
+        memory.store(8, 1)
+        with tempfile.NamedTemporaryFile('w', suffix=".hex", delete=False) as f:
+            f.write("01 02 03 04 05 06 07 08 09 0a 0b 0c\n@1ffe 00 00 02 00 00 00\n")
+        try:
+            self.assertEqual(memory.load_image(f.name, base=PAGE_SIZE), 18)
+        finally:
+            os.unlink(f.name)
+        memory.load(PAGE_SIZE + 4)
+        expected = [8, PAGE_SIZE, PAGE_SIZE + 4, PAGE_SIZE + 8, 2 * PAGE_SIZE, 3 * PAGE_SIZE - 4, 3 * PAGE_SIZE]
+        self.assertEqual(len(memory), len(expected))
+        self.assertEqual([addr for addr, _ in memory.items()], expected)
+        self.assertEqual(memory.addresses_at(2, 3), expected[2:5])
+        self.assertEqual(memory.index_of(PAGE_SIZE + 5), 3)
+        self.assertEqual(memory.get(2 * PAGE_SIZE), 9)
+        self.assertEqual(memory.get(3 * PAGE_SIZE), 2)
+
+    # Bytes fora de 00..ff ou que não são hexadecimais viram erro com arquivo, linha e token
+    def test_invalid_hex_token_is_reported(self):
+        for text, line, token in (("01 02\n03 100\n", 2, "100"), ("01 zz\n", 1, "zz"),
+                                  ("01\n@10g 02\n", 2, "@10g"), ("-1\n", 1, "-1")):
+            with tempfile.NamedTemporaryFile('w', suffix=".hex", delete=False) as f:
+                f.write(text)
+            try:
+                with self.assertRaises(ValueError) as raised:
+                    Memory().load_image(f.name)
+            finally:
+                os.unlink(f.name)
+            message = str(raised.exception)
+            self.assertIn(f"'{f.name}' linha {line}", message)
+            self.assertIn(f"'{token}'", message)
+
+
+# --- Trace compilado ---
+class TraceCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.source = os.path.join(self.directory.name, "trace.txt")
+        with open(self.source, 'w') as f:
+            f.write("ADD R3, R1, R2\nSLLI R4, R3, 2\n")
+
+    # Mudar o formato de um opcode invalida a cópia em cache: o trace é recompilado
+    def test_cache_is_rebuilt_for_another_decoder(self):
+        open_trace(self.source, OPCODE_TABLE).close()
+        table = dict(OPCODE_TABLE)
+        table["SLLI"] = table["SLLI"]._replace(operand_format="R")
+        reader = open_trace(self.source, table)
+        try:
+            self.assertEqual(reader.read(1), ("SLLI", "R4", "R3", "2", None, None))
+        finally:
+            reader.close()
+
+    def test_stale_compiled_trace_is_rejected(self):
+        compiled = os.path.join(self.directory.name, "trace.trc")
+        compile_trace(self.source, compiled, OPCODE_TABLE)
+        table = dict(OPCODE_TABLE)
+        table["SLLI"] = table["SLLI"]._replace(operand_format="R")
+        with self.assertRaises(ValueError):
+            CompiledTraceReader(compiled, table)
+
+    # Streaming com janela pequena (instruções descartadas e decodificadas de novo depois dos
+    # flushes), lendo o texto, compilando e depois reabrindo o .trc: mesmo resultado da carga inteira
+    def test_streamed_trace_matches_eager_load(self):
+        with open(self.source, 'w') as f:
+            f.write("\n".join(BRANCHY_PROGRAM) + "\n")
+        expected = load_program(BRANCHY_PROGRAM, record_history=False, predictor="taken")
+        expected.run_to_completion()
+        for use_cache, reader_class in ((False, TraceReader), (True, CompiledTraceReader), (True, CompiledTraceReader)):
+            simulator = TomasuloSimulator(record_history=False, verbose=False, predictor="taken")
+            self.assertTrue(simulator.load_instructions(self.source, stream=True, window_size=8, use_cache=use_cache))
+            try:
+                self.assertIsInstance(simulator.trace, reader_class)
+                simulator.apply_initial_state()
+                simulator.run_to_completion()
+            finally:
+                simulator.close_trace()
+            self.assertEqual(machine_state(simulator), machine_state(expected))
+
+
+# --- Cache de resultados ---
+# Processo da varredura gravando entradas próprias no mesmo cache
+def _fill_cache(args):
+    directory, prefix, count = args
+    cache = ResultCache(directory, max_bytes=200)
+    for i in range(count):
+        cache.put(f"{prefix}{i}", {"v": i})
+
+
+class ResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+
+    def entries(self):
+        return sorted(name for name in os.listdir(self.directory.name) if name.endswith(".json"))
+
+    # Uma leitura conta como uso: a entrada lida sobrevive e a mais antiga é descartada
+    def test_evicts_least_recently_used(self):
+        cache = ResultCache(self.directory.name, max_bytes=20)
+        cache.put("a", {"v": 1})
+        cache.put("b", {"v": 2})
+        # mtimes distintos mesmo em sistemas de arquivos com relógio grosso
+        os.utime(os.path.join(self.directory.name, "a.json"), ns=(10 ** 9, 10 ** 9))
+        os.utime(os.path.join(self.directory.name, "b.json"), ns=(2 * 10 ** 9, 2 * 10 ** 9))
+        self.assertEqual(cache.get("a"), {"v": 1})
+        cache.put("c", {"v": 3})
+        self.assertEqual(self.entries(), ["a.json", "c.json"])
+        self.assertIsNone(cache.get("b"))
+
+    # O limite vale para o diretório, não para cada processo que grava nele
+    def test_size_bound_is_shared_between_processes(self):
+        with multiprocessing.Pool(2) as pool:
+            pool.map(_fill_cache, [(self.directory.name, "p", 40), (self.directory.name, "q", 40)])
+        sizes = [os.path.getsize(os.path.join(self.directory.name, name)) for name in self.entries()]
+        self.assertLessEqual(sum(sizes), 200)
+        with open(os.path.join(self.directory.name, SIZE_FILE)) as f:
+            self.assertEqual(int(f.read()), sum(sizes))
+        ResultCache(self.directory.name).clear()
+        self.assertEqual(self.entries(), [])
+
+
+# --- Traces sintéticos ---
+class TraceGenTest(unittest.TestCase):
+    # O prólogo dá valor a todos os registradores de destino antes das instruções sorteadas
+    def test_prologue_initializes_destination_registers(self):
+        simulator = run_program(list(generate_trace(0, registers=4)))
+        values = register_values(simulator)
+        self.assertEqual([values[f"R{n}"] for n in range(3, 7)], [10, 15, 20, 25])
+
+
+# --- Linha do tempo ---
+class TimelineTest(unittest.TestCase):
+    def setUp(self):
+        self.directory = tempfile.TemporaryDirectory()
+        self.addCleanup(self.directory.cleanup)
+        self.source = os.path.join(self.directory.name, "trace.txt")
+        with open(self.source, 'w') as f:
+            f.write("\n".join(BRANCHY_PROGRAM) + "\n")
+        self.expected = run_trace(self.source, use_cache=False, predictor="taken")
+
+    # Simula com o gravador do formato; devolve o gravador (já fechado)
+    def record(self, filename):
+        with open_timeline(os.path.join(self.directory.name, filename)) as recorder:
+            result = run_trace(self.source, use_cache=False, predictor="taken", timeline=recorder)
+        self.assertEqual(result, self.expected)
+        return recorder
+
+    # Gravar não muda a simulação; cada instância tem um bloco de commit ou um squash
+    def test_chrome_trace_has_every_instance(self):
+        recorder = self.record("timeline.json")
+        with open(recorder.file.name) as f:
+            events = json.load(f)
+        committed = [event["args"]["seq"] for event in events
+                     if event["ph"] == "X" and event["name"].startswith("Commit: ") and event["cat"] == "pipeline"]
+        squashed = [event["args"]["seq"] for event in events if event["ph"] == "i" and event["name"].startswith("Squash: ")]
+        self.assertEqual(len(committed), self.expected["Committed Instructions"])
+        self.assertGreater(len(squashed), 0)
+        self.assertEqual(sorted(committed + squashed), list(range(recorder.next_seq)))
+        self.assertTrue(all(event["dur"] > 0 for event in events if event["ph"] == "X"))
+
+    # No Konata cada instância começa (I) e termina (R) uma vez, com os ciclos sempre avançando
+    def test_konata_log_has_every_instance(self):
+        recorder = self.record("timeline.log")
+        with open(recorder.file.name) as f:
+            lines = [line.rstrip("\n").split("\t") for line in f]
+        self.assertEqual(lines[0], ["Kanata", "0004"])
+        started = [int(fields[1]) for fields in lines if fields[0] == "I"]
+        retired = [int(fields[1]) for fields in lines if fields[0] == "R" and fields[3] == "0"]
+        flushed = [int(fields[1]) for fields in lines if fields[0] == "R" and fields[3] == "1"]
+        self.assertEqual(started, list(range(recorder.next_seq)))
+        self.assertEqual(len(retired), self.expected["Committed Instructions"])
+        self.assertEqual(sorted(retired + flushed), started)
+        self.assertTrue(all(int(fields[1]) > 0 for fields in lines if fields[0] == "C"))
+
+
+# --- Varredura ---
+class SweepTest(unittest.TestCase):
+    # Um trace inválido vira uma linha com Error; os outros pontos continuam sendo simulados
+    def test_failing_point_does_not_abort_sweep(self):
+        with tempfile.TemporaryDirectory() as directory:
+            good = os.path.join(directory, "good.txt")
+            bad = os.path.join(directory, "bad.txt")
+            output = os.path.join(directory, "sweep.csv")
+            with open(good, 'w') as f:
+                f.write("ADD R3, R1, R2\n")
+            with open(bad, 'w') as f:
+                f.write("ADD R3\n")
+            configs = [dict(DEFAULT_CONFIG, rob_size=4), dict(DEFAULT_CONFIG, rob_size=8)]
+            self.assertEqual(sweep([bad, good], configs, output, processes=2), 4)
+            with open(output, newline='') as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 4)
+        for row in rows:
+            if row["Trace"] == bad:
+                self.assertTrue(row["Error"])
+            else:
+                self.assertFalse(row["Error"])
+                self.assertEqual(row["Committed Instructions"], "1")
+
+    # Retomar a varredura refaz os pontos que falharam e troca a linha de erro pelo resultado
+    def test_resume_retries_failed_points(self):
+        with tempfile.TemporaryDirectory() as directory:
+            trace = os.path.join(directory, "trace.txt")
+            output = os.path.join(directory, "sweep.csv")
+            with open(trace, 'w') as f:
+                f.write("ADD R3\n")
+            configs = [dict(DEFAULT_CONFIG, rob_size=4), dict(DEFAULT_CONFIG, rob_size=8)]
+            self.assertEqual(sweep([trace], configs, output, processes=1), 2)
+            with open(trace, 'w') as f:
+                f.write("ADD R3, R1, R2\n")
+            self.assertEqual(sweep([trace], configs, output, processes=1), 2)
+            self.assertEqual(sweep([trace], configs, output, processes=1), 0)
+            with open(output, newline='') as f:
+                rows = list(csv.DictReader(f))
+        self.assertEqual(len(rows), 2)
+        for row in rows:
+            self.assertFalse(row["Error"])
+            self.assertEqual(row["Committed Instructions"], "1")
+
+
+if __name__ == "__main__":
+    unittest.main()
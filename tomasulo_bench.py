@@ -0,0 +1,210 @@
+# --- Benchmark do simulador ---
+#
+# Gera uma suíte fixa de traces sintéticos (tomasulo_tracegen, sementes fixas),
+# simula cada um num processo novo e mede a vazão do simulador (ciclos e
+# instruções confirmadas por segundo de run_to_completion), o pico de memória do
+# processo e o IPC modelado. O resultado pode ser gravado como baseline JSON e
+# comparado em execuções futuras: queda de vazão acima da tolerância ou mudança
+# nos ciclos/IPC simulados são apontadas e o código de saída é diferente de zero.
+#
+#   python tomasulo_bench.py --save bench_baseline.json
+#   python tomasulo_bench.py --compare bench_baseline.json
+#   python tomasulo_bench.py --mem-rs 1 --add-rs 1 --logic-rs 1 --mult-rs 1 --rob-size 4
+
+import argparse
+import hashlib
+import json
+import multiprocessing
+import os
+import platform
+import sys
+import time
+
+try:
+    import resource
+except ImportError:
+    # Windows: sem getrusage, o pico de memória não é medido
+    resource = None
+
+from tomasulo_tracegen import TRACEGEN_VERSION, write_trace
+
+BENCH_VERSION = 3
+DEFAULT_TRACE_DIR = ".tomasulo_cache/bench"
+
+# Nome -> parâmetros de generate_trace (o restante fica no DEFAULT_PROFILE)
+BENCH_SUITE = {
+    "mix":         {},
+    "dep_chain":   {"dep_distance": 1},
+    "independent": {"dep_distance": 16, "registers": 32, "branch_rate": 0.0},
+    "branchy":     {"branch_rate": 0.25, "taken_rate": 0.5},
+    "mul_heavy":   {"mix": {"alu": 1, "mul": 3}},
+    "mem_seq":     {"mix": {"alu": 1, "load": 3, "store": 2}, "mem_pattern": "sequential"},
+    "mem_random":  {"mix": {"alu": 1, "load": 3, "store": 2}, "mem_pattern": "random", "footprint": 1 << 20},
+}
+
+
+def _trace_path(trace_dir, name, length):
+    return os.path.join(trace_dir, f"{name}_{length}_v{TRACEGEN_VERSION}.txt")
+
+
+def _file_digest(path):
+    digest = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b""):
+            digest.update(block)
+    return digest.hexdigest()
+
+
+# Pico de memória residente do processo atual, em MB
+def _peak_rss_mb():
+    if resource is None:
+        return None
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    # ru_maxrss é em KB no Linux e em bytes no macOS
+    return peak / (1024 * 1024) if sys.platform == "darwin" else peak / 1024
+
+
+# Executado num processo novo por trace, para que o pico de memória seja só deste trace.
+# Mede o melhor de repeat execuções; a carga do trace fica fora do tempo
+def _bench_point(point):
+    from tomasulo_sim import TomasuloSimulator
+
+    path, repeat, record_history, sim_config = point
+    best = None
+    for _ in range(repeat):
+        simulator = TomasuloSimulator(record_history=record_history, verbose=False, **sim_config)
+        simulator.load_instructions(path, stream=not record_history)
+        simulator.apply_initial_state()
+        start = time.perf_counter()
+        simulator.run_to_completion()
+        elapsed = time.perf_counter() - start
+        simulator.close_trace()
+        if best is None or elapsed < best:
+            best = elapsed
+    metrics = simulator.get_metrics()
+    return {
+        "Total Cycles": metrics["Total Cycles"],
+        "Committed Instructions": metrics["Committed Instructions"],
+        "IPC": metrics["IPC"],
+        "seconds": best,
+        "cycles_per_sec": metrics["Total Cycles"] / best if best else None,
+        "insts_per_sec": metrics["Committed Instructions"] / best if best else None,
+        "peak_rss_mb": _peak_rss_mb(),
+    }
+
+
+# Gera os traces que faltam e roda a suíte; devolve o dicionário gravado no baseline.
+# sim_config: parâmetros de TomasuloSimulator (RS por UF, tamanho do ROB...)
+def run_suite(names=None, length=20000, repeat=3, record_history=False, trace_dir=DEFAULT_TRACE_DIR,
+              sim_config=None):
+    sim_config = dict(sim_config or {})
+    os.makedirs(trace_dir, exist_ok=True)
+    context = multiprocessing.get_context("spawn")
+    results = {}
+    for seed, (name, profile) in enumerate(BENCH_SUITE.items()):
+        if names and name not in names:
+            continue
+        path = _trace_path(trace_dir, name, length)
+        if not os.path.exists(path):
+            write_trace(path, length, seed, **profile)
+        with context.Pool(1) as pool:
+            result = pool.apply(_bench_point, ((path, repeat, record_history, sim_config),))
+        result["trace_sha256"] = _file_digest(path)
+        results[name] = result
+        print(_format_row(name, result), file=sys.stderr)
+    return {
+        "version": BENCH_VERSION,
+        "python": platform.python_version(),
+        "implementation": platform.python_implementation(),
+        "machine": platform.machine(),
+        "length": length,
+        "record_history": record_history,
+        "config": sim_config,
+        "results": results,
+    }
+
+
+def _format_row(name, result):
+    rss = f"{result['peak_rss_mb']:8.1f}" if result["peak_rss_mb"] is not None else "       -"
+    return (f"{name:<12} {result['Total Cycles']:>9} {result['Committed Instructions']:>9} "
+            f"{result['IPC']:6.3f} {result['cycles_per_sec']:>10.0f} {result['insts_per_sec']:>10.0f} {rss}")
+
+
+# Compara com um baseline; devolve a lista de problemas encontrados (vazia = ok)
+def compare(current, baseline, tolerance=0.15):
+    problems = []
+    if baseline.get("version") != BENCH_VERSION:
+        return [f"baseline na versão {baseline.get('version')} (atual: {BENCH_VERSION})"]
+    setup = ("length", "record_history", "config")
+    if any(current[key] != baseline[key] for key in setup):
+        return ["baseline gerado com " + " ".join(f"{key}={baseline[key]}" for key in setup)]
+    for name, result in current["results"].items():
+        base = baseline["results"].get(name)
+        if base is None:
+            continue
+        if base["trace_sha256"] != result["trace_sha256"]:
+            problems.append(f"{name}: trace diferente do baseline (gerador mudou)")
+            continue
+        if (base["Total Cycles"], base["Committed Instructions"]) != (
+                result["Total Cycles"], result["Committed Instructions"]):
+            problems.append(f"{name}: ciclos/instruções simulados mudaram "
+                            f"({base['Total Cycles']}/{base['Committed Instructions']} -> "
+                            f"{result['Total Cycles']}/{result['Committed Instructions']})")
+        ratio = result["cycles_per_sec"] / base["cycles_per_sec"]
+        if ratio < 1 - tolerance:
+            problems.append(f"{name}: vazão caiu {100 * (1 - ratio):.1f}% "
+                            f"({base['cycles_per_sec']:.0f} -> {result['cycles_per_sec']:.0f} ciclos/s)")
+    return problems
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Benchmark do simulador Tomasulo com traces sintéticos.")
+    parser.add_argument("names", nargs="*", help=f"benchmarks a rodar (padrão: todos: {', '.join(BENCH_SUITE)})")
+    parser.add_argument("-n", "--length", type=int, default=20000, help="instruções por trace")
+    parser.add_argument("--repeat", type=int, default=3, help="execuções por trace (vale a mais rápida)")
+    parser.add_argument("--history", action="store_true",
+                        help="simula com histórico de ciclos (modo da GUI) em vez do modo headless")
+    parser.add_argument("--mem-rs", type=int, default=None)
+    parser.add_argument("--add-rs", type=int, default=None)
+    parser.add_argument("--logic-rs", type=int, default=None)
+    parser.add_argument("--mult-rs", type=int, default=None)
+    parser.add_argument("--rob-size", type=int, default=None,
+                        help="configuração simulada (padrão: a de TomasuloSimulator)")
+    parser.add_argument("--trace-dir", default=DEFAULT_TRACE_DIR, help="onde os traces gerados são guardados")
+    parser.add_argument("--save", default=None, metavar="JSON", help="grava os resultados como baseline")
+    parser.add_argument("--compare", default=None, metavar="JSON", help="compara com um baseline gravado")
+    parser.add_argument("--tolerance", type=float, default=0.15,
+                        help="queda de vazão tolerada na comparação (padrão 0.15 = 15%%)")
+    args = parser.parse_args(argv)
+
+    unknown = [name for name in args.names if name not in BENCH_SUITE]
+    if unknown:
+        parser.error(f"benchmark desconhecido: {', '.join(unknown)}")
+
+    print(f"{'trace':<12} {'ciclos':>9} {'instr.':>9} {'IPC':>6} {'ciclos/s':>10} {'instr./s':>10} {'RSS (MB)':>8}",
+          file=sys.stderr)
+    sim_config = {field: value for field, value in (
+        ("num_mem_rs", args.mem_rs), ("num_add_rs", args.add_rs), ("num_logic_rs", args.logic_rs),
+        ("num_mult_rs", args.mult_rs), ("rob_size", args.rob_size)) if value is not None}
+    current = run_suite(args.names, args.length, args.repeat, args.history, args.trace_dir, sim_config)
+    json.dump(current, sys.stdout, indent=2)
+    print()
+
+    if args.save:
+        with open(args.save, 'w') as f:
+            json.dump(current, f, indent=2)
+            f.write("\n")
+
+    if args.compare:
+        with open(args.compare) as f:
+            problems = compare(current, json.load(f), args.tolerance)
+        for problem in problems:
+            print(f"Regressão: {problem}", file=sys.stderr)
+        if problems:
+            return 1
+        print(f"Sem regressões em relação a {args.compare}", file=sys.stderr)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
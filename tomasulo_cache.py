@@ -0,0 +1,154 @@
+# --- Cache persistente de resultados ---
+#
+# Guarda o resultado de uma simulação (métricas de run_trace) em disco, indexado
+# pela impressão digital calculada por TomasuloSimulator.fingerprint: programa
+# decodificado + configuração da máquina + estado inicial. Uma execução repetida
+# devolve o resultado gravado sem simular.
+#
+# Cada entrada é um arquivo JSON no diretório do cache. Leituras atualizam o mtime
+# do arquivo, e quando o total passa de max_bytes os menos usados recentemente são
+# apagados (LRU). As escritas vão para um arquivo temporário renomeado no fim, então
+# vários processos (pool da varredura) podem usar o mesmo diretório ao mesmo tempo.
+#
+# O tamanho total fica no arquivo SIZE_FILE do diretório, que também é o lock
+# compartilhado pelos processos: cada put soma o tamanho da entrada com o lock
+# tomado, sem listar o diretório. Só quando o total passa de max_bytes o diretório é
+# varrido (ainda com o lock) e as entradas de mtime mais antigo são apagadas até
+# sobrar EVICT_TARGET de max_bytes; a varredura também corrige o total se arquivos
+# foram apagados por fora. Como a ordem vem do mtime, um uso em qualquer processo
+# conta para todos.
+
+import contextlib
+import json
+import os
+
+try:
+    import fcntl
+except ImportError:
+    # Windows: lock pelo msvcrt
+    fcntl = None
+    import msvcrt
+
+DEFAULT_CACHE_DIR = ".tomasulo_cache/results"
+SIZE_FILE = "size.lock"
+# Fração de max_bytes que sobra depois de um descarte (folga até a próxima varredura)
+EVICT_TARGET = 0.9
+
+
+# Lock exclusivo entre processos sobre o arquivo aberto (liberado ao sair do bloco)
+@contextlib.contextmanager
+def _file_lock(path):
+    with open(path, 'a+b') as f:
+        if fcntl is not None:
+            fcntl.flock(f.fileno(), fcntl.LOCK_EX)
+        else:
+            f.seek(0)
+            msvcrt.locking(f.fileno(), msvcrt.LK_LOCK, 1)
+        try:
+            yield f
+        finally:
+            if fcntl is None:
+                f.seek(0)
+                msvcrt.locking(f.fileno(), msvcrt.LK_UNLCK, 1)
+
+
+# --- Classe ResultCache ---
+class ResultCache:
+    def __init__(self, directory=DEFAULT_CACHE_DIR, max_bytes=64 * 1024 * 1024):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        os.makedirs(directory, exist_ok=True)
+        self.size_path = os.path.join(directory, SIZE_FILE)
+
+    def _path(self, key):
+        return os.path.join(self.directory, key + ".json")
+
+    def get(self, key):
+        path = self._path(key)
+        try:
+            with open(path, 'r') as f:
+                value = json.load(f)
+            os.utime(path)
+        except (FileNotFoundError, ValueError):
+            # Ausente, removida por outro processo durante a leitura ou corrompida
+            return None
+        return value
+
+    def put(self, key, value):
+        path = self._path(key)
+        tmp = f"{path}.{os.getpid()}.tmp"
+        try:
+            with open(tmp, 'w') as f:
+                json.dump(value, f)
+            size = os.path.getsize(tmp)
+            with _file_lock(self.size_path) as lock:
+                total = self._read_total(lock)
+                if total is not None:
+                    try:
+                        # Regravar uma chave troca o tamanho antigo pelo novo
+                        total -= os.path.getsize(path)
+                    except FileNotFoundError:
+                        pass
+                    total += size
+                os.replace(tmp, path)
+                if total is None or total > self.max_bytes:
+                    total = self._evict()
+                self._write_total(lock, total)
+        finally:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+
+    # Total gravado no arquivo de lock, ou None se ainda não existe (diretório novo) ou está ilegível
+    def _read_total(self, lock):
+        lock.seek(0)
+        try:
+            return int(lock.read())
+        except ValueError:
+            return None
+
+    def _write_total(self, lock, total):
+        lock.seek(0)
+        lock.truncate()
+        lock.write(str(total).encode())
+        lock.flush()
+
+    # Com o lock tomado: apaga as entradas usadas há mais tempo (mtime) até o cache caber
+    # em EVICT_TARGET * max_bytes; devolve o total que sobrou
+    def _evict(self):
+        entries = []
+        total = 0
+        with os.scandir(self.directory) as it:
+            for entry in it:
+                if not entry.name.endswith(".json"):
+                    continue
+                try:
+                    st = entry.stat()
+                except FileNotFoundError:
+                    continue
+                entries.append((st.st_mtime_ns, st.st_size, entry.path))
+                total += st.st_size
+        if total <= self.max_bytes:
+            return total
+
+        target = self.max_bytes * EVICT_TARGET
+        entries.sort()
+        for _, size, path in entries:
+            if total <= target:
+                break
+            try:
+                os.remove(path)
+            except FileNotFoundError:
+                pass
+            total -= size
+        return total
+
+    def clear(self):
+        with _file_lock(self.size_path) as lock:
+            with os.scandir(self.directory) as it:
+                for entry in it:
+                    if entry.name.endswith(".json"):
+                        try:
+                            os.remove(entry.path)
+                        except FileNotFoundError:
+                            pass
+            self._write_total(lock, 0)
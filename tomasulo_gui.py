@@ -0,0 +1,552 @@
+import tkinter as tk
+from tkinter import ttk, scrolledtext, messagebox
+import os
+import threading
+import time
+
+from tomasulo_sim import TomasuloSimulator, PREDICT_TAKEN, PREDICT_NOT_TAKEN, STALL_METRICS, BRANCH_METRICS
+
+# "Executar Tudo": a tela é redesenhada no máximo a esta taxa enquanto a simulação roda
+FRAME_INTERVAL_MS = 1000 // 30
+# Ciclos simulados por vez com o lock do simulador; entre um lote e outro a tela pode redesenhar
+RUN_BATCH_CYCLES = 256
+
+# Linhas por página da tabela de memória
+MEM_PAGE_SIZE = 32
+
+# --- Classe TomasuloGUI ---
+class TomasuloGUI:
+    def __init__(self, master, simulator):
+        self.master = master
+        self.master.title("Simulador Tomasulo")
+        self.simulator = simulator
+        self.running_auto = False
+        # "Executar Tudo" roda a simulação numa thread; o lock protege o simulador
+        # entre um clock_tick da thread e o redesenho da tela
+        self.run_thread = None
+        self.sim_lock = threading.Lock()
+        self.stop_event = threading.Event()
+        self.frame_event = threading.Event()
+        self.cycles_per_frame = 0
+        self.max_cycle_seen = 0 # Limite do slider de ciclos
+        # Último conteúdo exibido em cada Treeview (id do item -> valores), ver _sync_tree
+        self.rendered_rows = {}
+        # Posição (no índice de endereços acessados) da primeira linha da página de memória
+        self.mem_page_start = 0
+
+        self._create_dummy_instructions_file()
+
+        self.setup_ui()
+        self.load_initial_program()
+
+    def _create_dummy_instructions_file(self):
+        filename = "instructions.txt"
+        if os.path.exists(filename) and os.path.getsize(filename) > 0:
+            return
+
+        with open(filename, "w") as f:
+            f.write("""
+# --- Teste de Previsao de Branch: Tomado (TAKEN) - Cenário de Misprediction ---
+ADD R3, R1, R2          # R3 = 5 + 5 = 10
+SUB R4, R3, R1          # R4 = 10 - 5 = 5
+SUB R3, R3, R2          # R3 = 5 - 5 = 0
+ADD R4, R3, R0          # R4 = 0 + 0 = 0
+BEQ R4, R0, 7           # R4 (0) == R0 (0) --> DESVIA (TAKEN). Previsao NOT_TAKEN INCORRETA.
+ADD R5, R1, R2          # Caminho SEQUENCIAL (sera limpo) - indice 5
+MUL R5, R5, R0          # Caminho SEQUENCIAL (sera limpo) - indice 6
+SUB R5, R1, R0          # Caminho do DESVIO (CORRETO) - indice 7
+DIV R6, R1, R2          # Continua - indice 8
+""")
+
+    def setup_ui(self):
+
+        
+        self.master.grid_rowconfigure(0, weight=0) # Controles
+        self.master.grid_rowconfigure(1, weight=0) # ROB
+        self.master.grid_rowconfigure(2, weight=1) # Resto do Conteúdo
+        
+        # Colunas da área principal (Row 2)
+        self.master.grid_columnconfigure(0, weight=3) # Esquerda (Main: RS, Regs, Mem)
+        self.master.grid_columnconfigure(1, weight=1) # Direita (Sidebar: Métricas, Trace)
+
+        # =================================================================
+        # 1. LINHA 0: BARRA DE CONTROLE (BOTÕES)
+        # =================================================================
+        control_frame = ttk.Frame(self.master, padding="5", relief="groove")
+        control_frame.grid(row=0, column=0, columnspan=2, sticky="ew", padx=5, pady=5)
+        
+        btn_container = ttk.Frame(control_frame)
+        btn_container.pack(anchor="center")
+
+        self.prev_cycle_button = ttk.Button(btn_container, text="⏪ Ciclo Anterior", command=self.prev_cycle, state="disabled")
+        self.prev_cycle_button.pack(side="left", padx=5)
+
+        self.next_cycle_button = ttk.Button(btn_container, text="Próximo Ciclo ⏩", command=self.next_cycle)
+        self.next_cycle_button.pack(side="left", padx=5)
+
+        self.run_all_button = ttk.Button(btn_container, text="▶ Executar Tudo", command=self.run_all)
+        self.run_all_button.pack(side="left", padx=5)
+
+        ttk.Label(btn_container, text="Ciclos/quadro (0 = máx.):").pack(side="left", padx=(10, 2))
+        self.cycles_per_frame_var = tk.StringVar(value="0")
+        self.cycles_per_frame_spin = ttk.Spinbox(btn_container, from_=0, to=100000, width=7,
+                                                 textvariable=self.cycles_per_frame_var)
+        self.cycles_per_frame_spin.pack(side="left", padx=(0, 10))
+
+        self.reset_button = ttk.Button(btn_container, text="🔄 Reiniciar", command=self.reset_simulation)
+        self.reset_button.pack(side="left", padx=5)
+        
+        self.load_program_button = ttk.Button(btn_container, text="📂 Carregar Programa", command=self.load_initial_program)
+        self.load_program_button.pack(side="left", padx=5)
+
+        # Slider de ciclos: volta (ou avança) para qualquer ciclo já simulado
+        slider_container = ttk.Frame(control_frame)
+        slider_container.pack(fill="x", pady=(5, 0))
+        ttk.Label(slider_container, text="Ciclo:").pack(side="left", padx=5)
+        self.cycle_slider = tk.Scale(slider_container, from_=0, to=0, orient="horizontal", resolution=1)
+        self.cycle_slider.pack(side="left", fill="x", expand=True, padx=5)
+        self.cycle_slider.bind("<ButtonRelease-1>", self.seek_cycle)
+
+        # =================================================================
+        # 2. LINHA 1: ROB (BUFFER DE REORDENAÇÃO) - PERTO DOS BOTÕES
+        # =================================================================
+        rob_frame = ttk.LabelFrame(self.master, text="Buffer de Reordenação (ROB)", padding="5")
+        rob_frame.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=5, pady=(0, 5))
+        # Altura fixa sugerida ou peso pequeno para não ocupar tudo
+        
+        self.rob_tree = self._create_treeview(rob_frame, 
+            ["ID", "Ocupado", "Instrucao", "Estado", "Reg. Dest.", "Valor", "Tipo", "Previsto", "Real"],
+            {"ID": 30, "Ocupado": 60, "Instrucao": 180, "Estado": 90, "Reg. Dest.": 70, "Valor": 60, "Tipo": 60, "Previsto": 60, "Real": 60}
+        )
+        self.rob_tree.configure(height=8) # Limita a altura visual inicial para não empurrar tudo
+        self.rob_tree.pack(fill="both", expand=True)
+
+        # =================================================================
+        # 3. LINHA 2, COLUNA 1 (DIREITA): SIDEBAR (MÉTRICAS E TRACE)
+        # =================================================================
+        sidebar_frame = ttk.Frame(self.master, padding="0")
+        sidebar_frame.grid(row=2, column=1, sticky="nsew", padx=5, pady=5)
+        sidebar_frame.grid_rowconfigure(1, weight=1) # Trace expande
+        sidebar_frame.grid_columnconfigure(0, weight=1)
+
+        # 3A. Métricas (Topo da Sidebar)
+        metrics_frame = ttk.LabelFrame(sidebar_frame, text="Métricas", padding="5")
+        metrics_frame.grid(row=0, column=0, sticky="ew", pady=(0, 5))
+        
+        self.metrics_labels = {}
+        metrics_order = ["Total Cycles", "Committed Instructions", "IPC", "Bubble Cycles", "Program Counter (PC)",
+                         *STALL_METRICS, "Branch Predictor", *BRANCH_METRICS]
+        
+        for i, metric in enumerate(metrics_order):
+            lbl_title = ttk.Label(metrics_frame, text=f"{metric}:", font=('Arial', 9, 'bold'))
+            lbl_title.grid(row=i, column=0, sticky="w", padx=2, pady=1)
+            
+            val_lbl = ttk.Label(metrics_frame, text="0", foreground="blue")
+            val_lbl.grid(row=i, column=1, sticky="e", padx=2, pady=1)
+            self.metrics_labels[metric] = val_lbl
+
+        # 3B. Trace de Instruções (Resto da Sidebar)
+        trace_frame = ttk.LabelFrame(sidebar_frame, text="Instruções (Trace)", padding="5")
+        trace_frame.grid(row=1, column=0, sticky="nsew")
+        
+        self.program_text = scrolledtext.ScrolledText(trace_frame, wrap=tk.WORD, width=30, height=20, state='disabled')
+        self.program_text.pack(fill="both", expand=True)
+
+        # 3C. Perfil por estágio do clock_tick (opcional, ver tomasulo_profile)
+        profile_frame = ttk.LabelFrame(sidebar_frame, text="Perfil por Estágio", padding="5")
+        profile_frame.grid(row=2, column=0, sticky="ew", pady=(5, 0))
+
+        profile_controls = ttk.Frame(profile_frame)
+        profile_controls.pack(side="bottom", fill="x")
+        self.profile_var = tk.BooleanVar(value=self.simulator.profiler is not None)
+        ttk.Checkbutton(profile_controls, text="Medir estágios", variable=self.profile_var,
+                        command=self.toggle_profiling).pack(side="left")
+        ttk.Button(profile_controls, text="Zerar", command=self.reset_profile).pack(side="right")
+
+        self.profile_tree = self._create_treeview(profile_frame, ["Estágio", "Chamadas", "Total (ms)", "%"],
+            {"Estágio": 120, "Chamadas": 60, "Total (ms)": 70, "%": 45})
+        self.profile_tree.configure(height=8)
+        self.profile_tree.pack(fill="both", expand=True)
+
+        # =================================================================
+        # 4. LINHA 2, COLUNA 0 (ESQUERDA): RESTANTE (RS, REGS, MEM)
+        # =================================================================
+        main_content_frame = ttk.Frame(self.master, padding="0")
+        main_content_frame.grid(row=2, column=0, sticky="nsew", padx=5, pady=5)
+        main_content_frame.grid_rowconfigure(0, weight=1) # RS
+        main_content_frame.grid_rowconfigure(1, weight=1) # Regs/Mem
+        main_content_frame.grid_columnconfigure(0, weight=1)
+
+        # 4A. Reservation Stations (RS)
+        rs_frame = ttk.LabelFrame(main_content_frame, text="Estações de Reserva (RS)", padding="5")
+        rs_frame.grid(row=0, column=0, sticky="nsew", pady=(0, 5))
+        
+        self.rs_tree = self._create_treeview(rs_frame,
+            ["Nome", "Ocupado", "Op", "Vj", "Vk", "Qj", "Qk", "ROB Dest."],
+            {"Nome": 60, "Ocupado": 60, "Op": 50, "Vj": 70, "Vk": 70, "Qj": 50, "Qk": 50, "ROB Dest.": 80}
+        )
+        self.rs_tree.pack(fill="both", expand=True)
+
+        # 4B. Registradores e Memória (Lado a Lado na parte inferior da área principal)
+        data_frame = ttk.Frame(main_content_frame)
+        data_frame.grid(row=1, column=0, sticky="nsew")
+        data_frame.grid_columnconfigure(0, weight=1)
+        data_frame.grid_columnconfigure(1, weight=1)
+        data_frame.grid_rowconfigure(0, weight=1)
+
+        # Registradores
+        reg_frame = ttk.LabelFrame(data_frame, text="Registradores")
+        reg_frame.grid(row=0, column=0, sticky="nsew", padx=(0, 2))
+        self.reg_tree = self._create_treeview(reg_frame,
+            ["Reg", "Val", "Tag", "Busy"],
+            {"Reg": 50, "Val": 60, "Tag": 50, "Busy": 50}
+        )
+        self.reg_tree.pack(fill="both", expand=True)
+
+        # Memória
+        mem_frame = ttk.LabelFrame(data_frame, text="Memória")
+        mem_frame.grid(row=0, column=1, sticky="nsew", padx=(2, 0))
+        self.mem_tree = self._create_treeview(mem_frame,
+            ["End.", "Valor"],
+            {"End.": 60, "Valor": 60}
+        )
+        self.mem_tree.tag_configure("dirty", background="#ffe9a8") # Escritos no último ciclo
+
+        # Paginação da memória: MEM_PAGE_SIZE endereços acessados por página
+        mem_nav = ttk.Frame(mem_frame)
+        mem_nav.pack(side="bottom", fill="x")
+        ttk.Button(mem_nav, text="◀", width=2, command=lambda: self.change_mem_page(-1)).pack(side="left")
+        self.mem_page_label = ttk.Label(mem_nav, text="")
+        self.mem_page_label.pack(side="left", padx=2)
+        ttk.Button(mem_nav, text="▶", width=2, command=lambda: self.change_mem_page(1)).pack(side="left")
+        self.mem_goto_var = tk.StringVar()
+        mem_goto = ttk.Entry(mem_nav, textvariable=self.mem_goto_var, width=7)
+        mem_goto.pack(side="right")
+        mem_goto.bind("<Return>", self.goto_mem_address)
+        ttk.Label(mem_nav, text="Ir p/ end.:").pack(side="right", padx=2)
+        self.mem_tree.pack(fill="both", expand=True)
+
+    def _create_treeview(self, parent_frame, columns, widths):
+        frame = ttk.Frame(parent_frame)
+        
+        tree = ttk.Treeview(parent_frame, columns=columns, show="headings")
+        for col in columns:
+            tree.heading(col, text=col)
+            tree.column(col, width=widths.get(col, 100), anchor="center")
+            
+        vsb = ttk.Scrollbar(parent_frame, orient="vertical", command=tree.yview)
+        tree.configure(yscrollcommand=vsb.set)
+        
+        vsb.pack(side="right", fill="y")
+
+        return tree
+
+    def load_initial_program(self):
+        self._stop_run()
+        self.simulator.reset_simulator()
+        if self.simulator.load_instructions():
+            self.program_text.config(state='normal')
+            self.program_text.delete(1.0, tk.END)
+            for idx, inst in enumerate(self.simulator.program_instructions):
+                self.program_text.insert(tk.END, f"[{idx}]: {inst}\n")
+            self.program_text.config(state='disabled')
+            self.initial_program_loaded = True
+            messagebox.showinfo("Sucesso", "Programa de instruções carregado com sucesso!")
+        else:
+            messagebox.showerror("Erro de Carregamento", self.simulator.load_error)
+            self.initial_program_loaded = False
+        
+        self.simulator.apply_initial_state()
+        self.max_cycle_seen = 0
+        
+        self.update_gui()
+
+    def prev_cycle(self):
+        if not self.initial_program_loaded:
+            return
+        
+        self._stop_run()
+        if self.simulator.can_step_back():
+            self.simulator.seek(self.simulator.current_cycle - 1)
+            self.update_gui()
+        else:
+            messagebox.showinfo("Info", "Início da simulação alcançado.")
+
+    def seek_cycle(self, event=None):
+        if not self.initial_program_loaded:
+            return
+
+        self._stop_run()
+        self.simulator.seek(int(self.cycle_slider.get()))
+        self.update_gui()
+
+    def next_cycle(self):
+        if not self.initial_program_loaded:
+            messagebox.showwarning("Aviso", "Por favor, carregue um programa primeiro.")
+            return
+
+        self._stop_run()
+        if not self.simulator.is_finished():
+            self.simulator.clock_tick()
+            self.update_gui()
+            if self.simulator.is_finished():
+                messagebox.showinfo("Simulação Concluída", "Todas as instruções foram processadas!")
+                self.running_auto = False 
+        else:
+            messagebox.showinfo("Simulação Concluída", "Todas as instruções já foram processadas!")
+            self.running_auto = False
+
+    # Alterna entre executar até o fim e pausar
+    def run_all(self):
+        if not self.initial_program_loaded:
+            messagebox.showwarning("Aviso", "Por favor, carregue um programa primeiro.")
+            return
+        if self.running_auto:
+            self._stop_run()
+            self.update_gui()
+            return
+        if self.simulator.is_finished():
+            messagebox.showinfo("Simulação Concluída", "Todas as instruções já foram processadas!")
+            return
+
+        self.running_auto = True
+        self.run_all_button.config(text="⏸ Pausar")
+        self.stop_event.clear()
+        self._read_cycles_per_frame()
+        self.run_thread = threading.Thread(target=self._run_all_cycles, daemon=True)
+        self.run_thread.start()
+        self.master.after(FRAME_INTERVAL_MS, self._poll_run)
+
+    # Thread de simulação: avança sem esperar pela tela, no máximo cycles_per_frame
+    # ciclos por quadro (0 = sem limite), em lotes de RUN_BATCH_CYCLES com o lock
+    def _run_all_cycles(self):
+        ticks = 0
+        while not self.stop_event.is_set():
+            batch = RUN_BATCH_CYCLES
+            if self.cycles_per_frame:
+                if ticks >= self.cycles_per_frame:
+                    self.frame_event.wait()
+                    self.frame_event.clear()
+                    ticks = 0
+                    continue
+                batch = min(batch, self.cycles_per_frame - ticks)
+            with self.sim_lock:
+                for _ in range(batch):
+                    if self.simulator.is_finished():
+                        return
+                    self.simulator.clock_tick()
+            ticks += batch
+            # Solta o GIL para a thread da interface pegar o lock, se estiver esperando
+            time.sleep(0)
+
+    # Redesenho periódico (thread da interface) enquanto a simulação roda
+    def _poll_run(self):
+        if not self.running_auto:
+            return
+        self._read_cycles_per_frame()
+        with self.sim_lock:
+            self.update_gui()
+        self.frame_event.set()
+
+        if self.run_thread.is_alive():
+            self.master.after(FRAME_INTERVAL_MS, self._poll_run)
+            return
+        self._stop_run()
+        self.update_gui()
+        if self.simulator.is_finished():
+            messagebox.showinfo("Simulação Concluída", "Todas as instruções foram processadas!")
+
+    def _read_cycles_per_frame(self):
+        try:
+            self.cycles_per_frame = max(0, int(self.cycles_per_frame_var.get()))
+        except ValueError:
+            pass
+
+    # Interrompe a thread de "Executar Tudo" (se estiver rodando) e espera o ciclo em andamento
+    def _stop_run(self):
+        self.running_auto = False
+        if self.run_thread is not None:
+            self.stop_event.set()
+            self.frame_event.set()
+            self.run_thread.join()
+            self.run_thread = None
+        if hasattr(self, 'run_all_button'):
+            self.run_all_button.config(text="▶ Executar Tudo")
+
+    # Liga/desliga a instrumentação (entre dois ciclos, inclusive com "Executar Tudo" rodando)
+    def toggle_profiling(self):
+        with self.sim_lock:
+            if self.profile_var.get():
+                self.simulator.enable_profiling()
+            else:
+                self.simulator.disable_profiling()
+            self._update_profile_view()
+
+    def reset_profile(self):
+        with self.sim_lock:
+            if self.simulator.profiler is not None:
+                self.simulator.profiler.reset()
+            self._update_profile_view()
+
+    def _update_profile_view(self):
+        profiler = self.simulator.profiler
+        rows = profiler.summary() if profiler is not None else ()
+        self._sync_tree(self.profile_tree, ((f"prof{stage}", (stage, calls, f"{1000 * total:.1f}", f"{share:.1f}"))
+                                            for stage, calls, total, _, share in rows))
+
+    def reset_simulation(self):
+        self._stop_run()
+        self.simulator.reset_simulator()
+        self.load_initial_program()
+        messagebox.showinfo("Reiniciar", "Simulação reiniciada.")
+
+    # Atualiza a tabela a partir de linhas (id estável, valores) na ordem de exibição.
+    # tags (id -> tags) marca algumas linhas; já são aplicadas ao inserir a linha.
+    # Só linhas novas, removidas ou com algum valor ou tag diferente do último render geram chamadas ao Tk
+    def _sync_tree(self, tree, rows, tags=None):
+        rendered = self.rendered_rows.setdefault(str(tree), {})
+        tags = tags or {}
+        rows = [(iid, (tuple(str(v) for v in values), tags.get(iid, ()))) for iid, values in rows]
+
+        current = {iid for iid, _ in rows}
+        for iid in [iid for iid in rendered if iid not in current]:
+            tree.delete(iid)
+            del rendered[iid]
+
+        for position, (iid, row) in enumerate(rows):
+            old = rendered.get(iid)
+            if old is None:
+                tree.insert("", position, iid=iid, values=row[0], tags=row[1])
+            elif old != row:
+                tree.item(iid, values=row[0], tags=row[1])
+            else:
+                continue
+            rendered[iid] = row
+
+    def change_mem_page(self, delta):
+        self.mem_page_start = max(0, self.mem_page_start + delta * MEM_PAGE_SIZE)
+        self._update_memory_view()
+
+    # Vai para a página que contém o primeiro endereço acessado >= o digitado
+    def goto_mem_address(self, event=None):
+        try:
+            addr = int(self.mem_goto_var.get(), 0)
+        except ValueError:
+            return
+        index = self.simulator.memory.index_of(addr)
+        self.mem_page_start = index - index % MEM_PAGE_SIZE
+        self._update_memory_view()
+
+    def _update_memory_view(self):
+        memory = self.simulator.memory
+        total = len(memory)
+        last_page_start = max(0, (total - 1) // MEM_PAGE_SIZE * MEM_PAGE_SIZE)
+        self.mem_page_start = min(self.mem_page_start, last_page_start)
+        page = memory.addresses_at(self.mem_page_start, MEM_PAGE_SIZE)
+
+        # Destaca os endereços escritos no último ciclo
+        dirty = {f"mem{addr}": ("dirty",) for addr in page if addr in memory.dirty}
+        self._sync_tree(self.mem_tree, ((f"mem{addr}", (f"End. {addr}", memory.get(addr))) for addr in page), dirty)
+
+        if total:
+            self.mem_page_label.config(text=f"{self.mem_page_start + 1}-{self.mem_page_start + len(page)} de {total}")
+        else:
+            self.mem_page_label.config(text="vazia")
+
+    def update_gui(self):
+        if hasattr(self, 'prev_cycle_button'):
+            if self.simulator.can_step_back():
+                self.prev_cycle_button.config(state="normal")
+            else:
+                self.prev_cycle_button.config(state="disabled")
+
+        if hasattr(self, 'cycle_slider'):
+            self.max_cycle_seen = max(self.max_cycle_seen, self.simulator.current_cycle)
+            self.cycle_slider.config(to=self.max_cycle_seen)
+            self.cycle_slider.set(self.simulator.current_cycle)
+
+        # Atualiza ROB
+        self._sync_tree(self.rob_tree, ((f"rob{entry.id}", (
+                entry.id,
+                "Sim" if entry.busy else "Não",
+                str(entry.uop) if entry.uop else "",
+                entry.state,
+                str(entry.destination_reg) if entry.destination_reg else "",
+                str(entry.value) if entry.value is not None else "",
+                entry.inst_type,
+                _taken_label(entry.predicted_taken),
+                # Desvio já resolvido com previsão errada: vai causar flush no commit
+                _taken_label(entry.actual_taken) + (" ✗" if entry.actual_taken is not None
+                                                   and entry.actual_taken != entry.predicted_taken else "")
+            )) for entry in self.simulator.reorder_buffer))
+        
+        # Atualiza RS
+        self._sync_tree(self.rs_tree, ((f"rs{rs.name}", (
+                rs.name,
+                "Sim" if rs.busy else "Não",
+                str(rs.op) if rs.op else "",
+                str(rs.Vj) if rs.Vj is not None else "",
+                str(rs.Vk) if rs.Vk is not None else "",
+                str(rs.Qj) if rs.Qj is not None else "",
+                str(rs.Qk) if rs.Qk is not None else "",
+                str(rs.destination_rob_id) if rs.destination_rob_id is not None else ""
+            )) for rs in self.simulator.reservation_stations))
+
+        # Atualiza Registradores
+        sorted_regs = sorted(self.simulator.register_file.values(), key=lambda r: r.name)
+        self._sync_tree(self.reg_tree, ((f"reg{reg.name}", (
+                reg.name,
+                str(reg.value),
+                str(reg.reorder_tag) if reg.reorder_tag is not None else "",
+                "Sim" if reg.busy else "Não"
+            )) for reg in sorted_regs))
+
+        # Atualiza Memória: só a página visível do índice de endereços acessados
+        self._update_memory_view()
+
+        if self.simulator.profiler is not None:
+            self._update_profile_view()
+
+        # Atualiza Métricas
+        metrics = self.simulator.get_metrics()
+        self.metrics_labels["Total Cycles"].config(text=str(metrics["Total Cycles"]))
+        self.metrics_labels["Committed Instructions"].config(text=str(metrics["Committed Instructions"]))
+        self.metrics_labels["IPC"].config(text=f"{metrics['IPC']:.2f}")
+        self.metrics_labels["Bubble Cycles"].config(text=str(metrics["Bubble Cycles"]))
+        self.metrics_labels["Program Counter (PC)"].config(text=str(self.simulator.program_counter))
+        for metric in STALL_METRICS:
+            self.metrics_labels[metric].config(text=str(metrics[metric]))
+        self.metrics_labels["Branch Predictor"].config(text=metrics["Branch Predictor"])
+        self.metrics_labels["Branches"].config(text=str(metrics["Branches"]))
+        self.metrics_labels["Branch Mispredictions"].config(text=str(metrics["Branch Mispredictions"]))
+        self.metrics_labels["Branch Accuracy"].config(text=f"{100 * metrics['Branch Accuracy']:.1f}%")
+        self.metrics_labels["MPKI"].config(text=f"{metrics['MPKI']:.2f}")
+        self.metrics_labels["Recovery Latency"].config(text=f"{metrics['Recovery Latency']:.2f}")
+
+        # Highlight na linha atual do código
+        self.program_text.config(state='normal')
+        for tag in self.program_text.tag_names():
+            if tag.startswith("state_") or tag == "highlight":
+                self.program_text.tag_remove(tag, "1.0", tk.END)
+
+        if self.simulator.program_counter < len(self.simulator.program_instructions):
+            line_number = self.simulator.program_counter + 1
+            self.program_text.tag_add("highlight", f"{line_number}.0", f"{line_number}.end")
+            self.program_text.tag_config("highlight", background="yellow")
+        
+        self.program_text.config(state='disabled')
+
+def _taken_label(value):
+    return "T" if value == PREDICT_TAKEN else ("NT" if value == PREDICT_NOT_TAKEN else "")
+
+def main(keyframe_interval=None, profile=False, predictor="not_taken", btb_size=64, early_recovery=False):
+    root = tk.Tk()
+    simulator_instance = TomasuloSimulator(keyframe_interval=keyframe_interval, predictor=predictor, btb_size=btb_size,
+                                           early_recovery=early_recovery)
+    if profile:
+        simulator_instance.enable_profiling()
+    gui = TomasuloGUI(root, simulator_instance)
+    root.mainloop()
+
+if __name__ == "__main__":
+    main()
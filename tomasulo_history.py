@@ -0,0 +1,114 @@
+# --- Histórico de ciclos baseado em diffs (undo log) ---
+#
+# Em vez de copiar o simulador inteiro a cada ciclo, cada clock_tick abre um
+# "frame" e as classes rastreadas (Tracked / TrackedDict) anotam nele o valor
+# ANTIGO de cada campo na primeira vez em que ele muda dentro do ciclo.
+# Voltar um ciclo é só reaplicar esses valores antigos.
+#
+# (O modo checkpoint, com keyframes a cada N ciclos, fica no próprio simulador:
+# ver TomasuloSimulator._capture_state.)
+
+# Marca campos/chaves que não existiam antes do ciclo (desfazer = remover)
+_MISSING = object()
+
+# Marca o conteúdo inteiro de uma lista/heap alterada in-place (ver touch)
+_CONTENTS = object()
+
+# Frame do ciclo sendo gravado; None quando não há gravação em andamento
+_current_frame = None
+
+
+def begin_frame():
+    global _current_frame
+    _current_frame = {}
+    _install_hooks()
+    return _current_frame
+
+
+# Fecha o frame e devolve as alterações como uma tupla compacta (alvo, chave, valor antigo)
+def end_frame():
+    global _current_frame
+    frame, _current_frame = _current_frame, None
+    if frame is None:
+        return None
+    _remove_hooks()
+    return tuple(frame.values())
+
+
+def _record(frame, target, key, old):
+    change_key = (id(target), key)
+    if change_key not in frame:
+        frame[change_key] = (target, key, old)
+
+
+# Listas alteradas in-place (append, heapq) não passam por __setitem__: quem altera
+# chama touch() antes, e uma cópia rasa do conteúdo entra no frame
+def touch(container):
+    frame = _current_frame
+    if frame is not None:
+        _record(frame, container, _CONTENTS, container.copy())
+
+
+# Restaura o estado anterior ao ciclo cujas alterações foram devolvidas por end_frame
+def undo_frame(changes):
+    for target, key, old in reversed(changes):
+        if key is _CONTENTS:
+            target[:] = old
+        elif isinstance(target, dict):
+            if old is _MISSING:
+                dict.pop(target, key, None)
+            else:
+                dict.__setitem__(target, key, old)
+        elif old is _MISSING:
+            object.__delattr__(target, key)
+        else:
+            object.__setattr__(target, key, old)
+
+
+# --- Classes rastreadas ---
+# Os ganchos de escrita só ficam instalados enquanto um frame está aberto; fora
+# disso (modo headless, GUI parada) as classes se comportam como objetos comuns.
+class Tracked:
+    __slots__ = ()
+
+
+class _TrackedItems:
+    pass
+
+
+class TrackedDict(_TrackedItems, dict):
+    pass
+
+
+# getattr em vez de __dict__: os registros do simulador usam __slots__
+def _tracked_setattr(self, name, value):
+    old = getattr(self, name, _MISSING)
+    if old is not value:
+        _record(_current_frame, self, name, old)
+    object.__setattr__(self, name, value)
+
+
+# Atribuição e remoção de chaves são as únicas operações de dict usadas durante um ciclo
+def _tracked_setitem(self, key, value):
+    old = dict.get(self, key, _MISSING)
+    if old is not value:
+        _record(_current_frame, self, key, old)
+    dict.__setitem__(self, key, value)
+
+
+def _tracked_delitem(self, key):
+    _record(_current_frame, self, key, dict.__getitem__(self, key))
+    dict.__delitem__(self, key)
+
+
+def _install_hooks():
+    Tracked.__setattr__ = _tracked_setattr
+    _TrackedItems.__setitem__ = _tracked_setitem
+    _TrackedItems.__delitem__ = _tracked_delitem
+
+
+def _remove_hooks():
+    del Tracked.__setattr__
+    del _TrackedItems.__setitem__
+    del _TrackedItems.__delitem__
+
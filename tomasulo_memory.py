@@ -0,0 +1,271 @@
+# --- Memória de dados do simulador ---
+#
+# Memória endereçada a byte, esparsa e paginada: cada página é um bytearray de
+# PAGE_SIZE bytes criado na primeira escrita; páginas nunca escritas valem zero
+# e não ocupam espaço. Palavras (LW/SW) têm 4 bytes little-endian com sinal;
+# LB estende o sinal do byte lido e SB grava só o byte menos significativo.
+#
+# Além do conteúdo, a memória mantém o índice ordenado dos endereços já acessados
+# (lidos ou escritos pelo programa ou pelo estado inicial) e o conjunto dos
+# endereços escritos no ciclo atual. A GUI monta a tabela paginando o índice e
+# destaca os endereços do conjunto "dirty", sem varrer a memória inteira.
+#
+# Uma imagem carregada em bloco não entra endereço a endereço no índice: cada página
+# guarda só a faixa (alinhada a palavra) que a imagem tocou, e as palavras dessas
+# faixas são intercaladas com os endereços acessados na hora de consultar o índice.
+
+import bisect
+import heapq
+import mmap
+import os
+import re
+from itertools import islice
+
+from tomasulo_history import Tracked, TrackedDict, touch
+
+PAGE_SIZE = 4096
+WORD_SIZE = 4
+
+
+# --- Classe Memory ---
+class Memory(Tracked):
+    def __init__(self):
+        # Número da página -> bytearray(PAGE_SIZE)
+        self.pages = TrackedDict()
+        # Endereços acessados, em ordem crescente (fora das faixas da imagem)
+        self.addresses = []
+        # Endereços escritos desde o último begin_cycle
+        self.dirty = set()
+        # Número da página -> (início, fim) da faixa carregada por load_image, em bytes
+        # dentro da página e alinhada a palavra
+        self.image_ranges = {}
+        self._index_image()
+
+    # Páginas com faixa da imagem, em ordem, e quantas palavras de imagem vêm antes de cada uma
+    def _index_image(self):
+        self.image_pages = sorted(self.image_ranges)
+        self.image_counts = [0]
+        for number in self.image_pages:
+            start, end = self.image_ranges[number]
+            self.image_counts.append(self.image_counts[-1] + (end - start) // WORD_SIZE)
+
+    def _in_image(self, addr):
+        page_number, offset = divmod(addr, PAGE_SIZE)
+        bounds = self.image_ranges.get(page_number)
+        return bounds is not None and offset % WORD_SIZE == 0 and bounds[0] <= offset < bounds[1]
+
+    # Quantas palavras das faixas da imagem ficam antes de addr
+    def _image_words_below(self, addr):
+        page_number, offset = divmod(addr, PAGE_SIZE)
+        k = bisect.bisect_left(self.image_pages, page_number)
+        count = self.image_counts[k]
+        if k < len(self.image_pages) and self.image_pages[k] == page_number:
+            start, end = self.image_ranges[page_number]
+            if offset > start:
+                count += (min(offset, end) - start + WORD_SIZE - 1) // WORD_SIZE
+        return count
+
+    # Palavras das faixas da imagem a partir de addr, em ordem crescente
+    def _image_words(self, addr):
+        k = bisect.bisect_left(self.image_pages, addr // PAGE_SIZE)
+        for page_number in self.image_pages[k:]:
+            start, end = self.image_ranges[page_number]
+            page_base = page_number * PAGE_SIZE
+            first = max(page_base + start, -(-addr // WORD_SIZE) * WORD_SIZE)
+            yield from range(first, page_base + end, WORD_SIZE)
+
+    # Chamado no início de cada clock_tick; o conjunto anterior fica intacto no histórico
+    def begin_cycle(self):
+        self.dirty = set()
+
+    def _track(self, addr):
+        if self.image_ranges and self._in_image(addr):
+            return
+        addresses = self.addresses
+        i = bisect.bisect_left(addresses, addr)
+        if i == len(addresses) or addresses[i] != addr:
+            touch(addresses)
+            addresses.insert(i, addr)
+
+    def _read_bytes(self, addr, size):
+        page_number, offset = divmod(addr, PAGE_SIZE)
+        if offset + size <= PAGE_SIZE:
+            page = self.pages.get(page_number)
+            return bytes(size) if page is None else bytes(page[offset:offset + size])
+        # Acesso que atravessa o fim da página
+        first = PAGE_SIZE - offset
+        return self._read_bytes(addr, first) + self._read_bytes(addr + first, size - first)
+
+    def _write_bytes(self, addr, data):
+        while data:
+            page_number, offset = divmod(addr, PAGE_SIZE)
+            chunk = data[:PAGE_SIZE - offset]
+            page = self.pages.get(page_number)
+            if page is None:
+                page = bytearray(PAGE_SIZE)
+                self.pages[page_number] = page
+            else:
+                touch(page)
+            page[offset:offset + len(chunk)] = chunk
+            addr += len(chunk)
+            data = data[len(chunk):]
+
+    # Acesso do programa (LW/LB): entra no índice de endereços acessados. pending: escritas
+    # (endereço, valor, tamanho) ainda não confirmadas, da mais antiga para a mais nova, que
+    # valem por cima do conteúdo da memória
+    def load(self, addr, size=WORD_SIZE, pending=()):
+        self._track(addr)
+        data = self._read_bytes(addr, size)
+        if pending:
+            data = bytearray(data)
+            end = addr + size
+            for store_addr, value, store_size in pending:
+                low, high = max(addr, store_addr), min(end, store_addr + store_size)
+                if low < high:
+                    raw = (value & ((1 << (8 * store_size)) - 1)).to_bytes(store_size, "little")
+                    data[low - addr:high - addr] = raw[low - store_addr:high - store_addr]
+        return int.from_bytes(data, "little", signed=True)
+
+    # SW/SB: guarda os size bytes menos significativos do valor
+    def store(self, addr, value, size=WORD_SIZE):
+        self._track(addr)
+        self._write_bytes(addr, (value & ((1 << (8 * size)) - 1)).to_bytes(size, "little"))
+        self.dirty.add(addr)
+
+    # Consulta sem efeito colateral (GUI, exportadores): não cria páginas nem entra no índice
+    def get(self, addr, size=WORD_SIZE):
+        return int.from_bytes(self._read_bytes(addr, size), "little", signed=True)
+
+    # (endereço, palavra) de todos os endereços acessados, em ordem crescente
+    def items(self):
+        addresses = heapq.merge(self.addresses, self._image_words(self._first_address()))
+        return [(addr, self.get(addr)) for addr in addresses]
+
+    def _first_address(self):
+        candidates = self.addresses[:1]
+        if self.image_pages:
+            candidates.append(self.image_pages[0] * PAGE_SIZE + self.image_ranges[self.image_pages[0]][0])
+        return min(candidates, default=0)
+
+    def _last_address(self):
+        candidates = self.addresses[-1:]
+        if self.image_pages:
+            candidates.append(self.image_pages[-1] * PAGE_SIZE + self.image_ranges[self.image_pages[-1]][1])
+        return max(candidates, default=0)
+
+    # Posição no índice do primeiro endereço acessado >= addr (navegação por faixa de endereços)
+    def index_of(self, addr):
+        return bisect.bisect_left(self.addresses, addr) + self._image_words_below(addr)
+
+    # count endereços do índice a partir da posição index (uma página da tabela da GUI)
+    def addresses_at(self, index, count):
+        if index >= len(self):
+            return []
+        # Busca binária pelo endereço na posição index: o menor addr com index_of(addr + 1) > index
+        low, high = self._first_address(), self._last_address()
+        while low < high:
+            middle = (low + high) // 2
+            if self.index_of(middle + 1) > index:
+                high = middle
+            else:
+                low = middle + 1
+        k = bisect.bisect_left(self.addresses, low)
+        return list(islice(heapq.merge(self.addresses[k:k + count], self._image_words(low)), count))
+
+    # --- Carga em bloco do conteúdo inicial ---
+    # Imagem binária (copiada página a página de um mmap do arquivo) ou, para arquivos
+    # .hex, texto com um byte em hexadecimal por token e "@endereço" para reposicionar.
+    # As palavras tocadas pela imagem entram no índice pela faixa de cada página
+    def load_image(self, path, base=0):
+        loaded = 0
+        if path.endswith(".hex"):
+            for start, data in _parse_hex_image(path, base):
+                self._write_bytes(start, data)
+                self._add_image_range(start, len(data))
+                loaded += len(data)
+        else:
+            with open(path, 'rb') as f:
+                if os.fstat(f.fileno()).st_size:
+                    with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as data:
+                        for offset in range(0, len(data), PAGE_SIZE):
+                            self._write_bytes(base + offset, data[offset:offset + PAGE_SIZE])
+                        self._add_image_range(base, len(data))
+                        loaded = len(data)
+
+        self._index_image()
+        # Endereços já acessados que caíram numa faixa da imagem passam a vir da faixa
+        self.addresses = [addr for addr in self.addresses if not self._in_image(addr)]
+        return loaded
+
+    # Amplia a faixa de cada página tocada por [start, start + length), alinhando a palavras
+    def _add_image_range(self, start, length):
+        addr = start - start % WORD_SIZE
+        end = start + length
+        while addr < end:
+            page_number, offset = divmod(addr, PAGE_SIZE)
+            page_end = min(PAGE_SIZE, offset + (end - addr + WORD_SIZE - 1) // WORD_SIZE * WORD_SIZE)
+            bounds = self.image_ranges.get(page_number)
+            if bounds is not None:
+                offset, page_end = min(offset, bounds[0]), max(page_end, bounds[1])
+            self.image_ranges[page_number] = (offset, page_end)
+            addr = page_number * PAGE_SIZE + PAGE_SIZE
+
+    # Cópia plana do conteúdo para os keyframes do simulador
+    def get_state(self):
+        return ({number: bytes(page) for number, page in self.pages.items()}, list(self.addresses), set(self.dirty),
+                dict(self.image_ranges))
+
+    def set_state(self, state):
+        pages, addresses, dirty, image_ranges = state
+        self.pages = TrackedDict({number: bytearray(page) for number, page in pages.items()})
+        self.addresses = list(addresses)
+        self.dirty = set(dirty)
+        if image_ranges != self.image_ranges:
+            self.image_ranges = dict(image_ranges)
+            self._index_image()
+
+    def __len__(self):
+        return len(self.addresses) + self.image_counts[-1]
+
+
+# --- Classe StoreForwarding ---
+# Memória vista por um load com stores mais antigos ainda no ROB: as escritas deles
+# (pending, do mais antigo para o mais novo) são repassadas ao load antes do commit
+class StoreForwarding:
+    __slots__ = ("memory", "pending")
+
+    def __init__(self, memory, pending):
+        self.memory = memory
+        self.pending = pending
+
+    def load(self, addr, size=WORD_SIZE):
+        return self.memory.load(addr, size, self.pending)
+
+
+_HEX_BYTE = re.compile(r"[0-9a-fA-F]{1,2}")
+_HEX_ADDRESS = re.compile(r"@[0-9a-fA-F]+")
+
+
+# Lê uma imagem .hex: devolve [(endereço inicial, bytes)] na ordem do arquivo. Um token
+# que não seja byte (00..ff) nem "@endereço" em hexadecimal gera ValueError com a linha
+def _parse_hex_image(path, base):
+    segments = []
+    start, data = base, bytearray()
+    with open(path, 'r') as f:
+        for number, line in enumerate(f, 1):
+            line = line.split('#')[0].split('//')[0]
+            for token in line.split():
+                if token.startswith('@'):
+                    if not _HEX_ADDRESS.fullmatch(token):
+                        raise ValueError(f"'{path}' linha {number}: endereço inválido '{token}' na imagem")
+                    if data:
+                        segments.append((start, bytes(data)))
+                    start, data = base + int(token[1:], 16), bytearray()
+                else:
+                    if not _HEX_BYTE.fullmatch(token):
+                        raise ValueError(f"'{path}' linha {number}: byte inválido '{token}' na imagem "
+                                         "(esperado 00..ff em hexadecimal)")
+                    data.append(int(token, 16))
+    if data:
+        segments.append((start, bytes(data)))
+    return segments
@@ -0,0 +1,146 @@
+# --- Previsão de desvios ---
+#
+# O simulador consulta o preditor no issue de cada desvio e o treina quando o
+# desvio é confirmado (em ordem de programa, só com desvios do caminho certo).
+# O alvo vem do BTB: um desvio previsto como tomado só redireciona o PC se o BTB
+# conhece o alvo dele; sem o alvo a busca segue para a próxima instrução e o
+# desvio conta como previsto não tomado. O BTB aprende o alvo na confirmação de
+# um desvio tomado.
+#
+# As tabelas são TrackedDict e os registradores de histórico são campos de
+# objetos Tracked, então o "Ciclo Anterior" desfaz o treinamento junto com o
+# resto do simulador.
+
+import argparse
+
+from tomasulo_history import Tracked, TrackedDict
+
+
+# --- Classe BranchPredictor ---
+# Interface: predict devolve True para "tomado"; target é o alvo dado pelo BTB
+# (None se o BTB não conhece o desvio). update recebe o resultado real
+class BranchPredictor(Tracked):
+    name = None
+
+    def predict(self, pc, target):
+        raise NotImplementedError
+
+    def update(self, pc, target, taken):
+        pass
+
+    # Descrição com os parâmetros (vai na impressão digital do cache de resultados)
+    def describe(self):
+        return self.name
+
+
+class NotTakenPredictor(BranchPredictor):
+    name = "not_taken"
+
+    def predict(self, pc, target):
+        return False
+
+
+class TakenPredictor(BranchPredictor):
+    name = "taken"
+
+    def predict(self, pc, target):
+        return True
+
+
+# Backward taken / forward not taken: laços (alvo para trás) desviam
+class BackwardTakenPredictor(BranchPredictor):
+    name = "btfn"
+
+    def predict(self, pc, target):
+        return target is not None and target <= pc
+
+
+# Contadores saturantes de 2 bits (0-1 = não tomado, 2-3 = tomado), indexados pelos
+# bits baixos do PC. As entradas nunca usadas valem 1 (fracamente não tomado)
+class TwoBitPredictor(BranchPredictor):
+    name = "bht"
+
+    def __init__(self, bits=10):
+        self.bits = bits
+        self.mask = (1 << bits) - 1
+        self.counters = TrackedDict()
+
+    def _index(self, pc):
+        return pc & self.mask
+
+    def predict(self, pc, target):
+        return self.counters.get(self._index(pc), 1) >= 2
+
+    def update(self, pc, target, taken):
+        index = self._index(pc)
+        counter = self.counters.get(index, 1)
+        if taken and counter < 3:
+            self.counters[index] = counter + 1
+        elif not taken and counter > 0:
+            self.counters[index] = counter - 1
+
+    def describe(self):
+        return f"{self.name}:{self.bits}"
+
+
+# gshare: mesma tabela de contadores, indexada pelo PC xor o histórico global dos
+# últimos bits desvios confirmados
+class GsharePredictor(TwoBitPredictor):
+    name = "gshare"
+
+    def __init__(self, bits=10):
+        super().__init__(bits)
+        self.history = 0
+
+    def _index(self, pc):
+        return (pc ^ self.history) & self.mask
+
+    def update(self, pc, target, taken):
+        super().update(pc, target, taken)
+        self.history = ((self.history << 1) | taken) & self.mask
+
+
+# Nome -> classe; um preditor novo é uma subclasse de BranchPredictor registrada aqui
+PREDICTORS = {cls.name: cls for cls in (NotTakenPredictor, TakenPredictor, BackwardTakenPredictor,
+                                         TwoBitPredictor, GsharePredictor)}
+
+
+# "gshare" ou "gshare:12" (bits de índice/histórico dos preditores com tabela)
+def make_predictor(spec):
+    name, _, bits = spec.partition(":")
+    if name not in PREDICTORS:
+        raise ValueError(f"Preditor desconhecido: {name} (use {', '.join(PREDICTORS)})")
+    if bits:
+        if not issubclass(PREDICTORS[name], TwoBitPredictor):
+            raise ValueError(f"O preditor {name} não tem tabela")
+        return PREDICTORS[name](int(bits))
+    return PREDICTORS[name]()
+
+
+# Tipo de argumento do argparse: valida a especificação e a devolve como texto
+def parse_predictor(text):
+    try:
+        make_predictor(text)
+    except ValueError as e:
+        raise argparse.ArgumentTypeError(str(e))
+    return text
+
+
+# --- Classe BranchTargetBuffer ---
+# Mapeamento direto: entrada = PC mod size, com o PC inteiro como tag. size=0 = sem BTB
+class BranchTargetBuffer(Tracked):
+    def __init__(self, size=64):
+        self.size = size
+        self.entries = TrackedDict()
+
+    def lookup(self, pc):
+        if not self.size:
+            return None
+        entry = self.entries.get(pc % self.size)
+        if entry is not None and entry[0] == pc:
+            return entry[1]
+        return None
+
+    def update(self, pc, target):
+        if self.size:
+            self.entries[pc % self.size] = (pc, target)
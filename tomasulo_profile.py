@@ -0,0 +1,79 @@
+# --- Instrumentação por estágio do clock_tick ---
+#
+# Opcional: TomasuloSimulator.enable_profiling cobre, na instância, cada método de
+# estágio chamado pelo clock_tick (tomasulo_sim.PROFILED_METHODS) por um que passa
+# por StageProfiler.call, acumulando tempo de parede e número de chamadas e
+# chamando os ganchos de entrada/saída. O corpo do ciclo é sempre o mesmo; com a
+# instrumentação desligada o clock_tick normal roda sem nenhum custo extra.
+
+import time
+
+# Estágios medidos, na ordem em que rodam dentro de um ciclo
+STAGES = ("skip_idle_cycles", "save_current_state", "commit_stage", "write_result_stage",
+          "execute_stage", "issue_stage", "record_cycle_states")
+
+
+# --- Classe StageProfiler ---
+class StageProfiler:
+    def __init__(self):
+        # Ganchos: on_enter(estágio) antes e on_exit(estágio, segundos) depois de cada estágio
+        self.enter_hooks = []
+        self.exit_hooks = []
+        self.reset()
+
+    def reset(self):
+        self.times = dict.fromkeys(STAGES, 0.0)
+        self.calls = dict.fromkeys(STAGES, 0)
+        self.ticks = 0
+        self.tick_time = 0.0
+
+    def add_hooks(self, on_enter=None, on_exit=None):
+        if on_enter is not None:
+            self.enter_hooks.append(on_enter)
+        if on_exit is not None:
+            self.exit_hooks.append(on_exit)
+
+    def remove_hooks(self, on_enter=None, on_exit=None):
+        if on_enter in self.enter_hooks:
+            self.enter_hooks.remove(on_enter)
+        if on_exit in self.exit_hooks:
+            self.exit_hooks.remove(on_exit)
+
+    # Executa um estágio medindo o tempo; devolve o retorno do estágio
+    def call(self, stage, func, *args):
+        for hook in self.enter_hooks:
+            hook(stage)
+        start = time.perf_counter()
+        try:
+            return func(*args)
+        finally:
+            elapsed = time.perf_counter() - start
+            self.times[stage] += elapsed
+            self.calls[stage] += 1
+            for hook in self.exit_hooks:
+                hook(stage, elapsed)
+
+    def end_tick(self, elapsed):
+        self.ticks += 1
+        self.tick_time += elapsed
+
+    # Linhas (estágio, chamadas, total em s, média em µs, % do tempo dos ciclos). A última,
+    # "(restante)", é o tempo do clock_tick fora dos estágios (contagem de bolhas, histórico)
+    def summary(self):
+        rows = []
+        for stage in STAGES:
+            calls = self.calls[stage]
+            rows.append((stage, calls, self.times[stage],
+                         1e6 * self.times[stage] / calls if calls else 0.0,
+                         100 * self.times[stage] / self.tick_time if self.tick_time else 0.0))
+        other = max(0.0, self.tick_time - sum(self.times.values()))
+        rows.append(("(restante)", self.ticks, other, 1e6 * other / self.ticks if self.ticks else 0.0,
+                     100 * other / self.tick_time if self.tick_time else 0.0))
+        return rows
+
+    def format_report(self):
+        lines = [f"{'estágio':<20} {'chamadas':>10} {'total (s)':>10} {'média (µs)':>11} {'%':>6}"]
+        for stage, calls, total, mean, share in self.summary():
+            lines.append(f"{stage:<20} {calls:>10} {total:>10.4f} {mean:>11.2f} {share:>6.1f}")
+        lines.append(f"{self.ticks} ciclos em {self.tick_time:.4f} s")
+        return "\n".join(lines)
@@ -1,16 +1,123 @@
+import argparse
 import collections
-import tkinter as tk
-from tkinter import ttk, scrolledtext, messagebox
-import os
-import copy  # Import necessário para salvar o estado
+import contextlib
+import copy
+import csv
+import functools
+import hashlib
+import heapq
+import json
+import operator
+import sys
+import time
+
+from tomasulo_cache import DEFAULT_CACHE_DIR, ResultCache
+from tomasulo_history import Tracked, TrackedDict, begin_frame, end_frame, undo_frame, touch
+from tomasulo_memory import Memory, StoreForwarding
+from tomasulo_predict import PREDICTORS, BranchTargetBuffer, make_predictor, parse_predictor
+from tomasulo_profile import STAGES, StageProfiler
+from tomasulo_states import InstructionStates
+from tomasulo_timeline import TIMELINE_FORMATS, open_timeline
+from tomasulo_trace import open_trace
+
+# Versão do modelo de temporização: mudar invalida os resultados no cache persistente
+RESULT_FORMAT_VERSION = 9
+
+# Causas contabilizadas em stall_counts (ver _record_cycle_stats), na ordem dos índices abaixo
+STALL_CAUSES = ("rob_full", "rs_full", "operand_not_ready", "fu_busy", "cdb_contention",
+                "mispredict_flush", "trace_drained")
+(_ROB_FULL, _RS_FULL, _OPERAND_NOT_READY, _FU_BUSY, _CDB_CONTENTION,
+ _MISPREDICT_FLUSH, _TRACE_DRAINED) = range(len(STALL_CAUSES))
+# Chaves de get_metrics com os contadores de stall, na ordem de exibição
+STALL_METRICS = ("Stall ROB Full", "Stall No Free RS", "Stall Trace Drained", "Stall Mispredict Flush",
+                 "Stall Operand Not Ready", "Stall FU Busy", "Stall CDB Contention")
+# Chaves de get_metrics da previsão de desvios (além de "Branch Predictor", o nome do preditor)
+BRANCH_METRICS = ("Branches", "Branch Mispredictions", "Branch Accuracy", "MPKI", "Recovery Latency")
 
 # Constantes globais para estados e tipos de branch
 JUMP = "JUMP"
 PREDICT_NOT_TAKEN = "NOT_TAKEN"
 PREDICT_TAKEN = "TAKEN"
 
+# --- Decodificação: funções de cálculo do resultado (uma por grupo de opcodes) ---
+# Todas recebem a RS (operandos), a instrução, a entrada do ROB e a memória
+def _compute_alu(operation, rs, inst, rob_entry, memory):
+    val1 = rs.Vj if rs.Vj is not None else 0
+    val2 = rs.Vk if rs.Vk is not None else 0
+    return operation(val1, val2)
+
+# Divisão por zero dá -1 (todos os bits em 1), como o DIV do RISC-V, para o resultado
+# continuar sendo um inteiro nos registradores e na memória
+def _div(val1, val2):
+    if val2 != 0: return val1 // val2
+    return -1
+
+# size: bytes acessados (4 para LW/SW, 1 para LB/SB)
+def _compute_load(size, rs, inst, rob_entry, memory):
+    base_val = rs.Vj if rs.Vj is not None else 0
+    return memory.load(base_val + inst.address, size)
+
+# A escrita fica na entrada do ROB e só chega à memória no commit
+def _compute_store(size, rs, inst, rob_entry, memory):
+    # rs.Vj = base, rs.Vk = valor a ser armazenado
+    rob_entry.store = (rs.Vj + inst.address, rs.Vk, size)
+    return "MEM_STORED"
+
+def _compute_branch(condition, rs, inst, rob_entry, memory):
+    val1 = rs.Vj if rs.Vj is not None else 0
+    val2 = rs.Vk if rs.Vk is not None else 0
+    rob_entry.actual_taken = PREDICT_TAKEN if condition(val1, val2) else PREDICT_NOT_TAKEN
+    return "BRANCH_EVALUATED"
+
+# Formato dos operandos no trace: R = rd, rs1, rs2 | I = rd, rs1, imediato
+# LOAD = rd, rs1, endereço | STORE = rs2, rs1, endereço | BRANCH = rs1, rs2, alvo
+OpcodeInfo = collections.namedtuple("OpcodeInfo", "opcode inst_type fu_class latency operand_format compute")
+
+def _opcode_table(*rows):
+    return {opname: OpcodeInfo(opcode, *fields) for opcode, (opname, *fields) in enumerate(rows)}
+
+# opname -> (opcode inteiro, tipo no ROB, classe de unidade funcional/RS, latência, formato, cálculo)
+OPCODE_TABLE = _opcode_table(
+    ("ADD",  "ALU",    "ADD",    2, "R",      functools.partial(_compute_alu, operator.add)),
+    ("SUB",  "ALU",    "ADD",    2, "R",      functools.partial(_compute_alu, operator.sub)),
+    ("OR",   "ALU",    "BRANCH", 1, "R",      functools.partial(_compute_alu, operator.or_)),
+    ("AND",  "ALU",    "BRANCH", 1, "R",      functools.partial(_compute_alu, operator.and_)),
+    ("SLLI", "ALU",    "BRANCH", 1, "I",      functools.partial(_compute_alu, operator.lshift)),
+    ("SRLI", "ALU",    "BRANCH", 1, "I",      functools.partial(_compute_alu, operator.rshift)),
+    ("MUL",  "ALU",    "MUL",    3, "R",      functools.partial(_compute_alu, operator.mul)),
+    ("DIV",  "ALU",    "MUL",    3, "R",      functools.partial(_compute_alu, _div)),
+    ("LW",   "LOAD",   "MEM",    5, "LOAD",   functools.partial(_compute_load, 4)),
+    ("LB",   "LOAD",   "MEM",    5, "LOAD",   functools.partial(_compute_load, 1)),
+    ("SW",   "STORE",  "MEM",    5, "STORE",  functools.partial(_compute_store, 4)),
+    ("SB",   "STORE",  "MEM",    5, "STORE",  functools.partial(_compute_store, 1)),
+    ("BEQ",  "BRANCH", "BRANCH", 1, "BRANCH", functools.partial(_compute_branch, operator.eq)),
+    ("BNE",  "BRANCH", "BRANCH", 1, "BRANCH", functools.partial(_compute_branch, operator.ne)),
+)
+
+# --- Registros compactos ---
+# Instruction, Register, ReorderBufferPos e ReservationStation usam __slots__ (sem __dict__
+# por objeto). STATE_FIELDS são os campos que mudam durante a simulação: get_state/set_state
+# copiam só eles numa tupla, que é o que os keyframes guardam de cada registro.
+class _SlotRecord(Tracked):
+    __slots__ = ()
+    STATE_FIELDS = ()
+
+    def get_state(self):
+        return tuple([getattr(self, field) for field in self.STATE_FIELDS])
+
+    def set_state(self, state):
+        for field, value in zip(self.STATE_FIELDS, state):
+            setattr(self, field, value)
+
+
 # --- Classe Instruction ---
+# Instrução estática do programa: decodificada uma vez e nunca alterada depois do
+# carregamento. O estado de cada execução dela fica num MicroOp
 class Instruction:
+    __slots__ = ("opname", "destination", "source1", "source2", "immediate", "address",
+                 "opcode", "inst_type", "fu_class", "latency", "operand_format", "compute",
+                 "dest_index", "src1_index", "src2_index")
+
     def __init__(self, op, rs1, rs2=None, rd=None, shamt=None, imn=None):
         self.opname = op
         self.destination = rd
@@ -18,52 +125,80 @@ class Instruction:
         self.source2 = rs2
         self.immediate = shamt
         self.address = imn
-        
-        # Atributos de estado do pipeline
-        self.execution_cycles_remaining = self._get_execution_cycles(op)
+
+        # Forma decodificada (preenchida uma única vez no carregamento do trace)
+        info = OPCODE_TABLE[op]
+        self.opcode = info.opcode
+        self.inst_type = info.inst_type
+        self.fu_class = info.fu_class
+        self.latency = info.latency
+        self.operand_format = info.operand_format
+        self.compute = info.compute
+        # Índices em TomasuloSimulator.registers (resolvidos em load_instructions)
+        self.dest_index = None
+        self.src1_index = None
+        self.src2_index = None
+
+    def __str__(self):
+        if self.operand_format == "I":
+            return f'{self.opname} {self.destination}, {self.source1}, {self.immediate}'
+        elif self.operand_format == "LOAD":
+            return f'{self.opname} {self.destination}, {self.source1}, {self.address}'
+        elif self.operand_format == "STORE":
+            return f'{self.opname} {self.source2}, {self.source1}, {self.address}'
+        elif self.operand_format == "BRANCH":
+            return f'{self.opname} {self.source1}, {self.source2}, {self.address}'
+        else:
+            return f'{self.opname} {self.destination}, {self.source1}, {self.source2}'
+
+
+# --- Classe MicroOp ---
+# Instância dinâmica de uma instrução, do issue até o commit ou o flush. Os registros
+# ficam num pool pré-alocado do simulador (um por entrada do ROB) e voltam para a lista
+# livre ao sair do ROB, então várias instâncias da mesma instrução estática (um laço
+# com desvio para trás) podem estar em voo ao mesmo tempo sem alocar nada por ciclo
+class MicroOp(_SlotRecord):
+    STATE_FIELDS = ("instruction", "seq", "execution_cycles_remaining", "ready_to_write", "issue_cycle",
+                    "execute_start_cycle", "write_result_cycle", "commit_cycle")
+    __slots__ = ("index",) + STATE_FIELDS
+
+    def __init__(self, index):
+        self.index = index # Posição em TomasuloSimulator.uop_pool
+        self.clear()
+
+    def start(self, instruction, cycle, seq=-1):
+        self.instruction = instruction
+        # Número de sequência em TomasuloSimulator.instruction_states (-1 sem gravação)
+        self.seq = seq
+        self.execution_cycles_remaining = instruction.latency
         self.ready_to_write = False
-        self.issue_cycle = -1
+        self.issue_cycle = cycle
         self.execute_start_cycle = -1
         self.write_result_cycle = -1
         self.commit_cycle = -1
-        self.state_at_cycle = {}
-
-    def _get_execution_cycles(self, opname):
-        if opname in ['ADD', 'SUB']: return 2
-        elif opname in ['SLLI', 'SRLI', 'OR', 'AND', 'BEQ', 'BNE']: return 1
-        elif opname in ['LW', 'LB', 'SW', 'SB']: return 5
-        elif opname in ['MUL', 'DIV']: return 3
-        else: return 1
-
-    # Reseta os atributos de estado do pipeline para re-execução
-    def reset_pipeline_state(self):
-        self.execution_cycles_remaining = self._get_execution_cycles(self.opname)
+
+    def clear(self):
+        self.instruction = None
+        self.seq = -1
+        self.execution_cycles_remaining = 0
         self.ready_to_write = False
         self.issue_cycle = -1
         self.execute_start_cycle = -1
         self.write_result_cycle = -1
         self.commit_cycle = -1
-        self.state_at_cycle = {}
 
     def __str__(self):
-        if self.opname in ['SLLI', 'SRLI']:
-            return f'{self.opname} {self.destination}, {self.source1}, {self.immediate}'
-        elif self.opname in ['LW', 'LB']:
-            return f'{self.opname} {self.destination}, {self.source1}, {self.address}'
-        elif self.opname in ['SW', 'SB']:
-            return f'{self.opname} {self.source2}, {self.source1}, {self.address}'
-        elif self.opname in ['BEQ', 'BNE']:
-            return f'{self.opname} {self.source1}, {self.source2}, {self.address}'
-        elif self.opname in ['MUL', 'DIV', 'ADD', 'SUB', 'OR', 'AND']:
-            return f'{self.opname} {self.destination}, {self.source1}, {self.source2}'
-        else:
-            return f'{self.opname} {self.destination}, {self.source1}, {self.source2}'
+        return str(self.instruction) if self.instruction is not None else ""
 
 
 # --- Classe Register ---
-class Register:
-    def __init__(self, name):
+class Register(_SlotRecord):
+    __slots__ = ("name", "index", "value", "reorder_tag", "busy")
+    STATE_FIELDS = ("value", "reorder_tag", "busy")
+
+    def __init__(self, name, index=None):
         self.name = name
+        self.index = index # Posição em TomasuloSimulator.registers
         self.value = 0
         self.reorder_tag = None
         self.busy = False
@@ -76,11 +211,16 @@ class Register:
         return f'{self.name}: Val={self.value}, ROB={self.reorder_tag}, Busy={self.busy}'
 
 # --- Classe ReorderBufferPos ---
-class ReorderBufferPos:
-    def __init__(self, id, instruction, destination_reg, inst_type):
+class ReorderBufferPos(_SlotRecord):
+    STATE_FIELDS = ("busy", "uop", "state", "destination_reg", "value", "inst_type", "is_branch",
+                    "predicted_taken", "actual_taken", "target_address", "program_order_index", "source_rs",
+                    "checkpoint", "recovered", "store")
+    __slots__ = ("id",) + STATE_FIELDS
+
+    def __init__(self, id, uop, destination_reg, inst_type):
         self.id = id
         self.busy = False
-        self.instruction = instruction
+        self.uop = uop
         self.state = ""
         self.destination_reg = destination_reg
         self.value = None
@@ -92,12 +232,17 @@ class ReorderBufferPos:
         self.target_address = None
         self.program_order_index = -1
         self.source_rs = None
-
+        # Desvios com early_recovery: reorder_tag de cada registrador no issue (renomeamento
+        # antes do desvio) e se a misprediction já foi recuperada na execução
+        self.checkpoint = None
+        self.recovered = False
+        # SW/SB já executado: (endereço, valor, tamanho) gravados na memória no commit
+        self.store = None
+
+    # O micro-op volta para o pool pelo simulador (_retire_rob_entry)
     def clear(self):
         self.busy = False
-        if self.instruction:
-            self.instruction.reset_pipeline_state()
-        self.instruction = None
+        self.uop = None
         self.state = ""
         self.destination_reg = ""
         self.value = None
@@ -108,15 +253,23 @@ class ReorderBufferPos:
         self.target_address = None
         self.program_order_index = -1
         self.source_rs = None
+        self.checkpoint = None
+        self.recovered = False
+        self.store = None
 
     def __str__(self):
-        return (f'#{self.id} Busy:{self.busy} Inst:{self.instruction} State:{self.state} '
+        return (f'#{self.id} Busy:{self.busy} Inst:{self.uop} State:{self.state} '
                 f'Dest:{self.destination_reg} Val:{self.value} Type:{self.inst_type}')
 
 # --- Classe ReservationStation ---
-class ReservationStation:
-    def __init__(self, name):
+class ReservationStation(_SlotRecord):
+    STATE_FIELDS = ("busy", "op", "Vj", "Vk", "Qj", "Qk", "destination_rob_id", "uop")
+    __slots__ = ("name", "unit", "index") + STATE_FIELDS
+
+    def __init__(self, name, unit=None, index=None):
         self.name = name
+        self.unit = unit   # Classe da unidade funcional: MEM, ADD, BRANCH ou MUL
+        self.index = index # Posição em TomasuloSimulator.reservation_stations
         self.busy = False
         self.op = None
         self.Vj = None
@@ -124,7 +277,7 @@ class ReservationStation:
         self.Qj = None
         self.Qk = None
         self.destination_rob_id = None
-        self.instruction_obj = None
+        self.uop = None
 
     def clear(self):
         self.busy = False
@@ -134,7 +287,7 @@ class ReservationStation:
         self.Qj = None
         self.Qk = None
         self.destination_rob_id = None
-        self.instruction_obj = None
+        self.uop = None
 
     def is_clear(self):
         return not self.busy
@@ -143,414 +296,671 @@ class ReservationStation:
         return (f'Name:{self.name} Busy:{self.busy} Op:{self.op} Vj:{self.Vj} Vk:{self.Vk} '
                 f'Qj:{self.Qj} Qk:{self.Qk} Dest_ROB:{self.destination_rob_id}')
 
+# Estágio medido (tomasulo_profile.STAGES) -> método do simulador chamado por clock_tick
+PROFILED_METHODS = dict(zip(STAGES, ("_skip_idle_cycles", "save_current_state", "commit_stage", "write_result_stage",
+                                     "execute_stage", "issue_stage", "_record_cycle_states")))
+
 # --- Classe TomasuloSimulator ---
-class TomasuloSimulator:
-    def __init__(self, num_mem_rs=2, num_add_rs=3, num_logic_rs=2, num_mult_rs=1, rob_size=8):
+class TomasuloSimulator(Tracked):
+    def __init__(self, num_mem_rs=2, num_add_rs=3, num_logic_rs=2, num_mult_rs=1, rob_size=8,
+                 record_history=True, verbose=True, keyframe_interval=None, record_states=None,
+                 predictor="not_taken", btb_size=64, early_recovery=False):
         self.register_file = {}
-        self.memory = collections.defaultdict(int)
+        # Mesmos registradores do register_file, indexados pelo índice decodificado nas instruções
+        self.registers = []
+        self.memory = Memory()
         self.program_counter = 0
         self.program_length = 0
 
         self.reservation_stations = []
+        # Classe da UF -> heap com os índices das RS livres (a de menor índice é usada primeiro)
+        self.free_rs = {}
+        # Classe da UF -> heap (ID do ROB, índice da RS) das RS com operandos prontos
+        self.ready_queues = {}
+        # Heap (ciclo de término, índice da RS) das RS em execução
+        self.executing_queue = []
+        # RS ocupadas esperando algum operando (Qj/Qk) no CDB
+        self.rs_waiting = 0
         self._create_reservation_stations(num_mem_rs, num_add_rs, num_logic_rs, num_mult_rs)
 
         self.reorder_buffer = [ReorderBufferPos(i, None, None, None) for i in range(rob_size)]
+        # Micro-ops em voo: no máximo um por entrada do ROB; free_uops é a pilha dos livres
+        self.uop_pool = [MicroOp(i) for i in range(rob_size)]
+        self._reset_uop_pool()
         self.rob_head = 0
         self.rob_tail = 0
         self.current_rob_entries = 0
 
+        # CDB: tag do ROB -> operandos de RS (rs, "j"/"k") esperando por ela
+        self.wakeup_lists = TrackedDict()
+        # Heap com os IDs do ROB prontos para escrever no CDB (menor ID primeiro)
+        self.completed_queue = []
+
+        # Previsão de desvios (tomasulo_predict): especificação do preditor ("gshare:12") e
+        # tamanho do BTB; as tabelas são recriadas vazias a cada reset
+        self.predictor_spec = predictor
+        self.btb_size = btb_size
+        self._reset_predictor()
+        # Recuperação de misprediction: False = flush completo quando o desvio chega ao commit;
+        # True = descarte seletivo assim que o desvio é resolvido na execução (_recover_branch)
+        self.early_recovery = early_recovery
+
         self.current_cycle = 0
         self.committed_instructions_count = 0
         self.bubble_cycles = 0
+        self._reset_counters()
 
         self.is_running = False
         self.program_instructions = []
+        # Modo streaming: leitor do trace e janela índice -> Instruction decodificada
+        self.trace = None
+        self.instruction_window = {}
+        self.window_size = 0
         
-        # Pilha para armazenar o histórico de estados (Snapshots)
+        # Pilha com os diffs de cada ciclo (undo log), ver tomasulo_history
         self.history = []
+        # Execuções em lote (headless) não precisam de "Ciclo Anterior"
+        self.record_history = record_history
+        # Modo checkpoint: se definido, guarda um keyframe a cada N ciclos em vez dos diffs
+        self.keyframe_interval = keyframe_interval
+        self.keyframes = {}
+        self.verbose = verbose
+        self.load_error = None
+        # Instrumentação por estágio (enable_profiling); None = clock_tick sem medição
+        self.profiler = None
+        # Gravador da linha do tempo do pipeline (tomasulo_timeline), só em execuções para frente
+        self.timeline = None
+        # Estado de cada instrução em cada ciclo (tomasulo_states); por padrão só com histórico
+        self.record_states = record_history if record_states is None else record_states
+        self.instruction_states = InstructionStates() if self.record_states else None
 
     def _create_reservation_stations(self, num_mem, num_add, num_logic, num_mult):
-        for i in range(num_mem):
-            self.reservation_stations.append(ReservationStation(f"MEM{i+1}"))
-        for i in range(num_add):
-            self.reservation_stations.append(ReservationStation(f"ADD{i+1}"))
-        for i in range(num_logic):
-            self.reservation_stations.append(ReservationStation(f"BRANCH{i+1}")) 
-        for i in range(num_mult):
-            self.reservation_stations.append(ReservationStation(f"MUL{i+1}")) 
-
-    def load_instructions(self, filename="teste.txt"):
+        for unit, count in (("MEM", num_mem), ("ADD", num_add), ("BRANCH", num_logic), ("MUL", num_mult)):
+            self.free_rs[unit] = []
+            self.ready_queues[unit] = []
+            for i in range(count):
+                rs = ReservationStation(f"{unit}{i+1}", unit, len(self.reservation_stations))
+                self.reservation_stations.append(rs)
+                self.free_rs[unit].append(rs.index)
+
+    def _reset_uop_pool(self):
+        for uop in self.uop_pool:
+            uop.clear()
+        # O topo da pilha (fim da lista) é o de menor índice
+        self.free_uops = list(range(len(self.uop_pool) - 1, -1, -1))
+
+    def _allocate_uop(self, instruction):
+        touch(self.free_uops)
+        uop = self.uop_pool[self.free_uops.pop()]
+        seq = -1
+        if self.instruction_states is not None:
+            seq = self.instruction_states.begin_instruction(self.program_counter)
+        uop.start(instruction, self.current_cycle, seq)
+        return uop
+
+    # Libera a entrada do ROB (commit ou flush) e devolve o micro-op dela ao pool
+    def _retire_rob_entry(self, rob_entry):
+        uop = rob_entry.uop
+        if uop is not None:
+            uop.clear()
+            touch(self.free_uops)
+            self.free_uops.append(uop.index)
+        rob_entry.clear()
+
+    def _reset_predictor(self):
+        self.predictor = make_predictor(self.predictor_spec)
+        self.btb = BranchTargetBuffer(self.btb_size)
+
+    # Contadores de desempenho: slots de issue perdidos e espera por causa (stall_counts, índice =
+    # posição em STALL_CAUSES) e histogramas de ocupação por ciclo do ROB e de cada pool de RS
+    # (índice = entradas ocupadas). stall_counts e rob_occupancy mudam todo ciclo: são listas
+    # comuns, copiadas uma vez por ciclo no histórico (save_current_state) em vez de a cada escrita
+    def _reset_counters(self):
+        self.stall_counts = [0] * len(STALL_CAUSES)
+        self.rob_occupancy = [0] * (len(self.reorder_buffer) + 1)
+        self.rs_occupancy = {unit: [0] * (sum(1 for rs in self.reservation_stations if rs.unit == unit) + 1)
+                             for unit in self.free_rs}
+        # A ocupação das RS só muda ao alocar/liberar: o histograma do pool é atualizado nessas
+        # horas com os ciclos desde rs_occupancy_since[unit] (primeiro ciclo ainda não contado)
+        self.rs_occupancy_since = TrackedDict.fromkeys(self.free_rs, 1)
+        # Desvios confirmados, quantos deles foram previstos errado e a soma dos ciclos entre
+        # a resolução (fim da execução) e a recuperação de cada previsão errada
+        self.branch_count = 0
+        self.branch_mispredictions = 0
+        self.recovery_cycles = 0
+
+    # Chamar antes de mudar o pool de RS livres da unidade
+    def _count_rs_occupancy(self, unit):
+        since = self.rs_occupancy_since
+        elapsed = self.current_cycle - since[unit]
+        if elapsed > 0:
+            histogram = self.rs_occupancy[unit]
+            touch(histogram)
+            histogram[-1 - len(self.free_rs[unit])] += elapsed
+            since[unit] = self.current_cycle
+
+    # Libera todas as RS (flush e reset): cada pool volta a conter todas as suas estações
+    # e as filas de prontos/em execução são esvaziadas
+    def _clear_all_rs(self):
+        for rs in self.reservation_stations:
+            rs.clear()
+        for unit, pool in self.free_rs.items():
+            self._count_rs_occupancy(unit)
+            touch(pool)
+            pool[:] = [rs.index for rs in self.reservation_stations if rs.unit == unit]
+        for ready in self.ready_queues.values():
+            touch(ready)
+            ready.clear()
+        self.executing_queue = []
+        self.rs_waiting = 0
+
+    def _release_rs(self, rs):
+        rs.clear()
+        self._count_rs_occupancy(rs.unit)
+        pool = self.free_rs[rs.unit]
+        touch(pool)
+        heapq.heappush(pool, rs.index)
+
+    # Carrega o trace. Com stream=True as instruções são lidas sob demanda e só uma janela
+    # de até window_size instruções decodificadas fica em memória (modo headless, sem histórico).
+    # Com use_cache=True o trace de texto é compilado uma vez para .tomasulo_cache/ e as
+    # próximas cargas leem os registros binários direto do mmap
+    def load_instructions(self, filename="teste.txt", stream=False, window_size=4096, use_cache=True):
+        if stream and self.record_history:
+            raise ValueError("A leitura em streaming só é suportada com record_history=False")
+        self.close_trace()
         self.program_instructions.clear()
         self.register_file.clear()
-        self.memory = collections.defaultdict(int)
+        self.registers.clear()
+        self.memory = Memory()
         self.program_length = 0
         self.history.clear() # Limpa histórico ao carregar novo programa
+        self.keyframes.clear()
+        self.load_error = None
 
         try:
-            with open(filename, 'r') as f:
-                for line in f.readlines():
-                    line = line.strip()
-                    if not line or line.startswith('#'):
-                        continue
-
-                    tokens = [t.strip(',') for t in line.split()]
-                    opname = tokens[0]
-
-                    instruction = None
-                    destination = None
-                    source1 = None
-                    source2 = None
-                    immediate = None
-                    address = None
-                    inst_type = "ALU"
-
-                    if opname in ['SLLI', 'SRLI']:
-                        destination = tokens[1]
-                        source1 = tokens[2]
-                        immediate = int(tokens[3])
-                    elif opname in ['LW', 'LB']: 
-                        destination = tokens[1]
-                        source1 = tokens[2]
-                        address = int(tokens[3])
-                        inst_type = "LOAD"
-                    elif opname in ['SW', 'SB']: 
-                        source2 = tokens[1]
-                        source1 = tokens[2]
-                        address = int(tokens[3])
-                        inst_type = "STORE"
-                    elif opname in ['BEQ', 'BNE']: 
-                        source1 = tokens[1]
-                        source2 = tokens[2]
-                        address = int(tokens[3])
-                        inst_type = "BRANCH"
-                    elif opname in ['ADD', 'SUB', 'OR', 'AND', 'MUL', 'DIV']:
-                        destination = tokens[1]
-                        source1 = tokens[2]
-                        source2 = tokens[3]
-                        inst_type = "ALU"
-                    else:
-                        print(f"Warning: Instrução '{opname}' não reconhecida na linha: {line}. Ignorando.")
-                        continue
-
-                    instruction = Instruction(opname, source1, source2, destination, immediate, address)
-                    self.program_instructions.append(instruction)
-
-                    regs_to_check = []
-                    if destination: regs_to_check.append(destination)
-                    if source1: regs_to_check.append(source1)
-                    if source2: regs_to_check.append(source2)
-
-                    for reg_name in regs_to_check:
-                        if reg_name and reg_name not in self.register_file:
-                            self.register_file[reg_name] = Register(reg_name)
-            self.program_length = len(self.program_instructions)
+            reader = open_trace(filename, OPCODE_TABLE, use_cache)
         except FileNotFoundError:
-            messagebox.showerror("Erro de Carregamento", f"O arquivo de instruções '{filename}' não foi encontrado.")
+            # Quem chamou decide como exibir o erro (messagebox na GUI, stderr no modo headless)
+            self.load_error = f"O arquivo de instruções '{filename}' não foi encontrado."
+            return False
+        except ValueError as e:
+            # Trace compilado por outra versão do decodificador
+            self.load_error = str(e)
             return False
+
+        if stream:
+            self.trace = reader
+            self.window_size = window_size
+            return True
+        try:
+            record = reader.read(0)
+            while record is not None:
+                self.program_instructions.append(self._decode_instruction(record))
+                record = reader.read(len(self.program_instructions))
+        finally:
+            reader.close()
+        self.program_length = len(self.program_instructions)
         return True
 
+    def close_trace(self):
+        if self.trace is not None:
+            self.trace.close()
+            self.trace = None
+        self.instruction_window = {}
+
+    def _decode_instruction(self, record):
+        opname, destination, source1, source2, immediate, address = record
+        instruction = Instruction(opname, source1, source2, destination, immediate, address)
+        if destination: instruction.dest_index = self._get_register(destination).index
+        if source1: instruction.src1_index = self._get_register(source1).index
+        if source2: instruction.src2_index = self._get_register(source2).index
+        return instruction
+
+    # Instrução no índice dado do programa, ou None depois do fim do trace
+    def _fetch_instruction(self, index):
+        if self.trace is None:
+            return self.program_instructions[index] if index < self.program_length else None
+
+        instruction = self.instruction_window.get(index)
+        if instruction is None:
+            record = self.trace.read(index)
+            if record is None:
+                return None
+            instruction = self._decode_instruction(record)
+            self.instruction_window[index] = instruction
+            if len(self.instruction_window) > self.window_size:
+                self._shrink_instruction_window(index)
+        return instruction
+
+    # Descarta da janela as instruções mais distantes do PC até sobrar metade (as que estão
+    # em voo continuam referenciadas pelos seus micro-ops; se forem buscadas de novo, são
+    # decodificadas de novo)
+    def _shrink_instruction_window(self, index):
+        window = self.instruction_window
+        farthest = sorted(window, key=lambda i: abs(i - index), reverse=True)
+        for i in farthest[:len(window) - self.window_size // 2]:
+            del window[i]
+
+    # Busca o registrador pelo nome, criando-o (com o próximo índice livre) se ainda não existir
+    def _get_register(self, reg_name):
+        reg = self.register_file.get(reg_name)
+        if reg is None:
+            reg = Register(reg_name, len(self.registers))
+            self.register_file[reg_name] = reg
+            self.registers.append(reg)
+        return reg
+
+    # Estado inicial padrão dos registradores e da memória (usado pela GUI e pelo modo headless)
+    def apply_initial_state(self):
+        r0 = self._get_register('R0')
+        r0.value = 0
+        r0.clear()
+
+        self._get_register('R1').value = 5
+        self._get_register('R2').value = 5
+
+        self.memory.store(108, 5)
+        self.memory.store(16, 0)
+        self.memory.store(12, 7)
+
+    # Carrega uma imagem de memória (binária ou .hex) a partir do endereço base; chamar
+    # após apply_initial_state. Devolve o número de bytes carregados
+    def load_memory_image(self, path, base=0):
+        return self.memory.load_image(path, base)
+
     def _get_free_rob_entry(self):
         if self.reorder_buffer[self.rob_tail].busy:
             return -1 
         return self.rob_tail 
 
-    def _get_free_rs(self, inst_opname):
-        for rs in self.reservation_stations:
-            if rs.is_clear():
-                if inst_opname in ['LW', 'LB', 'SW', 'SB'] and rs.name.startswith("MEM"):
-                    return rs
-                elif inst_opname in ['ADD', 'SUB'] and rs.name.startswith("ADD"): 
-                    return rs
-                elif inst_opname in ['SLLI', 'SRLI', 'OR', 'AND', 'BEQ', 'BNE'] and rs.name.startswith("BRANCH"): 
-                    return rs
-                elif inst_opname in ['MUL', 'DIV'] and rs.name.startswith("MUL"): 
-                    return rs
-        return None
+    def _get_free_rs(self, fu_class):
+        pool = self.free_rs[fu_class]
+        return self.reservation_stations[pool[0]] if pool else None
+
+    def _allocate_rs(self, rs):
+        self._count_rs_occupancy(rs.unit)
+        pool = self.free_rs[rs.unit]
+        touch(pool)
+        heapq.heappop(pool)
+
+    # Lê um operando já disponível (registrador ou ROB) ou registra a espera pela tag no CDB.
+    # Retorna (valor, tag)
+    def _read_operand(self, reg_index, rs_entry, operand):
+        reg = self.registers[reg_index]
+        if reg.busy and reg.reorder_tag is not None:
+            producer = self.reorder_buffer[reg.reorder_tag]
+            # Em "Commit" o resultado já passou pelo CDB: lê direto do ROB
+            if producer.state in ("Write Result", "Commit") and producer.value is not None:
+                return producer.value, None
+            self._add_waiter(reg.reorder_tag, rs_entry, operand)
+            return None, reg.reorder_tag
+        return reg.value, None
 
     # --- Estágio de Emissão (Issue) ---
+    # Devolve None se emitiu ou a causa (índice em STALL_CAUSES) que bloqueou a emissão
     def issue_stage(self):
-        issued_this_cycle = False
-        if self.program_counter < self.program_length:
-            inst_to_issue = self.program_instructions[self.program_counter]
-            
-            rob_id = self._get_free_rob_entry()
-            rs_entry = self._get_free_rs(inst_to_issue.opname)
-
-            if rob_id != -1 and rs_entry is not None:
-                rob_pos = self.reorder_buffer[rob_id]
-                rob_pos.busy = True 
-                rob_pos.instruction = inst_to_issue
-                rob_pos.state = "Issued"
-                rob_pos.program_order_index = self.program_counter
-                rob_pos.source_rs = rs_entry 
-
-                if inst_to_issue.destination:
-                    rob_pos.destination_reg = inst_to_issue.destination
-                elif inst_to_issue.opname in ['SW', 'SB']:
-                    base_reg_val = self.register_file[inst_to_issue.source1].value if inst_to_issue.source1 in self.register_file else 0
-                    rob_pos.destination_reg = f"Mem[{inst_to_issue.address} + {inst_to_issue.source1} (Val:{base_reg_val})]"
-                else:
-                    rob_pos.destination_reg = None
-
-                rob_pos.target_address = inst_to_issue.address
-
-                if inst_to_issue.opname in ['ADD', 'SUB', 'SLLI', 'SRLI', 'OR', 'AND', 'MUL', 'DIV']:
-                    rob_pos.inst_type = "ALU"
-                elif inst_to_issue.opname in ['LW', 'LB']:
-                    rob_pos.inst_type = "LOAD"
-                elif inst_to_issue.opname in ['SW', 'SB']:
-                    rob_pos.inst_type = "STORE"
-                elif inst_to_issue.opname in ['BEQ', 'BNE']:
-                    rob_pos.inst_type = "BRANCH"
-                    rob_pos.predicted_taken = PREDICT_NOT_TAKEN 
-                else:
-                    rob_pos.inst_type = "UNKNOWN"
-
-                inst_to_issue.issue_cycle = self.current_cycle
-
-                rs_entry.busy = True
-                rs_entry.op = inst_to_issue.opname
-                rs_entry.destination_rob_id = rob_id
-                rs_entry.instruction_obj = inst_to_issue
-
-                if inst_to_issue.source1:
-                    reg1 = self.register_file[inst_to_issue.source1]
-                    if reg1.busy and reg1.reorder_tag is not None:
-                        rob_entry_src1 = self.reorder_buffer[reg1.reorder_tag]
-                        if rob_entry_src1.state == "Write Result" and rob_entry_src1.value is not None:
-                            rs_entry.Vj = rob_entry_src1.value 
-                        else:
-                            rs_entry.Qj = reg1.reorder_tag
-                    else:
-                        rs_entry.Vj = reg1.value
-                
-                if inst_to_issue.opname in ['SLLI', 'SRLI']:
-                    rs_entry.Vk = inst_to_issue.immediate
-                elif inst_to_issue.opname in ['SW', 'SB']:
-                    if inst_to_issue.source2:
-                        reg2 = self.register_file[inst_to_issue.source2]
-                        if reg2.busy and reg2.reorder_tag is not None:
-                            rob_entry_src2 = self.reorder_buffer[reg2.reorder_tag]
-                            if rob_entry_src2.state == "Write Result" and rob_entry_src2.value is not None:
-                                rs_entry.Vk = rob_entry_src2.value
-                            else:
-                                rs_entry.Qk = reg2.reorder_tag
-                        else:
-                            rs_entry.Vk = reg2.value
-                elif inst_to_issue.source2:
-                    reg2 = self.register_file[inst_to_issue.source2]
-                    if reg2.busy and reg2.reorder_tag is not None:
-                        rob_entry_src2 = self.reorder_buffer[reg2.reorder_tag]
-                        if rob_entry_src2.state == "Write Result" and rob_entry_src2.value is not None:
-                            rs_entry.Vk = rob_entry_src2.value
-                        else:
-                            rs_entry.Qk = reg2.reorder_tag
-                    else:
-                        rs_entry.Vk = reg2.value
+        inst_to_issue = self._fetch_instruction(self.program_counter)
+        if inst_to_issue is None:
+            return _TRACE_DRAINED
+        rob_id = self._get_free_rob_entry()
+        if rob_id == -1:
+            return _ROB_FULL
+        rs_entry = self._get_free_rs(inst_to_issue.fu_class)
+        if rs_entry is None:
+            return _RS_FULL
+        uop = self._allocate_uop(inst_to_issue)
+        rob_pos = self.reorder_buffer[rob_id]
+        rob_pos.busy = True 
+        rob_pos.uop = uop
+        rob_pos.state = "Issued"
+        rob_pos.program_order_index = self.program_counter
+        rob_pos.source_rs = rs_entry 
+        if self.timeline is not None:
+            self.timeline.issue(rob_id, self.current_cycle, self.program_counter, inst_to_issue)
+
+        inst_type = inst_to_issue.inst_type
+        if inst_to_issue.destination:
+            rob_pos.destination_reg = inst_to_issue.destination
+        elif inst_type == "STORE":
+            base_reg_val = self.registers[inst_to_issue.src1_index].value
+            rob_pos.destination_reg = f"Mem[{inst_to_issue.address} + {inst_to_issue.source1} (Val:{base_reg_val})]"
+        else:
+            rob_pos.destination_reg = None
+
+        rob_pos.target_address = inst_to_issue.address
+
+        rob_pos.inst_type = inst_type
+        next_pc = self.program_counter + 1
+        if inst_type == "BRANCH":
+            # Previsto tomado só redireciona a busca se o BTB tiver o alvo
+            target = self.btb.lookup(self.program_counter)
+            if target is not None and self.predictor.predict(self.program_counter, target):
+                rob_pos.predicted_taken = PREDICT_TAKEN
+                next_pc = target
+            else:
+                rob_pos.predicted_taken = PREDICT_NOT_TAKEN
+            if self.early_recovery:
+                rob_pos.checkpoint = tuple([reg.reorder_tag for reg in self.registers])
+
+        self._allocate_rs(rs_entry)
+        rs_entry.busy = True
+        rs_entry.op = inst_to_issue.opname
+        rs_entry.destination_rob_id = rob_id
+        rs_entry.uop = uop
+
+        if inst_to_issue.src1_index is not None:
+            rs_entry.Vj, rs_entry.Qj = self._read_operand(inst_to_issue.src1_index, rs_entry, "j")
+        
+        if inst_to_issue.operand_format == "I":
+            rs_entry.Vk = inst_to_issue.immediate
+        elif inst_to_issue.src2_index is not None:
+            rs_entry.Vk, rs_entry.Qk = self._read_operand(inst_to_issue.src2_index, rs_entry, "k")
 
-                if inst_to_issue.destination and inst_to_issue.opname not in ['SW', 'SB', 'BEQ', 'BNE']:
-                    dest_reg = self.register_file[inst_to_issue.destination]
-                    dest_reg.busy = True
-                    dest_reg.reorder_tag = rob_id
+        if rs_entry.Qj is None and rs_entry.Qk is None:
+            self._mark_ready(rs_entry)
+        else:
+            self.rs_waiting += 1
 
-                self.program_counter += 1
-                self.rob_tail = (self.rob_tail + 1) % len(self.reorder_buffer)
-                self.current_rob_entries += 1
-                issued_this_cycle = True
-        return issued_this_cycle
+        if inst_to_issue.dest_index is not None:
+            dest_reg = self.registers[inst_to_issue.dest_index]
+            dest_reg.busy = True
+            dest_reg.reorder_tag = rob_id
+
+        self.program_counter = next_pc
+        self.rob_tail = (self.rob_tail + 1) % len(self.reorder_buffer)
+        self.current_rob_entries += 1
+        return None
 
     # --- Estágio de Execução (Execute) ---
+    # Só visita o que termina ou começa neste ciclo: as RS em execução ficam no heap
+    # executing_queue (ordenado pelo ciclo de término) e as RS com operandos prontos
+    # esperam na fila ready_queues da sua UF
     def execute_stage(self):
-        units_executing_this_cycle = {
-            "ADD": False, "MUL": False, "BRANCH": False, "MEM": False
-        }
+        executing = self.executing_queue
+        while executing and executing[0][0] <= self.current_cycle:
+            touch(executing)
+            _, rs_index = heapq.heappop(executing)
+            rs = self.reservation_stations[rs_index]
+            self._finish_execution(rs, rs.uop, self.reorder_buffer[rs.destination_rob_id])
+
+        # Cada UF inicia no máximo uma instrução por ciclo: a de menor ID do ROB
+        for unit, ready in self.ready_queues.items():
+            if not ready:
+                continue
+            touch(ready)
+            item = heapq.heappop(ready)
+            # Um load só começa depois que os stores mais antigos calcularam endereço e valor
+            blocked = []
+            while unit == "MEM" and self._waits_for_store(item[0]):
+                blocked.append(item)
+                item = heapq.heappop(ready) if ready else None
+                if item is None:
+                    break
+            if ready:
+                # Prontas, mas a UF já iniciou outra instrução neste ciclo
+                self.stall_counts[_FU_BUSY] += len(ready)
+            if blocked:
+                self.stall_counts[_OPERAND_NOT_READY] += len(blocked)
+                for waiting in blocked:
+                    heapq.heappush(ready, waiting)
+            if item is None:
+                continue
+            rs = self.reservation_stations[item[1]]
+            uop = rs.uop
+            rob_entry = self.reorder_buffer[rs.destination_rob_id]
 
-        rs_to_process = []
-        for rs in self.reservation_stations:
-            if rs.busy:
-                rob_entry_id = rs.destination_rob_id
-                if rob_entry_id is None or not self.reorder_buffer[rob_entry_id].busy:
-                    rs.clear() 
-                    continue 
-                rs_to_process.append(rs)
-
-        ready_to_start_exec = []
-        already_executing = []
-
-        for rs in rs_to_process:
-            inst_obj = rs.instruction_obj
-            if inst_obj.execute_start_cycle == -1:
-                if rs.Qj is None and rs.Qk is None:
-                    ready_to_start_exec.append(rs)
-            else:
-                already_executing.append(rs)
-
-        for rs in already_executing:
-            inst_obj = rs.instruction_obj
-            rob_entry = self.reorder_buffer[rs.destination_rob_id] 
-
-            inst_obj.execution_cycles_remaining -= 1
-
-            if inst_obj.execution_cycles_remaining == 0:
-                inst_obj.ready_to_write = True
-                rob_entry.state = "Ready to Write"
-
-                result = None
-                if inst_obj.opname in ['ADD', 'SUB', 'OR', 'AND']:
-                    val1 = rs.Vj if rs.Vj is not None else 0
-                    val2 = rs.Vk if rs.Vk is not None else 0
-                    if inst_obj.opname == 'ADD': result = val1 + val2
-                    elif inst_obj.opname == 'SUB': result = val1 - val2
-                    elif inst_obj.opname == 'OR': result = val1 | val2
-                    elif inst_obj.opname == 'AND': result = val1 & val2
-                elif inst_obj.opname in ['MUL', 'DIV']:
-                    val1 = rs.Vj if rs.Vj is not None else 0
-                    val2 = rs.Vk if rs.Vk is not None else 0
-                    if inst_obj.opname == 'MUL': result = val1 * val2
-                    elif inst_obj.opname == 'DIV': 
-                        if val2 != 0: result = val1 // val2
-                        else: result = "DIV_BY_ZERO_ERROR"
-                elif inst_obj.opname in ['SLLI', 'SRLI']:
-                    val = rs.Vj if rs.Vj is not None else 0
-                    shift_amount = rs.Vk if rs.Vk is not None else 0 
-                    if inst_obj.opname == 'SLLI': result = val << shift_amount
-                    elif inst_obj.opname == 'SRLI': result = val >> shift_amount
-                elif inst_obj.opname in ['LW', 'LB']:
-                    base_val = rs.Vj if rs.Vj is not None else 0
-                    offset = inst_obj.address
-                    effective_address = base_val + offset
-                    result = self.memory[effective_address]
-                elif inst_obj.opname in ['SW', 'SB']:
-                    base_reg_value = rs.Vj 
-                    value_to_be_stored = rs.Vk 
-                    offset = inst_obj.address 
-                    effective_address = base_reg_value + offset
-                    self.memory[effective_address] = value_to_be_stored
-                    result = "MEM_STORED"
-                elif inst_obj.opname in ['BEQ', 'BNE']:
-                    val1 = rs.Vj if rs.Vj is not None else 0
-                    val2 = rs.Vk if rs.Vk is not None else 0
-                    condition_met = (val1 == val2 if inst_obj.opname == 'BEQ' else val1 != val2)
-                    rob_entry.actual_taken = PREDICT_TAKEN if condition_met else PREDICT_NOT_TAKEN
-                    result = "BRANCH_EVALUATED"
-                
-                rob_entry.value = result
-        
-        ready_to_start_exec.sort(key=lambda x: x.destination_rob_id)
+            uop.execute_start_cycle = self.current_cycle
+            if self.timeline is not None:
+                self.timeline.execute(rob_entry.id, self.current_cycle)
+            rob_entry.state = "Executing"
+            uop.execution_cycles_remaining -= 1
 
-        for rs in ready_to_start_exec:
-            inst_obj = rs.instruction_obj
-            rob_entry = self.reorder_buffer[rs.destination_rob_id]
-            
-            unit_type = None
-            if rs.name.startswith("ADD"): unit_type = "ADD"
-            elif rs.name.startswith("MUL"): unit_type = "MUL"
-            elif rs.name.startswith("BRANCH"): unit_type = "BRANCH"
-            elif rs.name.startswith("MEM"): unit_type = "MEM"
-
-            if unit_type and not units_executing_this_cycle[unit_type]:
-                units_executing_this_cycle[unit_type] = True
-
-                inst_obj.execute_start_cycle = self.current_cycle
-                rob_entry.state = "Executing"
-                
-                inst_obj.execution_cycles_remaining -= 1
-
-                if inst_obj.execution_cycles_remaining == 0:
-                    inst_obj.ready_to_write = True
-                    rob_entry.state = "Ready to Write"
-
-                    result = None
-                    if inst_obj.opname in ['ADD', 'SUB', 'OR', 'AND']:
-                        val1 = rs.Vj if rs.Vj is not None else 0
-                        val2 = rs.Vk if rs.Vk is not None else 0
-                        if inst_obj.opname == 'ADD': result = val1 + val2
-                        elif inst_obj.opname == 'SUB': result = val1 - val2
-                        elif inst_obj.opname == 'OR': result = val1 | val2
-                        elif inst_obj.opname == 'AND': result = val1 & val2
-                    elif inst_obj.opname in ['MUL', 'DIV']:
-                        val1 = rs.Vj if rs.Vj is not None else 0
-                        val2 = rs.Vk if rs.Vk is not None else 0
-                        if inst_obj.opname == 'MUL': result = val1 * val2
-                        elif inst_obj.opname == 'DIV': 
-                            if val2 != 0: result = val1 // val2
-                            else: result = "DIV_BY_ZERO_ERROR"
-                    elif inst_obj.opname in ['SLLI', 'SRLI']:
-                        val = rs.Vj if rs.Vj is not None else 0
-                        shift_amount = rs.Vk if rs.Vk is not None else 0 
-                        if inst_obj.opname == 'SLLI': result = val << shift_amount
-                        elif inst_obj.opname == 'SRLI': result = val >> shift_amount
-                    elif inst_obj.opname in ['LW', 'LB']:
-                        base_val = rs.Vj if rs.Vj is not None else 0
-                        offset = inst_obj.address
-                        effective_address = base_val + offset
-                        result = self.memory[effective_address]
-                    elif inst_obj.opname in ['SW', 'SB']:
-                        base_reg_value = rs.Vj 
-                        value_to_be_stored = rs.Vk 
-                        offset = inst_obj.address 
-                        effective_address = base_reg_value + offset
-                        self.memory[effective_address] = value_to_be_stored
-                        result = "MEM_STORED"
-                    elif inst_obj.opname in ['BEQ', 'BNE']:
-                        val1 = rs.Vj if rs.Vj is not None else 0
-                        val2 = rs.Vk if rs.Vk is not None else 0
-                        condition_met = (val1 == val2 if inst_obj.opname == 'BEQ' else val1 != val2)
-                        rob_entry.actual_taken = PREDICT_TAKEN if condition_met else PREDICT_NOT_TAKEN
-                        result = "BRANCH_EVALUATED"
-                    
-                    rob_entry.value = result
+            if uop.execution_cycles_remaining == 0:
+                self._finish_execution(rs, uop, rob_entry)
+            else:
+                touch(executing)
+                heapq.heappush(executing, (self.current_cycle + uop.execution_cycles_remaining, rs.index))
+
+    # Entra na fila de prontos da UF quando o último operando (Qj/Qk) fica disponível
+    def _mark_ready(self, rs):
+        ready = self.ready_queues[rs.unit]
+        touch(ready)
+        heapq.heappush(ready, (rs.destination_rob_id, rs.index))
+
+    # Fim da execução: calcula o resultado pela função decodificada da instrução
+    def _finish_execution(self, rs, uop, rob_entry):
+        uop.execution_cycles_remaining = 0
+        uop.ready_to_write = True
+        rob_entry.state = "Ready to Write"
+        if self.timeline is not None:
+            self.timeline.finish(rob_entry.id, self.current_cycle)
+        self._push_completed(rob_entry.id)
+        instruction = uop.instruction
+        memory = self.memory
+        if rob_entry.inst_type == "LOAD":
+            pending = self._pending_stores(rob_entry)
+            if pending:
+                memory = StoreForwarding(memory, pending)
+        rob_entry.value = instruction.compute(rs, instruction, rob_entry, memory)
+        if (self.early_recovery and rob_entry.inst_type == "BRANCH"
+                and rob_entry.actual_taken != rob_entry.predicted_taken):
+            self._recover_branch(rob_entry)
+
+    # Load com algum store mais antigo no ROB que ainda não executou (endereço ou valor desconhecido)
+    def _waits_for_store(self, rob_id):
+        rob = self.reorder_buffer
+        if rob[rob_id].inst_type != "LOAD":
+            return False
+        size = len(rob)
+        index = self.rob_head
+        while index != rob_id:
+            entry = rob[index]
+            if entry.store is None and entry.inst_type == "STORE":
+                return True
+            index = (index + 1) % size
+        return False
+
+    # Escritas dos stores mais antigos que a entrada, já executados e ainda não confirmados,
+    # do mais antigo para o mais novo
+    def _pending_stores(self, rob_entry):
+        rob = self.reorder_buffer
+        pending = []
+        index = self.rob_head
+        while index != rob_entry.id:
+            store = rob[index].store
+            if store is not None:
+                pending.append(store)
+            index = (index + 1) % len(rob)
+        return pending
+
+    # --- Recuperação antecipada de misprediction (early_recovery) ---
+    # O desvio acabou de ser resolvido com a previsão errada: descarta só as entradas do ROB
+    # mais novas que ele (e as RS delas; stores descartados levam junto a escrita que ainda
+    # esperava o commit), restaura o renomeamento do checkpoint gravado no issue e
+    # redireciona a busca. O desvio em si segue até o commit normalmente
+    def _recover_branch(self, branch_entry):
+        rob = self.reorder_buffer
+        size = len(rob)
+        if self.verbose:
+            print(f"!!! Misprediction de Branch em ROB ID {branch_entry.id} (Inst: {branch_entry.uop}), "
+                  f"recuperada na execução!")
+        if branch_entry.actual_taken == PREDICT_TAKEN:
+            self.program_counter = branch_entry.uop.instruction.address
+        else:
+            self.program_counter = branch_entry.program_order_index + 1
+        branch_entry.recovered = True
+
+        # Entradas mais novas que o desvio, até o fim do ROB
+        squashed = []
+        index = (branch_entry.id + 1) % size
+        while index != self.rob_tail:
+            squashed.append(index)
+            index = (index + 1) % size
+        # Slots de issue gastos com instruções do caminho errado
+        self.stall_counts[_MISPREDICT_FLUSH] += len(squashed)
+
+        squashed_rs = set()
+        for rob_id in squashed:
+            entry = rob[rob_id]
+            rs = entry.source_rs
+            if rs is not None and rs.busy and rs.destination_rob_id == rob_id:
+                if rs.Qj is not None or rs.Qk is not None:
+                    self.rs_waiting -= 1
+                squashed_rs.add(rs.index)
+                self._release_rs(rs)
+            if self.timeline is not None:
+                self.timeline.squash(rob_id, self.current_cycle)
+            self._retire_rob_entry(entry)
+
+        # Tira as RS e as tags descartadas das filas (no lugar: execute_stage ainda usa as listas)
+        for queue in (*self.ready_queues.values(), self.executing_queue):
+            if any(rs_index in squashed_rs for _, rs_index in queue):
+                touch(queue)
+                queue[:] = [item for item in queue if item[1] not in squashed_rs]
+                heapq.heapify(queue)
+        squashed_ids = set(squashed)
+        queue = self.completed_queue
+        if any(rob_id in squashed_ids for rob_id in queue):
+            touch(queue)
+            queue[:] = [rob_id for rob_id in queue if rob_id not in squashed_ids]
+            heapq.heapify(queue)
+        for tag in list(self.wakeup_lists):
+            if tag in squashed_ids:
+                del self.wakeup_lists[tag]
+                continue
+            waiters = self.wakeup_lists[tag]
+            if any(rs.index in squashed_rs for rs, _ in waiters):
+                touch(waiters)
+                waiters[:] = [waiter for waiter in waiters if waiter[0].index not in squashed_rs]
+
+        # Renomeamento: volta a tag do checkpoint se o produtor ainda está no ROB (entre a cabeça e
+        # o desvio); se já foi confirmado, o valor arquitetural está no registrador
+        live = set()
+        index = self.rob_head
+        while index != branch_entry.id:
+            live.add(index)
+            index = (index + 1) % size
+        checkpoint = branch_entry.checkpoint
+        for reg_index, reg in enumerate(self.registers):
+            if reg.name == 'R0':
+                # R0 não volta ao checkpoint: fica zerado e sem tag, como na recuperação no commit
+                reg.value = 0
+                reg.clear()
+                continue
+            tag = checkpoint[reg_index] if reg_index < len(checkpoint) else None
+            if tag is None or tag not in live:
+                if reg.busy:
+                    reg.clear()
+            elif reg.reorder_tag != tag:
+                reg.busy = True
+                reg.reorder_tag = tag
+
+        self.rob_tail = (branch_entry.id + 1) % size
+        self.current_rob_entries -= len(squashed)
 
 
     # --- Estágio de Escrita de Resultado (Write Result - CDB) ---
     def write_result_stage(self):
-        ready_to_write_robs = sorted([
-            rob for rob in self.reorder_buffer 
-            if rob.busy and rob.state == "Ready to Write" and rob.instruction.write_result_cycle == -1
-        ], key=lambda x: x.id)
-
-        if ready_to_write_robs:
-            rob_entry_to_broadcast = ready_to_write_robs[0]
+        queue = self.completed_queue
+        # Descarta do topo do heap entradas que não estão mais esperando o CDB
+        while queue:
+            rob = self.reorder_buffer[queue[0]]
+            if rob.busy and rob.state == "Ready to Write" and rob.uop.write_result_cycle == -1:
+                break
+            touch(queue)
+            heapq.heappop(queue)
+
+        if queue:
+            touch(queue)
+            rob_entry_to_broadcast = self.reorder_buffer[heapq.heappop(queue)]
             
             rob_id_to_broadcast = rob_entry_to_broadcast.id
             result_value = rob_entry_to_broadcast.value
-            inst_obj = rob_entry_to_broadcast.instruction
+            uop = rob_entry_to_broadcast.uop
             
-            inst_obj.write_result_cycle = self.current_cycle
+            uop.write_result_cycle = self.current_cycle
             rob_entry_to_broadcast.state = "Write Result" 
-
-            for rs in self.reservation_stations:
-                if rs.busy:
-                    if rs.Qj == rob_id_to_broadcast:
+            if self.timeline is not None:
+                self.timeline.write_result(rob_id_to_broadcast, self.current_cycle)
+            # Ciclos que o resultado esperou pelo CDB (sem disputa, transmite no ciclo após terminar)
+            waited = self.current_cycle - uop.execute_start_cycle - uop.instruction.latency
+            if waited > 0:
+                self.stall_counts[_CDB_CONTENTION] += waited
+
+            # Só visita as RS que registraram dependência desta tag no issue
+            waiters = self.wakeup_lists.get(rob_id_to_broadcast)
+            if waiters is not None:
+                del self.wakeup_lists[rob_id_to_broadcast]
+                for rs, operand in waiters:
+                    if not rs.busy:
+                        continue
+                    if operand == "j":
+                        if rs.Qj != rob_id_to_broadcast:
+                            continue
                         rs.Vj = result_value
                         rs.Qj = None
-                    if rs.Qk == rob_id_to_broadcast:
+                    elif rs.Qk == rob_id_to_broadcast:
                         rs.Vk = result_value
                         rs.Qk = None
+                    else:
+                        continue
+                    if rs.Qj is None and rs.Qk is None:
+                        self.rs_waiting -= 1
+                        self._mark_ready(rs)
             
             if rob_entry_to_broadcast.source_rs and rob_entry_to_broadcast.source_rs.busy:
                 if rob_entry_to_broadcast.source_rs.destination_rob_id == rob_id_to_broadcast:
-                    rob_entry_to_broadcast.source_rs.clear()
+                    self._release_rs(rob_entry_to_broadcast.source_rs)
+
+    def _add_waiter(self, rob_tag, rs, operand):
+        waiters = self.wakeup_lists.get(rob_tag)
+        if waiters is None:
+            self.wakeup_lists[rob_tag] = [(rs, operand)]
+        else:
+            touch(waiters)
+            waiters.append((rs, operand))
+
+    def _push_completed(self, rob_id):
+        touch(self.completed_queue)
+        heapq.heappush(self.completed_queue, rob_id)
 
     # --- Estágio de Confirmação (Commit) ---
     def commit_stage(self):
         committed_this_cycle = False
         head_rob_entry = self.reorder_buffer[self.rob_head]
 
-        if head_rob_entry.busy and head_rob_entry.state == "Write Result" and (head_rob_entry.instruction and head_rob_entry.instruction.commit_cycle == -1):
+        if head_rob_entry.busy and head_rob_entry.state == "Write Result" and (head_rob_entry.uop and head_rob_entry.uop.commit_cycle == -1):
             head_rob_entry.state = "Commit" 
-            head_rob_entry.instruction.commit_cycle = self.current_cycle
+            head_rob_entry.uop.commit_cycle = self.current_cycle
+            if self.timeline is not None:
+                self.timeline.commit(head_rob_entry.id, self.current_cycle)
             committed_this_cycle = True
         
-        elif head_rob_entry.busy and head_rob_entry.state == "Commit" and (head_rob_entry.instruction and head_rob_entry.instruction.commit_cycle == self.current_cycle -1): 
-            inst_obj = head_rob_entry.instruction
+        elif head_rob_entry.busy and head_rob_entry.state == "Commit" and (head_rob_entry.uop and head_rob_entry.uop.commit_cycle == self.current_cycle -1): 
+            inst_obj = head_rob_entry.uop.instruction
+            if self.timeline is not None:
+                self.timeline.retire(head_rob_entry.id, self.current_cycle)
             
             if head_rob_entry.inst_type == "BRANCH":
                 predicted = head_rob_entry.predicted_taken
                 actual = head_rob_entry.actual_taken
 
-                if predicted != actual: 
-                    print(f"!!! Misprediction de Branch em ROB ID {head_rob_entry.id} (Inst: {inst_obj})!")
+                # Treina o preditor e o BTB com o resultado real
+                branch_pc = head_rob_entry.program_order_index
+                self.predictor.update(branch_pc, inst_obj.address, actual == PREDICT_TAKEN)
+                if actual == PREDICT_TAKEN:
+                    self.btb.update(branch_pc, inst_obj.address)
+                self.branch_count += 1
+                if predicted != actual:
+                    self.branch_mispredictions += 1
+
+                if predicted != actual and not head_rob_entry.recovered:
+                    # Ciclos desde a resolução do desvio, que esperou chegar à cabeça do ROB
+                    uop = head_rob_entry.uop
+                    self.recovery_cycles += self.current_cycle - (uop.execute_start_cycle + inst_obj.latency - 1)
+                    if self.verbose:
+                        print(f"!!! Misprediction de Branch em ROB ID {head_rob_entry.id} (Inst: {inst_obj})!")
                     
                     if actual == PREDICT_TAKEN:
                         self.program_counter = inst_obj.address
@@ -564,11 +974,14 @@ class TomasuloSimulator:
                             rob_entries_to_clear_ids.append(temp_idx)
                         temp_idx = (temp_idx + 1) % len(self.reorder_buffer)
 
+                    # Slots de issue gastos com instruções do caminho errado
+                    self.stall_counts[_MISPREDICT_FLUSH] += len(rob_entries_to_clear_ids)
+
                     all_rob_ids_to_flush = set(rob_entries_to_clear_ids)
                     all_rob_ids_to_flush.add(head_rob_entry.id) 
 
-                    for reg_name, reg_obj in self.register_file.items():
-                        if reg_name == 'R0': 
+                    for reg_obj in self.registers:
+                        if reg_obj.name == 'R0': 
                             reg_obj.value = 0
                             reg_obj.clear() 
                             continue
@@ -579,12 +992,15 @@ class TomasuloSimulator:
 
                     for clear_id in rob_entries_to_clear_ids:
                         rob_to_clear = self.reorder_buffer[clear_id]
-                        rob_to_clear.clear() 
+                        if self.timeline is not None:
+                            self.timeline.squash(clear_id, self.current_cycle)
+                        self._retire_rob_entry(rob_to_clear)
 
-                    for rs in self.reservation_stations:
-                        rs.clear()
+                    self._clear_all_rs()
+                    self.wakeup_lists = TrackedDict()
+                    self.completed_queue = []
                     
-                    head_rob_entry.clear()
+                    self._retire_rob_entry(head_rob_entry)
                     self.committed_instructions_count += 1
                     committed_this_cycle = True 
 
@@ -594,27 +1010,31 @@ class TomasuloSimulator:
                     self.bubble_cycles += 1
 
                 else: 
-                    head_rob_entry.clear()
+                    self._retire_rob_entry(head_rob_entry)
                     self.rob_head = (self.rob_head + 1) % len(self.reorder_buffer)
                     self.committed_instructions_count += 1
                     self.current_rob_entries -= 1
                     committed_this_cycle = True
 
             elif head_rob_entry.inst_type == "STORE":
-                head_rob_entry.clear()
+                # Só aqui a escrita chega à memória: stores descartados num flush nunca a alteram
+                address, value, size = head_rob_entry.store
+                self.memory.store(address, value, size)
+                self._retire_rob_entry(head_rob_entry)
                 self.rob_head = (self.rob_head + 1) % len(self.reorder_buffer)
                 self.committed_instructions_count += 1
                 self.current_rob_entries -= 1
                 committed_this_cycle = True
 
             else: 
-                dest_reg_name = head_rob_entry.destination_reg
-                if dest_reg_name:
-                    reg = self.register_file[dest_reg_name]
+                if inst_obj.dest_index is not None:
+                    # O valor arquitetural é sempre atualizado; o renomeamento só é desfeito se
+                    # nenhuma instrução mais nova também escreve no registrador
+                    reg = self.registers[inst_obj.dest_index]
+                    reg.value = head_rob_entry.value 
                     if reg.reorder_tag == head_rob_entry.id:
-                        reg.value = head_rob_entry.value 
                         reg.clear() 
-                head_rob_entry.clear()
+                self._retire_rob_entry(head_rob_entry)
                 self.rob_head = (self.rob_head + 1) % len(self.reorder_buffer)
                 self.committed_instructions_count += 1
                 self.current_rob_entries -= 1
@@ -622,72 +1042,331 @@ class TomasuloSimulator:
         
         return committed_this_cycle
 
-    # --- NOVO: Função para Salvar o Estado Atual ---
+    # --- Histórico: abre o diff do ciclo que vai começar ---
     def save_current_state(self):
-        # Cria uma cópia profunda do estado atual do objeto (exceto o histórico)
-        current_state = copy.deepcopy(self.__dict__)
-        if 'history' in current_state:
-            del current_state['history'] # Não salvamos o histórico dentro do histórico
-        self.history.append(current_state)
+        if not self.record_history:
+            return
+        if self.keyframe_interval:
+            # Modo checkpoint: cópia completa a cada N ciclos, o resto é refeito por replay
+            if self.current_cycle % self.keyframe_interval == 0 and self.current_cycle not in self.keyframes:
+                self.keyframes[self.current_cycle] = self._capture_state()
+            return
+        # Só os campos alterados durante o ciclo são gravados (valor antigo de cada um)
+        begin_frame()
+        touch(self.stall_counts)
+        touch(self.rob_occupancy)
+
+    # --- Keyframes: estado da máquina em buffers planos ---
+    # Registradores, ROB, RS e o pool de micro-ops viram tuplas (get_state) e as filas
+    # viram cópias rasas; os objetos continuam os mesmos e são restaurados no lugar
+    _KEYFRAME_FLAT_FIELDS = ("registers", "reorder_buffer", "reservation_stations", "memory", "free_rs",
+                             "ready_queues", "executing_queue", "completed_queue", "wakeup_lists",
+                             "uop_pool", "free_uops", "instruction_states")
+    # Configuração, histórico e estruturas fixas desde o carregamento do programa
+    _KEYFRAME_SKIPPED_FIELDS = ("history", "keyframes", "record_history", "record_states", "keyframe_interval", "verbose",
+                                "predictor_spec", "btb_size", "early_recovery",
+                                "register_file", "program_instructions", "trace", "instruction_window",
+                                "profiler", "clock_tick", "timeline") + tuple(PROFILED_METHODS.values())
+
+    def _capture_state(self):
+        # Demais campos (contadores, PC, ponteiros do ROB...): cópia genérica
+        other = {name: value for name, value in self.__dict__.items()
+                 if name not in self._KEYFRAME_FLAT_FIELDS and name not in self._KEYFRAME_SKIPPED_FIELDS}
+        return {
+            "registers": [reg.get_state() for reg in self.registers],
+            "reorder_buffer": [entry.get_state() for entry in self.reorder_buffer],
+            "reservation_stations": [rs.get_state() for rs in self.reservation_stations],
+            "uop_pool": [uop.get_state() for uop in self.uop_pool],
+            "free_uops": list(self.free_uops),
+            "memory": self.memory.get_state(),
+            "free_rs": {unit: list(pool) for unit, pool in self.free_rs.items()},
+            "ready_queues": {unit: list(ready) for unit, ready in self.ready_queues.items()},
+            "executing_queue": list(self.executing_queue),
+            "completed_queue": list(self.completed_queue),
+            "wakeup_lists": {tag: list(waiters) for tag, waiters in self.wakeup_lists.items()},
+            # Só o tamanho lógico: as linhas já gravadas não mudam
+            "instruction_states": self.instruction_states.get_state() if self.instruction_states is not None else None,
+            "other": copy.deepcopy(other),
+        }
 
-    # --- NOVO: Função para Voltar um Ciclo ---
+    # Copia de novo ao restaurar para que o keyframe continue intacto para os próximos seeks
+    def _restore_state(self, state):
+        for reg, reg_state in zip(self.registers, state["registers"]):
+            reg.set_state(reg_state)
+        for entry, entry_state in zip(self.reorder_buffer, state["reorder_buffer"]):
+            entry.set_state(entry_state)
+        for rs, rs_state in zip(self.reservation_stations, state["reservation_stations"]):
+            rs.set_state(rs_state)
+        for uop, uop_state in zip(self.uop_pool, state["uop_pool"]):
+            uop.set_state(uop_state)
+        self.free_uops = list(state["free_uops"])
+        if self.instruction_states is not None:
+            self.instruction_states.set_state(state["instruction_states"])
+
+        self.memory.set_state(state["memory"])
+        self.free_rs = {unit: list(pool) for unit, pool in state["free_rs"].items()}
+        self.ready_queues = {unit: list(ready) for unit, ready in state["ready_queues"].items()}
+        self.executing_queue = list(state["executing_queue"])
+        self.completed_queue = list(state["completed_queue"])
+        self.wakeup_lists = TrackedDict({tag: list(waiters) for tag, waiters in state["wakeup_lists"].items()})
+        for name, value in copy.deepcopy(state["other"]).items():
+            setattr(self, name, value)
+
+    # --- Função para Voltar um Ciclo ---
     def step_back(self):
+        if self.keyframe_interval:
+            return self.current_cycle > 0 and self.seek(self.current_cycle - 1)
+
         if not self.history:
             return False
         
-        # Recupera o último estado salvo
-        previous_state = self.history.pop()
-        
-        # Restaura o dicionário interno do objeto com o estado anterior
-        self.__dict__.update(previous_state)
+        # Desfaz as alterações do último ciclo
+        undo_frame(self.history.pop())
         return True
 
-    # Avanca o simulador em um ciclo de clock
-    def clock_tick(self):
-        # Salva o estado ANTES de executar qualquer mudança
+    def can_step_back(self):
+        if self.current_cycle == 0:
+            return False
+        return bool(self.keyframes) if self.keyframe_interval else bool(self.history)
+
+    # --- Leva o simulador até um ciclo qualquer (para trás ou para frente) ---
+    def seek(self, cycle):
+        cycle = max(0, cycle)
+        if self.keyframe_interval:
+            # Keyframe mais próximo antes do alvo; para frente só compensa se pular o ciclo atual
+            start = max((c for c in self.keyframes if c <= cycle), default=None)
+            if start is not None and (cycle < self.current_cycle or start > self.current_cycle):
+                self._restore_state(self.keyframes[start])
+        else:
+            while self.current_cycle > cycle and self.step_back():
+                pass
+
+        # Replay determinístico até o alvo, sem repetir as mensagens já exibidas
+        verbose, self.verbose = self.verbose, False
+        try:
+            while self.current_cycle < cycle and not self.is_finished():
+                self.clock_tick()
+        finally:
+            self.verbose = verbose
+        return self.current_cycle == cycle
+
+    # Avanca o simulador em um ciclo de clock. Sem histórico (modo headless) os ciclos ociosos
+    # antes do próximo evento são pulados de uma vez; max_cycle limita até onde o salto vai
+    def clock_tick(self, max_cycle=None):
+        if not self.record_history:
+            self._skip_idle_cycles(max_cycle)
+        # Grava as alterações feitas a partir daqui no histórico
         self.save_current_state()
+        try:
+            self.current_cycle += 1
+            self.memory.begin_cycle()
+
+            committed = self.commit_stage()
+            self.write_result_stage()
+            self.execute_stage()
+            stall = self.issue_stage()
+
+            # Sem emissão nem commit é bolha, a não ser que o programa tenha terminado (is_finished)
+            if stall is not None and not committed and not (stall == _TRACE_DRAINED and self.current_rob_entries == 0):
+                self.bubble_cycles += 1
+
+            self._record_cycle_stats(stall)
+            self._record_cycle_states()
+        finally:
+            changes = end_frame()
+            if changes is not None:
+                self.history.append(changes)
+
+    # Contadores do fim do ciclo, repetidos cycles vezes (ciclos ociosos pulados de uma vez).
+    # stall: causa devolvida por issue_stage (None = emitiu), que recebe o slot perdido; as RS
+    # esperando operando contam uma vez por ciclo cada
+    def _record_cycle_stats(self, stall, cycles=1):
+        counts = self.stall_counts
+        if stall is not None:
+            counts[stall] += cycles
+        if self.rs_waiting:
+            counts[_OPERAND_NOT_READY] += self.rs_waiting * cycles
+        self.rob_occupancy[self.current_rob_entries] += cycles
+
+    # Linha do tempo das instruções em voo: estado de cada uma no fim do ciclo atual, ou
+    # nos cycles ciclos a partir de first_cycle (ciclos ociosos pulados de uma vez)
+    def _record_cycle_states(self, first_cycle=None, cycles=1):
+        states = self.instruction_states
+        if states is None:
+            return
+        rob = self.reorder_buffer
+        states.record(self.current_cycle if first_cycle is None else first_cycle,
+                      [entry.uop.seq for entry in rob if entry.busy], [entry.state for entry in rob if entry.busy], cycles)
+
+    # --- Instrumentação ---
+    # Cobre, nesta instância, cada método de estágio por um que passa pelo profiler e o
+    # clock_tick por um que mede o ciclo inteiro; o corpo do ciclo continua o de clock_tick.
+    # O profiler pode ser compartilhado entre simuladores (acumula os tempos de todos)
+    def enable_profiling(self, profiler=None):
+        self.disable_profiling()
+        self.profiler = profiler if profiler is not None else StageProfiler()
+        for stage, name in PROFILED_METHODS.items():
+            setattr(self, name, functools.partial(self.profiler.call, stage, getattr(self, name)))
+        self.clock_tick = self._profiled_clock_tick
+        return self.profiler
+
+    def disable_profiling(self):
+        for name in ("clock_tick", *PROFILED_METHODS.values()):
+            self.__dict__.pop(name, None)
+        self.profiler = None
+
+    # clock_tick da classe (com os estágios cobertos por enable_profiling), medindo o ciclo
+    def _profiled_clock_tick(self, max_cycle=None):
+        start = time.perf_counter()
+        try:
+            TomasuloSimulator.clock_tick(self, max_cycle)
+        finally:
+            self.profiler.end_tick(time.perf_counter() - start)
+
+    # Executa até o fim do programa (ou até max_cycles); retorna True se terminou
+    def run_to_completion(self, max_cycles=None):
+        while not self.is_finished():
+            if max_cycles is not None and self.current_cycle >= max_cycles:
+                return False
+            self.clock_tick(max_cycles)
+        return True
 
-        self.current_cycle += 1
+    # Ciclo ocioso: nada para confirmar, escrever no CDB, iniciar ou emitir; só as instruções
+    # em execução contam ciclos. Enquanto nenhuma termina, o próximo ciclo também é ocioso
+    def _is_idle_cycle(self):
+        if self.completed_queue or any(self.ready_queues.values()):
+            return False
+        head_rob_entry = self.reorder_buffer[self.rob_head]
+        if head_rob_entry.busy and head_rob_entry.state in ("Write Result", "Commit"):
+            return False
+        return self._issue_blocker() is not None
+
+    # Causa (índice em STALL_CAUSES) que impede emitir a próxima instrução agora, na mesma
+    # ordem de issue_stage, ou None se ela pode ser emitida
+    def _issue_blocker(self):
+        inst_to_issue = self._fetch_instruction(self.program_counter)
+        if inst_to_issue is None:
+            return _TRACE_DRAINED
+        if self._get_free_rob_entry() == -1:
+            return _ROB_FULL
+        if self._get_free_rs(inst_to_issue.fu_class) is None:
+            return _RS_FULL
+        return None
 
-        committed = self.commit_stage()
-        self.write_result_stage()
-        self.execute_stage()
-        issued = self.issue_stage()
+    # Avança current_cycle até o ciclo anterior ao próximo término de execução, contabilizando
+    # os ciclos pulados como bolhas e repetindo o estado de cada entrada do ROB na linha do tempo
+    def _skip_idle_cycles(self, max_cycle=None):
+        if not self.executing_queue or not self._is_idle_cycle():
+            return
+        target = self.executing_queue[0][0] - 1
+        if max_cycle is not None:
+            target = min(target, max_cycle - 1)
+        skipped = range(self.current_cycle + 1, target + 1)
+        if not skipped:
+            return
 
-        if not issued and not committed and not self.is_finished():
-            self.bubble_cycles += 1
-        
-        for entry in self.reorder_buffer:
-            if entry.busy and entry.instruction:
-                entry.instruction.state_at_cycle[self.current_cycle] = entry.state
+        self._record_cycle_states(skipped.start, len(skipped))
+        self.bubble_cycles += len(skipped)
+        self._record_cycle_stats(self._issue_blocker(), len(skipped))
+        self.current_cycle = target
 
     # Verifica se a simulação terminou
     def is_finished(self):
-        is_all_issued = (self.program_counter >= self.program_length)
+        is_all_issued = self._fetch_instruction(self.program_counter) is None
         is_rob_empty = (self.current_rob_entries == 0)
         return is_all_issued and is_rob_empty
 
+    # Impressão digital da simulação que vai começar: programa decodificado, configuração
+    # (RS por UF, ROB, latências) e estado inicial de registradores e memória. Chamar após
+    # apply_initial_state; é a chave do cache de resultados (tomasulo_cache)
+    def fingerprint(self, max_cycles=None):
+        digest = hashlib.sha256()
+        rs_per_unit = collections.Counter(rs.unit for rs in self.reservation_stations)
+        config = {
+            "version": RESULT_FORMAT_VERSION,
+            "rs": sorted(rs_per_unit.items()),
+            "rob_size": len(self.reorder_buffer),
+            "predictor": self.predictor.describe(),
+            "btb_size": self.btb.size,
+            "early_recovery": bool(self.early_recovery),
+            "opcodes": sorted((opname, info.fu_class, info.latency) for opname, info in OPCODE_TABLE.items()),
+            "registers": sorted((reg.name, reg.value) for reg in self.registers if reg.value),
+            "memory": sorted((number, hashlib.sha256(page).hexdigest())
+                             for number, page in self.memory.pages.items() if any(page)),
+            "max_cycles": max_cycles,
+        }
+        digest.update(json.dumps(config).encode())
+
+        index = 0
+        instruction = self._fetch_instruction(index)
+        while instruction is not None:
+            record = (instruction.opname, instruction.destination, instruction.source1,
+                      instruction.source2, instruction.immediate, instruction.address)
+            digest.update(repr(record).encode())
+            index += 1
+            instruction = self._fetch_instruction(index)
+        return digest.hexdigest()
+
     # Calcula e retorna as métricas de desempenho
     def get_metrics(self):
         total_cycles = self.current_cycle
         ipc = self.committed_instructions_count / total_cycles if total_cycles > 0 else 0
+        stalls = self.stall_counts
+        committed = self.committed_instructions_count
         return {
             "Total Cycles": total_cycles,
             "Committed Instructions": self.committed_instructions_count,
             "IPC": ipc,
             "Bubble Cycles": self.bubble_cycles,
             "Program Counter (PC)": self.program_counter,
+            # Slots de issue perdidos (um por ciclo sem emissão) por causa do bloqueio
+            "Stall ROB Full": stalls[_ROB_FULL],
+            "Stall No Free RS": stalls[_RS_FULL],
+            "Stall Trace Drained": stalls[_TRACE_DRAINED],
+            # Slots de issue gastos com instruções descartadas por misprediction
+            "Stall Mispredict Flush": stalls[_MISPREDICT_FLUSH],
+            # Ciclos x instrução: RS esperando operando, prontas com a UF ocupada, resultado esperando o CDB
+            # (este contado na transmissão)
+            "Stall Operand Not Ready": stalls[_OPERAND_NOT_READY],
+            "Stall FU Busy": stalls[_FU_BUSY],
+            "Stall CDB Contention": stalls[_CDB_CONTENTION],
+            # Desvios confirmados; MPKI = previsões erradas por mil instruções confirmadas
+            "Branch Predictor": self.predictor.describe(),
+            "Branches": self.branch_count,
+            "Branch Mispredictions": self.branch_mispredictions,
+            "Branch Accuracy": 1 - self.branch_mispredictions / self.branch_count if self.branch_count else 0,
+            "MPKI": 1000 * self.branch_mispredictions / committed if committed else 0,
+            # Ciclos médios entre resolver uma previsão errada e redirecionar a busca (0 com early_recovery)
+            "Recovery Latency": self.recovery_cycles / self.branch_mispredictions if self.branch_mispredictions else 0,
+            # Ciclos com k entradas ocupadas, k = índice da lista
+            "ROB Occupancy": list(self.rob_occupancy),
+            "RS Occupancy": self._rs_occupancy_histograms(),
         }
 
+    # Histogramas das RS incluindo os ciclos desde a última mudança de cada pool
+    def _rs_occupancy_histograms(self):
+        histograms = {}
+        for unit, histogram in self.rs_occupancy.items():
+            histogram = list(histogram)
+            # Índice = RS ocupadas = tamanho do pool - livres
+            histogram[-1 - len(self.free_rs[unit])] += self.current_cycle - self.rs_occupancy_since[unit] + 1
+            histograms[unit] = histogram
+        return histograms
+
     # Reseta o simulador para o estado inicial
     def reset_simulator(self):
+        self.close_trace()
         self.register_file = {}
-        self.memory = collections.defaultdict(int)
+        self.registers = []
+        self.memory = Memory()
         self.program_counter = 0
         self.program_length = 0
 
-        for rs in self.reservation_stations: rs.clear()
+        self._clear_all_rs()
         for rob_pos in self.reorder_buffer: rob_pos.clear()
+        self._reset_uop_pool()
+        self.wakeup_lists = TrackedDict()
+        self.completed_queue = []
         
         self.rob_head = 0
         self.rob_tail = 0
@@ -696,339 +1375,142 @@ class TomasuloSimulator:
         self.current_cycle = 0
         self.committed_instructions_count = 0
         self.bubble_cycles = 0
+        self._reset_counters()
+        self._reset_predictor()
+        self.instruction_states = InstructionStates() if self.record_states else None
         self.is_running = False
         self.history.clear() # Limpa histórico ao resetar
-
-# --- Classe TomasuloGUI ---
-class TomasuloGUI:
-    def __init__(self, master, simulator):
-        self.master = master
-        self.master.title("Simulador Tomasulo")
-        self.simulator = simulator
-        self.running_auto = False
-
-        self._create_dummy_instructions_file()
-
-        self.setup_ui()
-        self.load_initial_program()
-
-    def _create_dummy_instructions_file(self):
-        filename = "instructions.txt"
-        if os.path.exists(filename) and os.path.getsize(filename) > 0:
-            return
-
-        with open(filename, "w") as f:
-            f.write("""
-# --- Teste de Previsao de Branch: Tomado (TAKEN) - Cenário de Misprediction ---
-ADD R3, R1, R2          # R3 = 5 + 5 = 10
-SUB R4, R3, R1          # R4 = 10 - 5 = 5
-SUB R3, R3, R2          # R3 = 5 - 5 = 0
-ADD R4, R3, R0          # R4 = 0 + 0 = 0
-BEQ R4, R0, 7           # R4 (0) == R0 (0) --> DESVIA (TAKEN). Previsao NOT_TAKEN INCORRETA.
-ADD R5, R1, R2          # Caminho SEQUENCIAL (sera limpo) - indice 5
-MUL R5, R5, R0          # Caminho SEQUENCIAL (sera limpo) - indice 6
-SUB R5, R1, R0          # Caminho do DESVIO (CORRETO) - indice 7
-DIV R6, R1, R2          # Continua - indice 8
-""")
-
-    def setup_ui(self):
-
-        
-        self.master.grid_rowconfigure(0, weight=0) # Controles
-        self.master.grid_rowconfigure(1, weight=0) # ROB
-        self.master.grid_rowconfigure(2, weight=1) # Resto do Conteúdo
-        
-        # Colunas da área principal (Row 2)
-        self.master.grid_columnconfigure(0, weight=3) # Esquerda (Main: RS, Regs, Mem)
-        self.master.grid_columnconfigure(1, weight=1) # Direita (Sidebar: Métricas, Trace)
-
-        # =================================================================
-        # 1. LINHA 0: BARRA DE CONTROLE (BOTÕES)
-        # =================================================================
-        control_frame = ttk.Frame(self.master, padding="5", relief="groove")
-        control_frame.grid(row=0, column=0, columnspan=2, sticky="ew", padx=5, pady=5)
-        
-        btn_container = ttk.Frame(control_frame)
-        btn_container.pack(anchor="center")
-
-        self.prev_cycle_button = ttk.Button(btn_container, text="⏪ Ciclo Anterior", command=self.prev_cycle, state="disabled")
-        self.prev_cycle_button.pack(side="left", padx=5)
-
-        self.next_cycle_button = ttk.Button(btn_container, text="Próximo Ciclo ⏩", command=self.next_cycle)
-        self.next_cycle_button.pack(side="left", padx=5)
-
-        self.run_all_button = ttk.Button(btn_container, text="▶ Executar Tudo", command=self.run_all)
-        self.run_all_button.pack(side="left", padx=5)
-
-        self.reset_button = ttk.Button(btn_container, text="🔄 Reiniciar", command=self.reset_simulation)
-        self.reset_button.pack(side="left", padx=5)
-        
-        self.load_program_button = ttk.Button(btn_container, text="📂 Carregar Programa", command=self.load_initial_program)
-        self.load_program_button.pack(side="left", padx=5)
-
-        # =================================================================
-        # 2. LINHA 1: ROB (BUFFER DE REORDENAÇÃO) - PERTO DOS BOTÕES
-        # =================================================================
-        rob_frame = ttk.LabelFrame(self.master, text="Buffer de Reordenação (ROB)", padding="5")
-        rob_frame.grid(row=1, column=0, columnspan=2, sticky="nsew", padx=5, pady=(0, 5))
-        # Altura fixa sugerida ou peso pequeno para não ocupar tudo
-        
-        self.rob_tree = self._create_treeview(rob_frame, 
-            ["ID", "Ocupado", "Instrucao", "Estado", "Reg. Dest.", "Valor", "Tipo", "Previsto", "Real"],
-            {"ID": 30, "Ocupado": 60, "Instrucao": 180, "Estado": 90, "Reg. Dest.": 70, "Valor": 60, "Tipo": 60, "Previsto": 60, "Real": 60}
-        )
-        self.rob_tree.configure(height=8) # Limita a altura visual inicial para não empurrar tudo
-        self.rob_tree.pack(fill="both", expand=True)
-
-        # =================================================================
-        # 3. LINHA 2, COLUNA 1 (DIREITA): SIDEBAR (MÉTRICAS E TRACE)
-        # =================================================================
-        sidebar_frame = ttk.Frame(self.master, padding="0")
-        sidebar_frame.grid(row=2, column=1, sticky="nsew", padx=5, pady=5)
-        sidebar_frame.grid_rowconfigure(1, weight=1) # Trace expande
-        sidebar_frame.grid_columnconfigure(0, weight=1)
-
-        # 3A. Métricas (Topo da Sidebar)
-        metrics_frame = ttk.LabelFrame(sidebar_frame, text="Métricas", padding="5")
-        metrics_frame.grid(row=0, column=0, sticky="ew", pady=(0, 5))
-        
-        self.metrics_labels = {}
-        metrics_order = ["Total Cycles", "Committed Instructions", "IPC", "Bubble Cycles", "Program Counter (PC)"]
-        
-        for i, metric in enumerate(metrics_order):
-            lbl_title = ttk.Label(metrics_frame, text=f"{metric}:", font=('Arial', 9, 'bold'))
-            lbl_title.grid(row=i, column=0, sticky="w", padx=2, pady=1)
-            
-            val_lbl = ttk.Label(metrics_frame, text="0", foreground="blue")
-            val_lbl.grid(row=i, column=1, sticky="e", padx=2, pady=1)
-            self.metrics_labels[metric] = val_lbl
-
-        # 3B. Trace de Instruções (Resto da Sidebar)
-        trace_frame = ttk.LabelFrame(sidebar_frame, text="Instruções (Trace)", padding="5")
-        trace_frame.grid(row=1, column=0, sticky="nsew")
-        
-        self.program_text = scrolledtext.ScrolledText(trace_frame, wrap=tk.WORD, width=30, height=20, state='disabled')
-        self.program_text.pack(fill="both", expand=True)
-
-        # =================================================================
-        # 4. LINHA 2, COLUNA 0 (ESQUERDA): RESTANTE (RS, REGS, MEM)
-        # =================================================================
-        main_content_frame = ttk.Frame(self.master, padding="0")
-        main_content_frame.grid(row=2, column=0, sticky="nsew", padx=5, pady=5)
-        main_content_frame.grid_rowconfigure(0, weight=1) # RS
-        main_content_frame.grid_rowconfigure(1, weight=1) # Regs/Mem
-        main_content_frame.grid_columnconfigure(0, weight=1)
-
-        # 4A. Reservation Stations (RS)
-        rs_frame = ttk.LabelFrame(main_content_frame, text="Estações de Reserva (RS)", padding="5")
-        rs_frame.grid(row=0, column=0, sticky="nsew", pady=(0, 5))
-        
-        self.rs_tree = self._create_treeview(rs_frame,
-            ["Nome", "Ocupado", "Op", "Vj", "Vk", "Qj", "Qk", "ROB Dest."],
-            {"Nome": 60, "Ocupado": 60, "Op": 50, "Vj": 70, "Vk": 70, "Qj": 50, "Qk": 50, "ROB Dest.": 80}
-        )
-        self.rs_tree.pack(fill="both", expand=True)
-
-        # 4B. Registradores e Memória (Lado a Lado na parte inferior da área principal)
-        data_frame = ttk.Frame(main_content_frame)
-        data_frame.grid(row=1, column=0, sticky="nsew")
-        data_frame.grid_columnconfigure(0, weight=1)
-        data_frame.grid_columnconfigure(1, weight=1)
-        data_frame.grid_rowconfigure(0, weight=1)
-
-        # Registradores
-        reg_frame = ttk.LabelFrame(data_frame, text="Registradores")
-        reg_frame.grid(row=0, column=0, sticky="nsew", padx=(0, 2))
-        self.reg_tree = self._create_treeview(reg_frame,
-            ["Reg", "Val", "Tag", "Busy"],
-            {"Reg": 50, "Val": 60, "Tag": 50, "Busy": 50}
-        )
-        self.reg_tree.pack(fill="both", expand=True)
-
-        # Memória
-        mem_frame = ttk.LabelFrame(data_frame, text="Memória")
-        mem_frame.grid(row=0, column=1, sticky="nsew", padx=(2, 0))
-        self.mem_tree = self._create_treeview(mem_frame,
-            ["End.", "Valor"],
-            {"End.": 60, "Valor": 60}
-        )
-        self.mem_tree.pack(fill="both", expand=True)
-
-    def _create_treeview(self, parent_frame, columns, widths):
-        frame = ttk.Frame(parent_frame)
-        
-        tree = ttk.Treeview(parent_frame, columns=columns, show="headings")
-        for col in columns:
-            tree.heading(col, text=col)
-            tree.column(col, width=widths.get(col, 100), anchor="center")
-            
-        vsb = ttk.Scrollbar(parent_frame, orient="vertical", command=tree.yview)
-        tree.configure(yscrollcommand=vsb.set)
-        
-        vsb.pack(side="right", fill="y")
-
-        return tree
-
-    def load_initial_program(self):
-        self.simulator.reset_simulator()
-        if self.simulator.load_instructions():
-            self.program_text.config(state='normal')
-            self.program_text.delete(1.0, tk.END)
-            for idx, inst in enumerate(self.simulator.program_instructions):
-                self.program_text.insert(tk.END, f"[{idx}]: {inst}\n")
-            self.program_text.config(state='disabled')
-            self.initial_program_loaded = True
-            messagebox.showinfo("Sucesso", "Programa de instruções carregado com sucesso!")
-        else:
-            self.initial_program_loaded = False
-        
-        if 'R0' not in self.simulator.register_file: self.simulator.register_file['R0'] = Register('R0')
-        self.simulator.register_file['R0'].value = 0 
-        self.simulator.register_file['R0'].clear() 
-
-        if 'R1' not in self.simulator.register_file: self.simulator.register_file['R1'] = Register('R1')
-        self.simulator.register_file['R1'].value = 5
-        if 'R2' not in self.simulator.register_file: self.simulator.register_file['R2'] = Register('R2')
-        self.simulator.register_file['R2'].value = 5
-
-        self.simulator.memory[108] = 5
-        self.simulator.memory[16] = 0
-        self.simulator.memory[12] = 7
-        
-        self.update_gui()
-
-    def prev_cycle(self):
-        if not self.initial_program_loaded:
-            return
-        
-        success = self.simulator.step_back()
-        if success:
-            self.running_auto = False 
-            self.update_gui()
-        else:
-            messagebox.showinfo("Info", "Início da simulação alcançado.")
-
-    def next_cycle(self):
-        if not self.initial_program_loaded:
-            messagebox.showwarning("Aviso", "Por favor, carregue um programa primeiro.")
-            return
-
-        if not self.simulator.is_finished():
-            self.simulator.clock_tick()
-            self.update_gui()
-            if self.simulator.is_finished():
-                messagebox.showinfo("Simulação Concluída", "Todas as instruções foram processadas!")
-                self.running_auto = False 
-        else:
-            messagebox.showinfo("Simulação Concluída", "Todas as instruções já foram processadas!")
-            self.running_auto = False
-
-    def run_all(self):
-        if not self.initial_program_loaded:
-            messagebox.showwarning("Aviso", "Por favor, carregue um programa primeiro.")
-            return
-        
-        self.running_auto = True
-        self._run_all_cycles()
-
-    def _run_all_cycles(self):
-        if self.running_auto and not self.simulator.is_finished():
-            self.simulator.clock_tick()
-            self.update_gui()
-            self.master.after(100, self._run_all_cycles)
-        elif self.simulator.is_finished():
-            messagebox.showinfo("Simulação Concluída", "Todas as instruções foram processadas!")
-            self.running_auto = False
-
-    def reset_simulation(self):
-        self.running_auto = False
-        self.simulator.reset_simulator()
-        self.load_initial_program()
-        messagebox.showinfo("Reiniciar", "Simulação reiniciada.")
-
-    def update_gui(self):
-        if hasattr(self, 'prev_cycle_button'):
-            if self.simulator.current_cycle > 0 and self.simulator.history:
-                self.prev_cycle_button.config(state="normal")
-            else:
-                self.prev_cycle_button.config(state="disabled")
-
-        # Atualiza ROB
-        for i in self.rob_tree.get_children():
-            self.rob_tree.delete(i)
-        for entry in self.simulator.reorder_buffer:
-            self.rob_tree.insert("", "end", values=(
-                entry.id,
-                "Sim" if entry.busy else "Não",
-                str(entry.instruction) if entry.instruction else "",
-                entry.state,
-                str(entry.destination_reg) if entry.destination_reg else "",
-                str(entry.value) if entry.value is not None else "",
-                entry.inst_type,
-                "T" if entry.predicted_taken == PREDICT_TAKEN else ("NT" if entry.predicted_taken == PREDICT_NOT_TAKEN else ""),
-                "T" if entry.actual_taken == PREDICT_TAKEN else ("NT" if entry.actual_taken == PREDICT_NOT_TAKEN else "")
-            ))
-        
-        # Atualiza RS
-        for i in self.rs_tree.get_children():
-            self.rs_tree.delete(i)
-        for rs in self.simulator.reservation_stations:
-            self.rs_tree.insert("", "end", values=(
-                rs.name,
-                "Sim" if rs.busy else "Não",
-                str(rs.op) if rs.op else "",
-                str(rs.Vj) if rs.Vj is not None else "",
-                str(rs.Vk) if rs.Vk is not None else "",
-                str(rs.Qj) if rs.Qj is not None else "",
-                str(rs.Qk) if rs.Qk is not None else "",
-                str(rs.destination_rob_id) if rs.destination_rob_id is not None else ""
-            ))
-
-        # Atualiza Registradores
-        for i in self.reg_tree.get_children():
-            self.reg_tree.delete(i)
-        sorted_regs = sorted(self.simulator.register_file.values(), key=lambda r: r.name)
-        for reg in sorted_regs:
-            self.reg_tree.insert("", "end", values=(
-                reg.name,
-                str(reg.value),
-                str(reg.reorder_tag) if reg.reorder_tag is not None else "",
-                "Sim" if reg.busy else "Não"
-            ))
-
-        # Atualiza Memória
-        for i in self.mem_tree.get_children():
-            self.mem_tree.delete(i)
-        accessed_memory = sorted([addr for addr, val in self.simulator.memory.items() if val != 0 or addr in [108, 211, 16, 12]])
-        for addr in accessed_memory: 
-            self.mem_tree.insert("", "end", values=(f"End. {addr}", self.simulator.memory[addr]))
-        if not accessed_memory:
-             for i in range(5):
-                 self.mem_tree.insert("", "end", values=(f"End. {i}", self.simulator.memory[i]))
-
-        # Atualiza Métricas
-        metrics = self.simulator.get_metrics()
-        self.metrics_labels["Total Cycles"].config(text=str(metrics["Total Cycles"]))
-        self.metrics_labels["Committed Instructions"].config(text=str(metrics["Committed Instructions"]))
-        self.metrics_labels["IPC"].config(text=f"{metrics['IPC']:.2f}")
-        self.metrics_labels["Bubble Cycles"].config(text=str(metrics["Bubble Cycles"]))
-        self.metrics_labels["Program Counter (PC)"].config(text=str(self.simulator.program_counter))
-
-        # Highlight na linha atual do código
-        self.program_text.config(state='normal')
-        for tag in self.program_text.tag_names():
-            if tag.startswith("state_") or tag == "highlight":
-                self.program_text.tag_remove(tag, "1.0", tk.END)
-
-        if self.simulator.program_counter < len(self.simulator.program_instructions):
-            line_number = self.simulator.program_counter + 1
-            self.program_text.tag_add("highlight", f"{line_number}.0", f"{line_number}.end")
-            self.program_text.tag_config("highlight", background="yellow")
-        
-        self.program_text.config(state='disabled')
+        self.keyframes.clear()
+
+# --- Modo headless (linha de comando) ---
+# result_cache: ResultCache (tomasulo_cache) consultado antes de simular
+# memory_image: imagem carregada na memória em image_base antes de simular
+# profiler: StageProfiler (tomasulo_profile) que acumula o tempo de cada estágio
+# timeline: gravador de tomasulo_timeline (fechado por quem chamou); força a simulação
+# mesmo com o resultado no cache
+def run_trace(filename, max_cycles=None, verbose=False, window_size=4096, use_cache=True,
+              result_cache=None, memory_image=None, image_base=0, profiler=None, timeline=None,
+              **sim_config):
+    simulator = TomasuloSimulator(record_history=False, verbose=verbose, **sim_config)
+    if profiler is not None:
+        simulator.enable_profiling(profiler)
+    simulator.timeline = timeline
+    if not simulator.load_instructions(filename, stream=True, window_size=window_size, use_cache=use_cache):
+        raise FileNotFoundError(simulator.load_error)
+    try:
+        simulator.apply_initial_state()
+        if memory_image is not None:
+            simulator.load_memory_image(memory_image, image_base)
+        key = None
+        if result_cache is not None:
+            key = simulator.fingerprint(max_cycles)
+            cached = result_cache.get(key) if timeline is None else None
+            if cached is not None:
+                cached["Trace"] = filename
+                return cached
+        finished = simulator.run_to_completion(max_cycles)
+    finally:
+        simulator.close_trace()
+
+    result = {"Trace": filename}
+    result.update(simulator.get_metrics())
+    result["Finished"] = finished
+    if key is not None:
+        result_cache.put(key, result)
+    return result
+
+def _write_results(results, fmt, out):
+    if fmt == "json":
+        for result in results:
+            out.write(json.dumps(result) + "\n")
+            out.flush()
+        return
+    writer = None
+    for result in results:
+        if writer is None:
+            writer = csv.DictWriter(out, fieldnames=list(result.keys()))
+            writer.writeheader()
+        writer.writerow(result)
+        out.flush()
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Simulador Tomasulo. Sem traces abre a GUI; com traces roda em modo headless.")
+    parser.add_argument("traces", nargs="*", help="arquivos de trace a simular")
+    parser.add_argument("--format", choices=["json", "csv"], default="json",
+                        help="formato da saída das métricas (json = uma linha por trace)")
+    parser.add_argument("--max-cycles", type=int, default=None,
+                        help="interrompe a simulação após N ciclos (traces com laços infinitos)")
+    parser.add_argument("--mem-rs", type=int, default=2)
+    parser.add_argument("--add-rs", type=int, default=3)
+    parser.add_argument("--logic-rs", type=int, default=2)
+    parser.add_argument("--mult-rs", type=int, default=1)
+    parser.add_argument("--rob-size", type=int, default=8)
+    parser.add_argument("--predictor", type=parse_predictor, default="not_taken", metavar="NOME[:BITS]",
+                        help=f"preditor de desvios: {', '.join(PREDICTORS)} (bht/gshare aceitam :bits, padrão 10)")
+    parser.add_argument("--btb-size", type=int, default=64, help="entradas do BTB (0 = sem BTB)")
+    parser.add_argument("--early-recovery", action="store_true",
+                        help="recupera mispredictions quando o desvio é resolvido na execução (padrão: no commit)")
+    parser.add_argument("--window", type=int, default=4096,
+                        help="instruções decodificadas mantidas em memória durante a leitura do trace")
+    parser.add_argument("--no-cache", action="store_true",
+                        help="lê o trace de texto sem usar/gerar a versão compilada em .tomasulo_cache/")
+    parser.add_argument("--result-cache", nargs="?", const=DEFAULT_CACHE_DIR, default=None, metavar="DIR",
+                        help=f"reaproveita resultados de simulações idênticas (padrão: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--memory-image", default=None, metavar="ARQ",
+                        help="imagem inicial da memória: binário bruto ou .hex (um byte por token, @endereço)")
+    parser.add_argument("--image-base", type=functools.partial(int, base=0), default=0,
+                        help="endereço onde a imagem é carregada (aceita 0x...)")
+    parser.add_argument("--profile", action="store_true",
+                        help="mede o tempo de cada estágio do clock_tick (resumo em stderr ao final; na GUI, painel ligado)")
+    parser.add_argument("--timeline", default=None, metavar="ARQ",
+                        help="grava a linha do tempo do pipeline (um trace por vez)")
+    parser.add_argument("--timeline-format", choices=sorted(TIMELINE_FORMATS), default=None,
+                        help="formato da linha do tempo (padrão: chrome para .json, konata para o resto)")
+    parser.add_argument("--keyframe-interval", type=int, default=None,
+                        help="GUI: guarda um keyframe a cada N ciclos em vez do histórico de diffs")
+    parser.add_argument("-v", "--verbose", action="store_true",
+                        help="mostra mensagens de misprediction durante a simulação (em stderr)")
+    args = parser.parse_args(argv)
+
+    if not args.traces:
+        # Importa a GUI somente quando necessário (tkinter não é carregado no modo headless)
+        from tomasulo_gui import main as gui_main
+        gui_main(args.keyframe_interval, args.profile, args.predictor, args.btb_size, args.early_recovery)
+        return 0
+
+    sim_config = dict(num_mem_rs=args.mem_rs, num_add_rs=args.add_rs, num_logic_rs=args.logic_rs,
+                      num_mult_rs=args.mult_rs, rob_size=args.rob_size,
+                      predictor=args.predictor, btb_size=args.btb_size, early_recovery=args.early_recovery)
+    result_cache = ResultCache(args.result_cache) if args.result_cache else None
+    profiler = StageProfiler() if args.profile else None
+    if args.timeline and len(args.traces) > 1:
+        parser.error("--timeline grava um único trace")
+    failures = []
+
+    def results():
+        for filename in args.traces:
+            try:
+                # Mensagens do simulador vão para stderr para não misturar com as métricas
+                with contextlib.ExitStack() as stack:
+                    stack.enter_context(contextlib.redirect_stdout(sys.stderr))
+                    timeline = None
+                    if args.timeline:
+                        timeline = stack.enter_context(open_timeline(args.timeline, args.timeline_format))
+                    result = run_trace(filename, args.max_cycles, args.verbose, args.window,
+                                       not args.no_cache, result_cache, args.memory_image,
+                                       args.image_base, profiler, timeline, **sim_config)
+            except (FileNotFoundError, ValueError) as e:
+                # Trace ausente ou imagem de memória malformada
+                print(f"Erro: {e}", file=sys.stderr)
+                failures.append(filename)
+                continue
+            yield result
+
+    _write_results(results(), args.format, sys.stdout)
+    if profiler is not None:
+        print(profiler.format_report(), file=sys.stderr)
+    return 1 if failures else 0
 
 if __name__ == "__main__":
-    root = tk.Tk()
-    simulator_instance = TomasuloSimulator()
-    gui = TomasuloGUI(root, simulator_instance)
-    root.mainloop()
\ No newline at end of file
+    sys.exit(main())
@@ -0,0 +1,139 @@
+# --- Linha do tempo colunar dos estados das instruções ---
+#
+# Guarda o estado de cada instrução em voo no fim de cada ciclo em arrays
+# tipados só de acréscimo (uma linha por instrução por ciclo): número de
+# sequência da instância dinâmica, ciclo e código do estado. As linhas são
+# gravadas em ordem de ciclo, então as consultas por ciclo são uma busca binária.
+# Cada instância dinâmica (uma instrução re-emitida depois de um flush ganha um
+# número novo) também guarda o índice no programa e a primeira linha gravada.
+#
+# Histórico: o tamanho lógico (rows, count) é um campo rastreado, então desfazer
+# um ciclo ou restaurar um keyframe só volta o tamanho, sem copiar os arrays a
+# cada ciclo. As linhas além do tamanho são sobrescritas quando os ciclos são
+# refeitos; como o replay é determinístico, elas continuam valendo para um
+# keyframe posterior restaurado mais tarde.
+
+import bisect
+from array import array
+
+from tomasulo_history import Tracked
+
+# Estados do ROB, na ordem do código gravado
+STATES = ("Issued", "Executing", "Ready to Write", "Write Result", "Commit")
+STATE_CODES = {state: code for code, state in enumerate(STATES)}
+
+
+# --- Classe InstructionStates ---
+class InstructionStates(Tracked):
+    def __init__(self):
+        # Uma posição por linha
+        self.seqs = array('q')
+        self.cycles = array('q')
+        self.codes = array('b')
+        # Uma posição por instância dinâmica (índice = número de sequência)
+        self.pcs = array('q')
+        self.first_rows = array('q')
+        self.rows = 0
+        self.count = 0
+
+    # Nova instância dinâmica da instrução no índice pc do programa; devolve o número de sequência
+    def begin_instruction(self, pc):
+        seq = self.count
+        if seq < len(self.pcs):
+            self.pcs[seq] = pc
+            self.first_rows[seq] = self.rows
+        else:
+            self.pcs.append(pc)
+            self.first_rows.append(self.rows)
+        self.count = seq + 1
+        return seq
+
+    # Estados (nomes de STATES) das instâncias seqs no fim do ciclo, repetidos por
+    # cycles ciclos seguidos (ciclos ociosos pulados de uma vez)
+    def record(self, cycle, seqs, states, cycles=1):
+        n = len(seqs)
+        if not n:
+            return
+        codes = list(map(STATE_CODES.__getitem__, states))
+        row = self.rows
+        if cycles == 1 and row == len(self.seqs):
+            # Caso comum: um ciclo acrescentado no fim
+            self.seqs.fromlist(seqs)
+            self.cycles.fromlist([cycle] * n)
+            self.codes.fromlist(codes)
+            self.rows = row + n
+            return
+        seqs = array('q', seqs)
+        codes = array('b', codes)
+        for c in range(cycle, cycle + cycles):
+            # Atribuição por fatia: acrescenta no fim ou sobrescreve linhas de ciclos desfeitos
+            self.seqs[row:row + n] = seqs
+            self.cycles[row:row + n] = array('q', [c]) * n
+            self.codes[row:row + n] = codes
+            row += n
+        self.rows = row
+
+    # Faixa [início, fim) das linhas do ciclo
+    def _cycle_rows(self, cycle):
+        start = bisect.bisect_left(self.cycles, cycle, 0, self.rows)
+        return start, bisect.bisect_right(self.cycles, cycle, start, self.rows)
+
+    # Estado da instância seq no fim do ciclo, ou None se ela não estava em voo
+    def state_at(self, seq, cycle):
+        start, end = self._cycle_rows(cycle)
+        seqs = self.seqs
+        for row in range(start, end):
+            if seqs[row] == seq:
+                return STATES[self.codes[row]]
+        return None
+
+    # Números de sequência das instâncias no estado dado no fim do ciclo
+    def instructions_in(self, state, cycle):
+        code = STATE_CODES[state]
+        start, end = self._cycle_rows(cycle)
+        seqs, codes = self.seqs, self.codes
+        return [seqs[row] for row in range(start, end) if codes[row] == code]
+
+    # [(ciclo, estado)] da instância seq, do issue até a última linha gravada
+    def history(self, seq):
+        if not 0 <= seq < self.count:
+            raise IndexError(f"Instância {seq} não registrada")
+        timeline = []
+        seqs, cycles = self.seqs, self.cycles
+        for row in range(self.first_rows[seq], self.rows):
+            if seqs[row] == seq:
+                timeline.append((cycles[row], STATES[self.codes[row]]))
+            elif timeline and cycles[row] > timeline[-1][0] + 1:
+                # A instância fica em voo em ciclos consecutivos: saiu do ROB
+                break
+        return timeline
+
+    # Índice no programa da instância seq
+    def pc_of(self, seq):
+        if not 0 <= seq < self.count:
+            raise IndexError(f"Instância {seq} não registrada")
+        return self.pcs[seq]
+
+    # Colunas como arrays NumPy (cópias): "seq", "cycle" e "state" por linha (state = índice
+    # em STATES) e "pc" por instância dinâmica (índice = número de sequência)
+    def to_numpy(self):
+        try:
+            import numpy
+        except ImportError:
+            raise RuntimeError("A exportação para NumPy requer o pacote numpy (pip install numpy)")
+        return {
+            "seq": numpy.frombuffer(self.seqs[:self.rows], dtype=numpy.int64),
+            "cycle": numpy.frombuffer(self.cycles[:self.rows], dtype=numpy.int64),
+            "state": numpy.frombuffer(self.codes[:self.rows], dtype=numpy.int8),
+            "pc": numpy.frombuffer(self.pcs[:self.count], dtype=numpy.int64),
+        }
+
+    # Só o tamanho lógico vai para os keyframes: as linhas anteriores nunca mudam
+    def get_state(self):
+        return (self.rows, self.count)
+
+    def set_state(self, state):
+        self.rows, self.count = state
+
+    def __len__(self):
+        return self.rows
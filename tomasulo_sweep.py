@@ -0,0 +1,179 @@
+# --- Varredura do espaço de projeto ---
+#
+# Roda cada trace em cada configuração de TomasuloSimulator (número de RS,
+# tamanho do ROB, preditor de desvios, BTB e recuperação de misprediction) num
+# pool de processos e grava as métricas em CSV, uma linha por execução, assim
+# que cada uma termina. O CSV também serve de registro do
+# que já foi feito: rodar de novo com a mesma saída só simula os pontos que
+# faltam (continua uma varredura interrompida).
+#
+#   python tomasulo_sweep.py trace_*.txt --rob-size 4 8 16 --add-rs 1 2 3 -o sweep.csv
+
+import argparse
+import contextlib
+import csv
+import itertools
+import json
+import multiprocessing
+import os
+import sys
+
+from tomasulo_cache import DEFAULT_CACHE_DIR, ResultCache
+from tomasulo_predict import parse_predictor
+from tomasulo_sim import BRANCH_METRICS, STALL_METRICS, run_trace
+
+# Parâmetros de TomasuloSimulator varridos, na ordem das colunas do CSV
+CONFIG_FIELDS = ("num_mem_rs", "num_add_rs", "num_logic_rs", "num_mult_rs", "rob_size", "predictor", "btb_size",
+                 "early_recovery")
+DEFAULT_CONFIG = {"num_mem_rs": 2, "num_add_rs": 3, "num_logic_rs": 2, "num_mult_rs": 1, "rob_size": 8,
+                  "predictor": "not_taken", "btb_size": 64, "early_recovery": 0}
+
+
+# Produto cartesiano dos valores de cada parâmetro (os ausentes ficam no padrão)
+def config_grid(**values):
+    fields = [field for field in CONFIG_FIELDS if field in values]
+    for combination in itertools.product(*(values[field] for field in fields)):
+        config = dict(DEFAULT_CONFIG)
+        config.update(zip(fields, combination))
+        yield config
+
+
+def _run_key(trace, config):
+    return (trace,) + tuple(str(config[field]) for field in CONFIG_FIELDS)
+
+
+# Executado nos processos do pool: uma simulação completa, sem histórico. Qualquer erro
+# (trace ausente ou inválido, falha na simulação) vai para a coluna Error do ponto, sem
+# interromper os demais
+def _run_point(point):
+    trace, config, max_cycles, cache_dir = point
+    row = {"Trace": trace}
+    row.update(config)
+    with contextlib.redirect_stdout(sys.stderr):
+        try:
+            result_cache = ResultCache(cache_dir) if cache_dir else None
+            row.update(run_trace(trace, max_cycles, result_cache=result_cache, **config))
+        except FileNotFoundError as e:
+            row["Error"] = str(e)
+        except Exception as e:
+            row["Error"] = f"{type(e).__name__}: {e}"
+        if "Error" in row:
+            print(f"Erro em {trace} ({config}): {row['Error']}")
+    return row
+
+
+# Pontos já gravados numa saída anterior. Uma linha cortada pela interrupção é
+# descartada (o arquivo é truncado no último fim de linha). Pontos que terminaram com
+# erro não contam: as linhas deles saem do arquivo e eles são simulados de novo
+def _completed_runs(output):
+    if not os.path.exists(output):
+        return set()
+    with open(output, 'rb+') as f:
+        data = f.read()
+        end = data.rfind(b"\n") + 1
+        if end < len(data):
+            f.truncate(end)
+
+    with open(output, 'r', newline='') as f:
+        reader = csv.DictReader(f)
+        rows = list(reader)
+    completed = [row for row in rows if not row.get("Error")]
+    if len(completed) < len(rows):
+        tmp = f"{output}.{os.getpid()}.tmp"
+        with open(tmp, 'w', newline='') as f:
+            writer = csv.DictWriter(f, fieldnames=reader.fieldnames)
+            writer.writeheader()
+            writer.writerows(completed)
+        os.replace(tmp, output)
+    return {_run_key(row["Trace"], row) for row in completed}
+
+
+# Roda todos os pares (trace, configuração) que ainda não estão em output e devolve
+# quantos foram simulados. processes=None usa todos os núcleos; com cache_dir os
+# resultados ficam no cache persistente e servem para outras varreduras
+def sweep(traces, configs, output, processes=None, max_cycles=None, resume=True, cache_dir=None):
+    configs = list(configs)
+    done = _completed_runs(output) if resume else set()
+    points = [(trace, config, max_cycles, cache_dir) for trace in traces for config in configs
+              if _run_key(trace, config) not in done]
+    if not points:
+        return 0
+
+    fieldnames = ["Trace", *CONFIG_FIELDS, "Total Cycles", "Committed Instructions", "IPC",
+                  "Bubble Cycles", "Program Counter (PC)", *STALL_METRICS, *BRANCH_METRICS, "Finished", "Error"]
+    write_header = not (resume and os.path.exists(output) and os.path.getsize(output) > 0)
+
+    processes = processes or os.cpu_count() or 1
+    with open(output, 'a' if resume else 'w', newline='') as out:
+        writer = csv.DictWriter(out, fieldnames=fieldnames, extrasaction='ignore')
+        if write_header:
+            writer.writeheader()
+        if processes == 1:
+            rows = map(_run_point, points)
+            pool = None
+        else:
+            pool = multiprocessing.Pool(processes)
+            rows = pool.imap_unordered(_run_point, points, chunksize=max(1, len(points) // (processes * 16)))
+        try:
+            for row in rows:
+                writer.writerow(row)
+                out.flush()
+        finally:
+            if pool is not None:
+                pool.terminate()
+                pool.join()
+    return len(points)
+
+
+# Converte o CSV da varredura para Parquet (formato colunar); requer pyarrow
+def write_parquet(csv_path, parquet_path):
+    try:
+        import pyarrow.csv
+        import pyarrow.parquet
+    except ImportError:
+        raise RuntimeError("A saída em Parquet requer o pacote pyarrow (pip install pyarrow)")
+    pyarrow.parquet.write_table(pyarrow.csv.read_csv(csv_path), parquet_path)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(
+        description="Varre configurações do simulador Tomasulo em paralelo e grava as métricas em CSV.")
+    parser.add_argument("traces", nargs="+", help="arquivos de trace a simular")
+    parser.add_argument("-o", "--output", required=True, help="CSV de saída (também usado para continuar)")
+    for field in CONFIG_FIELDS:
+        option = "--" + field.replace("num_", "").replace("_", "-")
+        parser.add_argument(option, dest=field, type=parse_predictor if field == "predictor" else int,
+                            nargs="+", default=None, help=f"valores de {field} (padrão {DEFAULT_CONFIG[field]})")
+    parser.add_argument("--configs", default=None,
+                        help="arquivo JSON com uma lista de configurações (em vez da grade)")
+    parser.add_argument("-j", "--jobs", type=int, default=None, help="processos no pool (padrão: todos os núcleos)")
+    parser.add_argument("--max-cycles", type=int, default=None,
+                        help="interrompe cada simulação após N ciclos (traces com laços infinitos)")
+    parser.add_argument("--restart", action="store_true", help="sobrescreve a saída em vez de continuar")
+    parser.add_argument("--result-cache", nargs="?", const=DEFAULT_CACHE_DIR, default=None, metavar="DIR",
+                        help=f"reaproveita resultados de simulações idênticas (padrão: {DEFAULT_CACHE_DIR})")
+    parser.add_argument("--parquet", default=None, help="ao final, converte o CSV para este arquivo Parquet")
+    args = parser.parse_args(argv)
+
+    if args.configs:
+        with open(args.configs) as f:
+            configs = [dict(DEFAULT_CONFIG, **config) for config in json.load(f)]
+    else:
+        configs = config_grid(**{field: getattr(args, field) for field in CONFIG_FIELDS
+                                 if getattr(args, field) is not None})
+
+    count = sweep(args.traces, configs, args.output, args.jobs, args.max_cycles, resume=not args.restart,
+                  cache_dir=args.result_cache)
+    print(f"{count} simulações executadas; resultados em {args.output}", file=sys.stderr)
+
+    if args.parquet:
+        try:
+            write_parquet(args.output, args.parquet)
+        except RuntimeError as e:
+            print(f"Erro: {e}", file=sys.stderr)
+            return 1
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
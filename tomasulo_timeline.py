@@ -0,0 +1,229 @@
+# --- Exportação da linha do tempo do pipeline ---
+#
+# O simulador chama o gravador a cada transição de estágio de uma instrução
+# emitida (issue, início e fim da execução, write result, commit, retirada) e a
+# cada instrução descartada por misprediction. Cada instância dinâmica recebe um
+# número de sequência próprio, então uma instrução re-emitida depois de um flush
+# aparece de novo, e a versão descartada continua no arquivo como um evento à
+# parte. Os eventos vão direto para o arquivo: a memória usada não cresce com o
+# tamanho da simulação.
+#
+# Formatos:
+# * Chrome Trace Event (JSON; chrome://tracing, Perfetto): uma linha por entrada
+#   do ROB, um bloco por estágio; 1 ciclo = 1 µs na escala do visualizador.
+# * Konata (log "Kanata" 0004): visualizador de pipeline com uma linha por instrução.
+
+import heapq
+import json
+
+# Estágios exibidos: nome curto (Konata) e nome longo (Chrome)
+STAGE_NAMES = {
+    "Is": "Issue",
+    "Ex": "Execute",
+    "Wt": "Wait CDB",
+    "Wb": "Write Result",
+    "Cm": "Commit",
+}
+
+
+# Uma instrução em voo no gravador
+class _TimelineRecord:
+    __slots__ = ("seq", "rob_id", "pc", "text", "stage", "stage_start", "issue_cycle")
+
+    def __init__(self, seq, rob_id, pc, text, cycle):
+        self.seq = seq
+        self.rob_id = rob_id
+        self.pc = pc
+        self.text = text
+        self.stage = None
+        self.stage_start = cycle
+        self.issue_cycle = cycle
+
+
+# --- Classe TimelineRecorder ---
+# Base dos formatos: mantém as instruções em voo por ID do ROB e repassa às
+# subclasses o início de cada estágio (o anterior termina no mesmo ciclo) e o fim
+# de cada instrução
+class TimelineRecorder:
+    def __init__(self, path):
+        self.file = open(path, 'w')
+        self.in_flight = {}
+        self.next_seq = 0
+        self.retired = 0
+        self.last_cycle = 0
+        self._start()
+
+    def issue(self, rob_id, cycle, pc, instruction):
+        record = _TimelineRecord(self.next_seq, rob_id, pc, str(instruction), cycle)
+        self.next_seq += 1
+        self.in_flight[rob_id] = record
+        self._begin_instruction(record, cycle)
+        self._stage(record, "Is", cycle, cycle)
+
+    def execute(self, rob_id, cycle):
+        self._stage(self.in_flight[rob_id], "Ex", cycle, cycle)
+
+    # Último ciclo da execução: a espera pelo CDB começa no ciclo seguinte
+    def finish(self, rob_id, cycle):
+        self._stage(self.in_flight[rob_id], "Wt", cycle + 1, cycle)
+
+    def write_result(self, rob_id, cycle):
+        self._stage(self.in_flight[rob_id], "Wb", cycle, cycle)
+
+    def commit(self, rob_id, cycle):
+        self._stage(self.in_flight[rob_id], "Cm", cycle, cycle)
+
+    def retire(self, rob_id, cycle):
+        record = self.in_flight.pop(rob_id)
+        self._end_instruction(record, cycle, squashed=False)
+        self.retired += 1
+
+    def squash(self, rob_id, cycle):
+        record = self.in_flight.pop(rob_id, None)
+        if record is not None:
+            self._end_instruction(record, cycle, squashed=True)
+
+    # start: ciclo em que o estágio começa; now: ciclo atual da simulação (start >= now)
+    def _stage(self, record, stage, start, now):
+        self.last_cycle = max(self.last_cycle, start)
+        self._on_stage(record, stage, start, now)
+        record.stage = stage
+        record.stage_start = start
+
+    def _end_instruction(self, record, cycle, squashed):
+        self.last_cycle = max(self.last_cycle, cycle)
+        self._on_end(record, cycle, squashed)
+
+    # Fecha o arquivo; as instruções ainda em voo (simulação interrompida) terminam no último ciclo
+    def close(self):
+        if self.file.closed:
+            return
+        for record in list(self.in_flight.values()):
+            self._on_end(record, max(self.last_cycle, record.stage_start), squashed=None)
+        self.in_flight.clear()
+        self._finish()
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+    # Pontos de extensão dos formatos
+    def _start(self):
+        pass
+
+    def _begin_instruction(self, record, cycle):
+        pass
+
+    def _on_stage(self, record, stage, start, now):
+        raise NotImplementedError
+
+    # squashed: True = descartada, False = confirmada, None = ainda em voo no fim da gravação
+    def _on_end(self, record, cycle, squashed):
+        raise NotImplementedError
+
+    def _finish(self):
+        pass
+
+
+# --- Classe ChromeTraceWriter ---
+# Array JSON de eventos "X" (duração completa), escritos quando cada estágio termina.
+# tid = entrada do ROB; as instruções descartadas têm categoria "squashed"
+class ChromeTraceWriter(TimelineRecorder):
+    def _start(self):
+        self.file.write("[\n")
+        self.rob_ids = set()
+
+    def _event(self, event):
+        self.file.write(json.dumps(event))
+        self.file.write(",\n")
+
+    def _span(self, record, name, start, end, category):
+        if end <= start:
+            return
+        self._event({"name": f"{name}: {record.text}", "cat": category, "ph": "X",
+                     "ts": start, "dur": end - start, "pid": 0, "tid": record.rob_id,
+                     "args": {"seq": record.seq, "pc": record.pc}})
+
+    def _begin_instruction(self, record, cycle):
+        self.rob_ids.add(record.rob_id)
+
+    def _on_stage(self, record, stage, start, now):
+        if record.stage is not None:
+            self._span(record, STAGE_NAMES[record.stage], record.stage_start, start, "pipeline")
+
+    def _on_end(self, record, cycle, squashed):
+        category = "squashed" if squashed else "pipeline"
+        self._span(record, STAGE_NAMES[record.stage], record.stage_start, cycle, category)
+        if squashed:
+            # A instrução descartada inteira, do issue ao flush, envolvendo os estágios acima
+            self._span(record, "Squashed", record.issue_cycle, cycle, "squashed")
+            self._event({"name": f"Squash: {record.text}", "cat": "squashed", "ph": "i", "s": "t",
+                         "ts": cycle, "pid": 0, "tid": record.rob_id, "args": {"seq": record.seq}})
+
+    def _finish(self):
+        self._event({"name": "process_name", "ph": "M", "pid": 0, "args": {"name": "ROB"}})
+        for rob_id in sorted(self.rob_ids):
+            self._event({"name": "thread_name", "ph": "M", "pid": 0, "tid": rob_id,
+                         "args": {"name": f"ROB {rob_id}"}})
+        self.file.write(json.dumps({"name": "trace_end", "ph": "i", "s": "g", "ts": self.last_cycle, "pid": 0}))
+        self.file.write("\n]\n")
+
+
+# --- Classe KonataWriter ---
+# Comandos do Kanata em ordem de ciclo. O início da espera pelo CDB é no ciclo seguinte
+# ao evento que o gera, então os comandos passam por um heap e só são escritos quando
+# a simulação chega ao ciclo deles
+class KonataWriter(TimelineRecorder):
+    def _start(self):
+        self.file.write("Kanata\t0004\nC=\t0\n")
+        self.written_cycle = 0
+        self.pending = []
+        self.order = 0
+
+    def _command(self, cycle, line):
+        heapq.heappush(self.pending, (cycle, self.order, line))
+        self.order += 1
+
+    # Escreve os comandos até o ciclo dado
+    def _flush(self, cycle):
+        pending = self.pending
+        while pending and pending[0][0] <= cycle:
+            command_cycle, _, line = heapq.heappop(pending)
+            if command_cycle > self.written_cycle:
+                self.file.write(f"C\t{command_cycle - self.written_cycle}\n")
+                self.written_cycle = command_cycle
+            self.file.write(line)
+
+    def _begin_instruction(self, record, cycle):
+        self._flush(cycle)
+        self._command(cycle, f"I\t{record.seq}\t{record.seq}\t0\n")
+        self._command(cycle, f"L\t{record.seq}\t0\t{record.pc}: {record.text}\n")
+
+    def _on_stage(self, record, stage, start, now):
+        self._flush(now)
+        if record.stage is not None:
+            self._command(start, f"E\t{record.seq}\t0\t{record.stage}\n")
+        self._command(start, f"S\t{record.seq}\t0\t{stage}\n")
+
+    def _on_end(self, record, cycle, squashed):
+        self._flush(cycle)
+        self._command(cycle, f"E\t{record.seq}\t0\t{record.stage}\n")
+        if squashed is not None:
+            retire_id = self.retired if not squashed else 0
+            self._command(cycle, f"R\t{record.seq}\t{retire_id}\t{1 if squashed else 0}\n")
+
+    def _finish(self):
+        self._flush(float("inf"))
+
+
+TIMELINE_FORMATS = {"chrome": ChromeTraceWriter, "konata": KonataWriter}
+
+
+# Formato pela extensão quando não for informado: .json = Chrome, o resto = Konata
+def open_timeline(path, fmt=None):
+    if fmt is None:
+        fmt = "chrome" if path.endswith(".json") else "konata"
+    return TIMELINE_FORMATS[fmt](path)
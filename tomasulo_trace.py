@@ -0,0 +1,293 @@
+# --- Leitura de traces ---
+#
+# Cada linha válida do trace vira um registro (opname, destino, fonte1, fonte2,
+# imediato, endereço); o simulador transforma o registro em Instruction.
+# TraceReader lê esses registros sob demanda, para traces grandes demais para
+# caber inteiros na memória.
+#
+# Formato compilado (.trc): o trace de texto convertido em registros binários de
+# tamanho fixo, lidos direto de um mmap sem parsing. open_trace mantém uma cópia
+# compilada de cada trace em .tomasulo_cache/ e a reaproveita enquanto o arquivo
+# de origem e o decodificador (parser e tabela de opcodes) não mudarem.
+
+import argparse
+import hashlib
+import json
+import mmap
+import os
+import struct
+import sys
+
+
+# Decodifica uma linha do trace; devolve None para linhas vazias, comentários e
+# instruções desconhecidas (estas com aviso, se warn=True)
+def parse_trace_line(line, opcode_table, warn=True):
+    line = line.strip()
+    if not line or line.startswith('#'):
+        return None
+
+    tokens = [t.strip(',') for t in line.split()]
+    opname = tokens[0]
+
+    destination = None
+    source1 = None
+    source2 = None
+    immediate = None
+    address = None
+
+    info = opcode_table.get(opname)
+    if info is None:
+        if warn:
+            print(f"Warning: Instrução '{opname}' não reconhecida na linha: {line}. Ignorando.")
+        return None
+
+    operand_format = info.operand_format
+    if operand_format == "R":
+        destination, source1, source2 = tokens[1], tokens[2], tokens[3]
+    elif operand_format == "I":
+        destination, source1 = tokens[1], tokens[2]
+        immediate = int(tokens[3])
+    elif operand_format == "LOAD":
+        destination, source1 = tokens[1], tokens[2]
+        address = int(tokens[3])
+    elif operand_format == "STORE":
+        source2, source1 = tokens[1], tokens[2]
+        address = int(tokens[3])
+    else: # BRANCH
+        source1, source2 = tokens[1], tokens[2]
+        address = int(tokens[3])
+
+    return (opname, destination, source1, source2, immediate, address)
+
+
+# Gerador com os registros de um arquivo de texto já aberto, uma linha por vez
+def iter_trace(lines, opcode_table):
+    for line in lines:
+        record = parse_trace_line(line, opcode_table)
+        if record is not None:
+            yield record
+
+
+# --- Classe TraceReader ---
+# Acesso por índice sem carregar o trace: a leitura segue em frente linha a linha e,
+# na primeira passada, guarda o offset de uma a cada index_stride instruções. Um
+# desvio para trás (ou refetch após misprediction) volta ao offset anterior mais
+# próximo e relê no máximo index_stride linhas.
+class TraceReader:
+    def __init__(self, filename, opcode_table, index_stride=1024):
+        self.file = open(filename, 'rb')
+        self.opcode_table = opcode_table
+        self.index_stride = index_stride
+        # offsets[k]: posição no arquivo a partir da qual vem a instrução k * index_stride
+        self.offsets = [0]
+        # Número de instruções do trace; None até a primeira passada chegar ao fim do arquivo
+        self.length = None
+        self.next_index = 0
+        self.position = 0
+        # Até onde o arquivo já foi lido alguma vez (avisos só são exibidos na primeira passada)
+        self.scanned = 0
+
+    def read(self, index):
+        if self.length is not None and index >= self.length:
+            return None
+
+        checkpoint = min(index // self.index_stride, len(self.offsets) - 1)
+        if index < self.next_index or checkpoint * self.index_stride > self.next_index:
+            self.file.seek(self.offsets[checkpoint])
+            self.position = self.offsets[checkpoint]
+            self.next_index = checkpoint * self.index_stride
+
+        while True:
+            record = self._next_record()
+            if record is None:
+                return None
+            if self.next_index > index:
+                return record
+
+    def _next_record(self):
+        record = None
+        while record is None:
+            line = self.file.readline()
+            if not line:
+                self.length = self.next_index
+                return None
+            first_pass = self.position >= self.scanned
+            self.position += len(line)
+            record = parse_trace_line(line.decode(), self.opcode_table, warn=first_pass)
+            if first_pass:
+                self.scanned = self.position
+
+        self.next_index += 1
+        if self.next_index == len(self.offsets) * self.index_stride:
+            self.offsets.append(self.position)
+        return record
+
+    def close(self):
+        self.file.close()
+
+
+# --- Formato binário ---
+# Cabeçalho: magic, número de registros, offset dos metadados (JSON no fim do arquivo)
+# e chave do decodificador que gerou os registros (decoder_key)
+# Registro: índice do opname, destino, fonte1, fonte2 (índices na tabela de
+# registradores, -1 = ausente) e o imediato ou endereço, conforme o formato do opcode
+TRACE_MAGIC = b"TOMTRC02"
+_HEADER = struct.Struct("<8sQQ16s")
+_RECORD = struct.Struct("<hhhhq")
+
+# Versão de parse_trace_line e do layout dos registros: mudar invalida os traces compilados
+TRACE_DECODER_VERSION = 1
+
+CACHE_DIR = ".tomasulo_cache"
+
+
+# Formato compilado de qualquer versão (magic "TOMTRC" + versão do formato)
+def is_compiled_trace(filename):
+    with open(filename, 'rb') as f:
+        return f.read(len(TRACE_MAGIC))[:6] == TRACE_MAGIC[:6]
+
+
+# Cabeçalho no formato atual e gerado pelo mesmo decodificador
+def _is_current(data, opcode_table):
+    if len(data) < _HEADER.size:
+        return False
+    magic, _, _, key = _HEADER.unpack_from(data, 0)
+    return magic == TRACE_MAGIC and key == decoder_key(opcode_table)
+
+
+# Chave do decodificador: versão do parser e formato de operandos de cada opcode da tabela
+def decoder_key(opcode_table):
+    formats = sorted((opname, info.operand_format) for opname, info in opcode_table.items())
+    return hashlib.sha256(repr((TRACE_DECODER_VERSION, formats)).encode()).digest()[:16]
+
+
+# Identifica a versão do arquivo de origem gravada no trace compilado
+def _source_key(filename):
+    st = os.stat(filename)
+    return {"size": st.st_size, "mtime_ns": st.st_mtime_ns}
+
+
+# Converte um trace de texto para o formato compilado. Escreve num arquivo temporário
+# e renomeia no fim, então leitores concorrentes nunca veem um .trc pela metade
+def compile_trace(source, dest, opcode_table):
+    opnames = {}
+    registers = {}
+
+    def reg_id(name):
+        if name is None:
+            return -1
+        return registers.setdefault(name, len(registers))
+
+    tmp = f"{dest}.{os.getpid()}.tmp"
+    count = 0
+    key = decoder_key(opcode_table)
+    try:
+        with open(source, 'r') as src, open(tmp, 'wb') as out:
+            out.write(_HEADER.pack(TRACE_MAGIC, 0, 0, key))
+            for opname, destination, source1, source2, immediate, address in iter_trace(src, opcode_table):
+                value = immediate if immediate is not None else address
+                out.write(_RECORD.pack(opnames.setdefault(opname, len(opnames)), reg_id(destination),
+                                       reg_id(source1), reg_id(source2), value if value is not None else 0))
+                count += 1
+            metadata_offset = out.tell()
+            metadata = {"opnames": list(opnames), "registers": list(registers), "source": _source_key(source)}
+            out.write(json.dumps(metadata).encode())
+            out.seek(0)
+            out.write(_HEADER.pack(TRACE_MAGIC, count, metadata_offset, key))
+        os.replace(tmp, dest)
+    finally:
+        if os.path.exists(tmp):
+            os.remove(tmp)
+    return count
+
+
+# --- Classe CompiledTraceReader ---
+# Mesma interface de TraceReader, mas com acesso direto por índice: cada registro
+# é decodificado de dentro do mmap só quando a instrução é buscada
+class CompiledTraceReader:
+    def __init__(self, filename, opcode_table):
+        with open(filename, 'rb') as f:
+            self.data = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+        if not _is_current(self.data, opcode_table):
+            self.data.close()
+            raise ValueError(f"'{filename}' não é um trace compilado por esta versão do simulador "
+                             f"(recompile com tomasulo_trace.py)")
+        _, self.length, metadata_offset, _ = _HEADER.unpack_from(self.data, 0)
+        self.metadata = json.loads(self.data[metadata_offset:])
+        self.opnames = self.metadata["opnames"]
+        self.registers = self.metadata["registers"]
+        self.formats = [opcode_table[opname].operand_format for opname in self.opnames]
+
+    def read(self, index):
+        if index >= self.length:
+            return None
+        opcode, destination, source1, source2, value = _RECORD.unpack_from(
+            self.data, _HEADER.size + index * _RECORD.size)
+        operand_format = self.formats[opcode]
+        registers = self.registers
+        return (self.opnames[opcode],
+                registers[destination] if destination >= 0 else None,
+                registers[source1] if source1 >= 0 else None,
+                registers[source2] if source2 >= 0 else None,
+                value if operand_format == "I" else None,
+                value if operand_format not in ("R", "I") else None)
+
+    def close(self):
+        self.data.close()
+
+
+def _cache_path(filename):
+    directory, name = os.path.split(os.path.abspath(filename))
+    return os.path.join(directory, CACHE_DIR, name + ".trc")
+
+
+# Abre o trace pelo leitor mais rápido disponível: o próprio arquivo se já for compilado,
+# a cópia em cache se ainda corresponder à origem (tamanho e mtime) e ao decodificador,
+# ou compila agora. Sem permissão de escrita para o cache, lê o texto diretamente
+def open_trace(filename, opcode_table, use_cache=True):
+    if is_compiled_trace(filename):
+        return CompiledTraceReader(filename, opcode_table)
+    if not use_cache:
+        return TraceReader(filename, opcode_table)
+
+    cache = _cache_path(filename)
+    if os.path.exists(cache):
+        try:
+            reader = CompiledTraceReader(cache, opcode_table)
+        except ValueError:
+            # Compilado por outro decodificador: é refeito abaixo
+            reader = None
+        if reader is not None:
+            if reader.metadata["source"] == _source_key(filename):
+                return reader
+            reader.close()
+
+    try:
+        os.makedirs(os.path.dirname(cache), exist_ok=True)
+        compile_trace(filename, cache, opcode_table)
+    except OSError:
+        return TraceReader(filename, opcode_table)
+    return CompiledTraceReader(cache, opcode_table)
+
+
+# Conversor: python tomasulo_trace.py trace.txt [-o trace.trc]
+def main(argv=None):
+    from tomasulo_sim import OPCODE_TABLE
+
+    parser = argparse.ArgumentParser(description="Converte um trace de texto para o formato compilado (.trc).")
+    parser.add_argument("source", help="trace de texto")
+    parser.add_argument("-o", "--output", default=None, help="arquivo de saída (padrão: <source>.trc)")
+    args = parser.parse_args(argv)
+
+    output = args.output or os.path.splitext(args.source)[0] + ".trc"
+    try:
+        count = compile_trace(args.source, output, OPCODE_TABLE)
+    except FileNotFoundError:
+        print(f"Erro: O arquivo de instruções '{args.source}' não foi encontrado.", file=sys.stderr)
+        return 1
+    print(f"{count} instruções gravadas em {output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
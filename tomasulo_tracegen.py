@@ -0,0 +1,195 @@
+# --- Gerador de traces sintéticos ---
+#
+# Gera traces reproduzíveis (mesma semente = mesmo arquivo) com mistura de
+# instruções, distância de dependência, frequência e taxa de acerto de desvios e
+# padrão de acesso à memória controláveis, para medir o simulador em escala.
+#
+# Convenções do trace gerado (o resultado de cada desvio é conhecido na geração):
+# * Os destinos percorrem R3..R(3+registers-1) em rodízio, então o registrador
+#   escrito d instruções atrás ainda guarda aquele valor enquanto d < registers.
+# * O trace começa com um prólogo de um ADD por registrador de destino que dá a cada
+#   um valor inicial não nulo (R3 = R2 + R1 = 10, R4 = R3 + R1 = 15, ...), já que o
+#   estado inicial do simulador só define R1 e R2 (= 5). As length instruções
+#   sorteadas vêm depois dele.
+# * R0 (= 0) é a base de todos os LW/LB/SW/SB: o endereço é o próprio deslocamento.
+# * R1 (= 5 no estado inicial) nunca é escrito: é o segundo operando de MUL/DIV,
+#   evitando divisão por zero e o crescimento explosivo dos valores.
+# * Desvios comparam um registrador com ele mesmo: BEQ Rx, Rx sempre desvia e
+#   BNE Rx, Rx nunca desvia. Os alvos são sempre para frente, então o trace termina.
+#
+#   python tomasulo_tracegen.py -n 100000 --seed 7 --branch-rate 0.15 --taken-rate 0.7 -o sint.txt
+
+import argparse
+import collections
+import random
+import sys
+
+# Versão do formato das instruções geradas: mudar troca os traces da suíte do benchmark
+TRACEGEN_VERSION = 2
+
+# Classes da mistura -> opcodes sorteados dentro da classe
+MIX_OPCODES = {
+    "alu":   ("ADD", "SUB"),
+    "mul":   ("MUL", "DIV"),
+    "logic": ("OR", "AND", "SLLI", "SRLI"),
+    "load":  ("LW", "LB"),
+    "store": ("SW", "SB"),
+}
+
+# Parâmetros de generate_trace (mix = pesos relativos das instruções que não são desvios)
+DEFAULT_PROFILE = {
+    "mix": {"alu": 4, "mul": 1, "logic": 2, "load": 2, "store": 1},
+    "dep_distance": 4,
+    "branch_rate": 0.1,
+    "taken_rate": 0.5,
+    "max_skip": 4,
+    "mem_pattern": "sequential",
+    "stride": 4,
+    "footprint": 4096,
+    "registers": 16,
+}
+
+MEM_PATTERNS = ("sequential", "strided", "random")
+
+
+# Gerador com as linhas do trace. dep_distance: distância média (em instruções que
+# escrevem registrador) entre um operando e quem o produziu; branch_rate: fração de
+# desvios; taken_rate: fração dos desvios que desviam; max_skip: instruções puladas
+# por um desvio tomado (1..max_skip); mem_pattern/stride/footprint: endereços dos
+# acessos à memória, sempre dentro de [0, footprint)
+def generate_trace(length, seed=0, **profile):
+    params = dict(DEFAULT_PROFILE)
+    unknown = set(profile) - set(params)
+    if unknown:
+        raise ValueError(f"Parâmetros desconhecidos: {', '.join(sorted(unknown))}")
+    params.update(profile)
+    if params["mem_pattern"] not in MEM_PATTERNS:
+        raise ValueError(f"Padrão de memória inválido: {params['mem_pattern']}")
+    if params["registers"] < 1:
+        raise ValueError("registers deve ser pelo menos 1")
+
+    rng = random.Random(seed)
+    classes = list(params["mix"])
+    weights = [params["mix"][name] for name in classes]
+    registers = [f"R{3 + i}" for i in range(params["registers"])]
+    footprint = max(4, params["footprint"])
+    dep_distance = max(1, params["dep_distance"])
+
+    # Destinos recentes, o mais novo no fim
+    recent = collections.deque(maxlen=len(registers))
+    next_dest = 0
+    mem_cursor = 0
+
+    def source():
+        if not recent:
+            return registers[rng.randrange(len(registers))]
+        distance = min(rng.randint(1, 2 * dep_distance - 1), len(recent))
+        return recent[-distance]
+
+    def destination():
+        nonlocal next_dest
+        reg = registers[next_dest]
+        next_dest = (next_dest + 1) % len(registers)
+        recent.append(reg)
+        return reg
+
+    def address():
+        nonlocal mem_cursor
+        if params["mem_pattern"] == "random":
+            return rng.randrange(0, footprint, 4)
+        addr = mem_cursor
+        step = 4 if params["mem_pattern"] == "sequential" else params["stride"]
+        mem_cursor = (mem_cursor + step) % footprint
+        return addr
+
+    yield (f"# tomasulo_tracegen: length={length} seed={seed} "
+           + " ".join(f"{key}={value}" for key, value in params.items() if key != "mix")
+           + " mix=" + ",".join(f"{name}:{weight}" for name, weight in params["mix"].items()))
+
+    previous = "R2"
+    for reg in registers:
+        yield f"ADD {reg}, {previous}, R1"
+        previous = reg
+
+    # Alvos dos desvios são índices no programa inteiro, prólogo incluído
+    prologue = len(registers)
+    for index in range(length):
+        if rng.random() < params["branch_rate"]:
+            reg = source()
+            target = prologue + min(length, index + 1 + rng.randint(1, max(1, params["max_skip"])))
+            opname = "BEQ" if rng.random() < params["taken_rate"] else "BNE"
+            yield f"{opname} {reg}, {reg}, {target}"
+            continue
+
+        opname = rng.choice(MIX_OPCODES[rng.choices(classes, weights)[0]])
+        if opname in ("LW", "LB"):
+            addr = address()
+            yield f"{opname} {destination()}, R0, {addr}"
+        elif opname in ("SW", "SB"):
+            yield f"{opname} {source()}, R0, {address()}"
+        elif opname in ("SLLI", "SRLI"):
+            src = source()
+            yield f"{opname} {destination()}, {src}, {rng.randint(1, 3)}"
+        elif opname in ("MUL", "DIV"):
+            src = source()
+            yield f"{opname} {destination()}, {src}, R1"
+        else:
+            src1, src2 = source(), source()
+            yield f"{opname} {destination()}, {src1}, {src2}"
+
+
+def write_trace(path, length, seed=0, **profile):
+    with open(path, 'w') as f:
+        for line in generate_trace(length, seed, **profile):
+            f.write(line + "\n")
+
+
+# "alu=4,mul=1,load=2" -> {"alu": 4, "mul": 1, "load": 2}
+def parse_mix(text):
+    mix = {}
+    for item in text.split(","):
+        name, _, weight = item.partition("=")
+        name = name.strip()
+        if name not in MIX_OPCODES:
+            raise argparse.ArgumentTypeError(f"classe desconhecida '{name}' (use {', '.join(MIX_OPCODES)})")
+        mix[name] = float(weight)
+    return mix
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Gera um trace sintético reproduzível para o simulador Tomasulo.")
+    parser.add_argument("-n", "--length", type=int, required=True,
+                        help="número de instruções do trace, além do prólogo que inicializa os registradores")
+    parser.add_argument("-o", "--output", default=None, help="arquivo de saída (padrão: stdout)")
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--mix", type=parse_mix, default=DEFAULT_PROFILE["mix"],
+                        help="pesos das classes, ex.: alu=4,mul=1,logic=2,load=2,store=1")
+    parser.add_argument("--dep-distance", type=int, default=DEFAULT_PROFILE["dep_distance"],
+                        help="distância média entre produtor e consumidor de um registrador")
+    parser.add_argument("--branch-rate", type=float, default=DEFAULT_PROFILE["branch_rate"],
+                        help="fração das instruções que são desvios")
+    parser.add_argument("--taken-rate", type=float, default=DEFAULT_PROFILE["taken_rate"],
+                        help="fração dos desvios que são tomados")
+    parser.add_argument("--max-skip", type=int, default=DEFAULT_PROFILE["max_skip"],
+                        help="máximo de instruções puladas por um desvio tomado")
+    parser.add_argument("--mem-pattern", choices=MEM_PATTERNS, default=DEFAULT_PROFILE["mem_pattern"])
+    parser.add_argument("--stride", type=int, default=DEFAULT_PROFILE["stride"],
+                        help="passo em bytes do padrão strided")
+    parser.add_argument("--footprint", type=int, default=DEFAULT_PROFILE["footprint"],
+                        help="bytes de memória cobertos pelos acessos")
+    parser.add_argument("--registers", type=int, default=DEFAULT_PROFILE["registers"],
+                        help="registradores de destino usados em rodízio")
+    args = parser.parse_args(argv)
+
+    profile = {key: getattr(args, key) for key in DEFAULT_PROFILE}
+    lines = generate_trace(args.length, args.seed, **profile)
+    if args.output is None:
+        for line in lines:
+            print(line)
+    else:
+        write_trace(args.output, args.length, args.seed, **profile)
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())